@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Concurrency benchmark for the sync and async web tools.
+
+Starts a local stub web server that answers every request after a fixed
+delay, then drives `web_scrape` and `web_scrape_async` from concurrent
+coroutines the same way the ADK runner calls tools, and reports requests/sec.
+
+Usage:
+    python benchmarks/async_tools_benchmark.py [--requests 200] [--concurrency 20] [--latency-ms 100]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PAGE = (
+    "<html><head><title>Stub</title></head><body>"
+    + "<p>Lorem ipsum dolor sit amet, consectetur adipiscing elit.</p>" * 200
+    + "</body></html>"
+).encode()
+
+
+def start_stub_server(latency: float) -> ThreadingHTTPServer:
+    """Start a local web server that responds after `latency` seconds."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(PAGE)))
+            self.end_headers()
+            self.wfile.write(PAGE)
+
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        daemon_threads = True
+        request_queue_size = 1024
+
+    server = Server(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def drive(tool, url: str, total: int, concurrency: int) -> float:
+    """Call `tool` `total` times from `concurrency` coroutines and return requests/sec."""
+    remaining = iter(range(total))
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            result = tool(url)
+            if asyncio.iscoroutine(result):
+                result = await result
+            if result["status"] != "success":
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    if errors:
+        print(f"  ({errors} failed requests)")
+    return total / elapsed
+
+
+def main():
+    """Run the concurrency benchmark."""
+    parser = argparse.ArgumentParser(description="Compare sync and async tool throughput.")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=100.0)
+    args = parser.parse_args()
+
+    from multi_agent.researcher import web_scrape, web_scrape_async
+
+    server = start_stub_server(args.latency_ms / 1000)
+    url = f"http://127.0.0.1:{server.server_address[1]}/page"
+
+    print("Async Tools Benchmark")
+    print("=" * 40)
+    print(f"Requests: {args.requests}  Concurrency: {args.concurrency}  Latency: {args.latency_ms:.0f} ms")
+
+    for name, tool in (("web_scrape (sync)", web_scrape), ("web_scrape_async", web_scrape_async)):
+        throughput = asyncio.run(drive(tool, url, args.requests, args.concurrency))
+        print(f"{name:<20} {throughput:8.1f} req/s")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for web_scrape text extraction.
+
+Compares the original whole-page regex extraction with the streaming
+extractor in `multi_agent/html_extract.py` over a corpus of saved HTML pages.
+Each implementation runs in its own process so peak RSS can be compared.
+
+Usage:
+    python benchmarks/html_extract_benchmark.py [--corpus DIR] [--repeat 5]
+
+Without --corpus a synthetic corpus of small, medium and large pages is used.
+"""
+
+import argparse
+import importlib.util
+import multiprocessing
+import os
+import re
+import resource
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHUNK_SIZE = 64 * 1024
+
+
+def legacy_extract(content: str) -> str:
+    """The original web_scrape extraction, kept here for comparison."""
+    if '<body' in content.lower() and '</body>' in content.lower():
+        start = content.lower().find('<body')
+        start = content.find('>', start) + 1
+        end = content.lower().rfind('</body>')
+        content = content[start:end]
+
+    clean_content = re.sub(r'<[^>]+>', ' ', content)
+    clean_content = re.sub(r'\s+', ' ', clean_content).strip()
+
+    max_length = 2000
+    if len(clean_content) > max_length:
+        clean_content = clean_content[:max_length] + "..."
+    return clean_content
+
+
+def load_html_extract():
+    """Load html_extract.py without importing the agent package (and ADK)."""
+    path = os.path.join(PROJECT_ROOT, "multi_agent", "html_extract.py")
+    spec = importlib.util.spec_from_file_location("html_extract", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def write_synthetic_corpus(directory: str) -> None:
+    """Write pages of roughly 50 KB, 1 MB and 5 MB with scripts and styles."""
+    block = (
+        "<div class='item'><h2>Section</h2><p>Lorem ipsum dolor sit amet, "
+        "<a href='#'>consectetur</a> adipiscing elit &amp; sed do eiusmod.</p></div>\n"
+    )
+    script = "<script>var data = " + "[1,2,3,'<p>not text</p>']," * 200 + "[];</script>\n"
+    for name, repeats in (("small", 300), ("medium", 6000), ("large", 30000)):
+        with open(os.path.join(directory, f"{name}.html"), "w", encoding="utf-8") as f:
+            f.write("<html><head><title>Page</title><style>body{color:red}</style>" + script + "</head><body>")
+            f.write(block * repeats)
+            f.write("</body></html>")
+
+
+def run_implementation(name: str, files: list, repeat: int, queue) -> None:
+    """Run one implementation over the corpus and report throughput and peak RSS."""
+    html_extract = load_html_extract() if name == "streaming" else None
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    page_bytes = 0
+    bytes_read = 0
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for path in files:
+            page_bytes += os.path.getsize(path)
+            if name == "legacy":
+                # requests reads the whole body and decodes it to response.text
+                with open(path, "rb") as f:
+                    body = f.read()
+                bytes_read += len(body)
+                legacy_extract(body.decode("utf-8", errors="replace"))
+            else:
+                extractor = html_extract.StreamingTextExtractor(max_chars=2000)
+                with open(path, "rb") as f:
+                    while not extractor.done:
+                        chunk = f.read(CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        extractor.feed_bytes(chunk)
+                bytes_read += extractor.bytes_fed
+                extractor.close()
+                extractor.text()
+    elapsed = time.perf_counter() - start
+
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put({
+        "name": name,
+        "elapsed": elapsed,
+        "page_bytes": page_bytes,
+        "bytes_read": bytes_read,
+        "peak_rss_delta_kb": peak_kb - baseline_kb,
+    })
+
+
+def main():
+    """Run the extraction benchmark."""
+    parser = argparse.ArgumentParser(description="Compare web_scrape extraction implementations.")
+    parser.add_argument("--corpus", help="Directory of saved .html pages")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = args.corpus
+    temp_dir = None
+    if not corpus:
+        temp_dir = tempfile.TemporaryDirectory()
+        corpus = temp_dir.name
+        write_synthetic_corpus(corpus)
+
+    files = sorted(
+        os.path.join(corpus, name) for name in os.listdir(corpus) if name.endswith((".html", ".htm"))
+    )
+    if not files:
+        print(f"No .html files found in {corpus}")
+        sys.exit(1)
+
+    print("HTML Extraction Benchmark")
+    print("=" * 40)
+    print(f"Pages: {len(files)}  Corpus size: {sum(os.path.getsize(p) for p in files) / 1024:.0f} KB  Repeat: {args.repeat}")
+
+    context = multiprocessing.get_context("spawn")
+    for name in ("legacy", "streaming"):
+        queue = context.Queue()
+        process = context.Process(target=run_implementation, args=(name, files, args.repeat, queue))
+        process.start()
+        result = queue.get()
+        process.join()
+
+        print(
+            f"{name:<10} {result['page_bytes'] / result['elapsed'] / 1024 / 1024:9.1f} MB/s of pages   "
+            f"read {result['bytes_read'] / 1024 / 1024:8.1f} MB   "
+            f"peak RSS +{result['peak_rss_delta_kb'] / 1024:.1f} MB"
+        )
+
+    if temp_dir:
+        temp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
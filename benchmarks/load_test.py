@@ -0,0 +1,524 @@
+#!/usr/bin/env python3
+"""
+Offline load test for the agent tools and the coordinator agent.
+
+Every external dependency is replaced by a local stub with a configurable
+latency and error distribution:
+
+- scraped websites and the Custom Search API: a local HTTP server, so the
+  real HTTP clients, caches and parsers are exercised;
+- Gemini `generate_content` and the Chroma collection: in-process fakes
+  plugged into the RAG service;
+- the LLM behind each ADK agent: a fake model that transfers to the RAG
+  agent, calls its search tool and then answers.
+
+Each scenario is driven at a fixed concurrency and reports throughput,
+latency percentiles, errors and memory. Results can be saved as JSON and
+compared against a saved baseline to catch regressions.
+
+Latency specs have the form MEDIAN_MS[:SIGMA[:ERROR_RATE]]: latencies are
+log-normal around the median with the given sigma, and the given fraction
+of calls fails.
+
+Usage:
+    python benchmarks/load_test.py [--requests 200] [--concurrency 20]
+        [--scenarios rag_search_async,coordinator] [--gemini 400:0.4:0.01]
+        [--json results.json] [--baseline results.json --max-regression 0.2]
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, List, Optional
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SCENARIOS = [
+    "rag_search",
+    "rag_search_async",
+    "google_search",
+    "google_search_async",
+    "web_scrape",
+    "web_scrape_async",
+    "coordinator",
+]
+
+PAGE = (
+    "<html><head><title>Stub</title></head><body>"
+    + "<p>Lorem ipsum dolor sit amet, consectetur adipiscing elit.</p>" * 200
+    + "</body></html>"
+).encode()
+
+
+class LatencyModel:
+    """Log-normal latency around a median, with a fixed error rate."""
+
+    def __init__(self, median_ms: float, sigma: float = 0.0, error_rate: float = 0.0):
+        self.median_ms = median_ms
+        self.sigma = sigma
+        self.error_rate = error_rate
+
+    @classmethod
+    def parse(cls, spec: str) -> "LatencyModel":
+        """Parse MEDIAN_MS[:SIGMA[:ERROR_RATE]]."""
+        parts = [float(part) for part in spec.split(":")]
+        return cls(*parts)
+
+    def sample(self) -> float:
+        """Return a latency in seconds."""
+        if self.median_ms <= 0:
+            return 0.0
+        return self.median_ms / 1000 * math.exp(random.gauss(0.0, self.sigma)) if self.sigma else self.median_ms / 1000
+
+    def fails(self) -> bool:
+        return random.random() < self.error_rate
+
+    def __str__(self) -> str:
+        return f"{self.median_ms:g} ms (sigma {self.sigma:g}, errors {self.error_rate:.1%})"
+
+
+class StubError(RuntimeError):
+    """Failure injected by a stub, reported like an HTTP 503 from the backend."""
+
+    code = 503
+
+
+def start_stub_server(web: LatencyModel, cse: LatencyModel, pages: int = 10) -> ThreadingHTTPServer:
+    """Start a local server answering Custom Search API requests and serving web pages."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            model = cse if self.path.startswith("/customsearch/v1") else web
+            time.sleep(model.sample())
+            if model.fails():
+                self.send_error(500, "Injected failure")
+                return
+
+            if model is cse:
+                port = self.server.server_address[1]
+                body = json.dumps({
+                    "searchInformation": {"totalResults": str(pages), "searchTime": 0.1},
+                    "items": [
+                        {
+                            "title": f"Stub result {i}",
+                            "link": f"http://127.0.0.1:{port}/page/{random.getrandbits(32)}",
+                            "snippet": "Lorem ipsum dolor sit amet.",
+                            "displayLink": "127.0.0.1",
+                        }
+                        for i in range(pages)
+                    ],
+                }).encode()
+                content_type = "application/json"
+            else:
+                body = PAGE
+                content_type = "text/html; charset=utf-8"
+
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        daemon_threads = True
+        request_queue_size = 1024
+
+    server = Server(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class StubCollection:
+    """Stand-in for the Chroma collection (any retrieval backend)."""
+
+    def __init__(self, latency: LatencyModel):
+        self.latency = latency
+
+    def query(self, query_texts: List[str], n_results: int = 1, include: Optional[List[str]] = None) -> Dict[str, Any]:
+        time.sleep(self.latency.sample())
+        if self.latency.fails():
+            raise StubError("Injected retrieval failure")
+        return {
+            "ids": [[f"doc-{i}" for i in range(n_results)] for _ in query_texts],
+            "documents": [
+                [f"Internal document {i} about {text}. " + "Policy details follow. " * 40 for i in range(n_results)]
+                for text in query_texts
+            ],
+            "distances": [[0.2 + 0.05 * i for i in range(n_results)] for _ in query_texts],
+            "metadatas": [[{} for _ in range(n_results)] for _ in query_texts],
+        }
+
+    def upsert(self, ids, documents, metadatas=None) -> None:
+        pass
+
+    def count(self) -> int:
+        return 1000
+
+
+class StubResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class StubGemini:
+    """Stand-in for `genai.GenerativeModel` used by the RAG service."""
+
+    def __init__(self, latency: LatencyModel):
+        self.latency = latency
+
+    def generate_content(self, contents, generation_config=None, **kwargs) -> StubResponse:
+        time.sleep(self.latency.sample())
+        if self.latency.fails():
+            raise StubError("Injected Gemini failure")
+        return StubResponse("Based on the documents, the answer is 42.")
+
+    async def generate_content_async(self, contents, generation_config=None, stream=False, **kwargs):
+        await asyncio.sleep(self.latency.sample())
+        if self.latency.fails():
+            raise StubError("Injected Gemini failure")
+        if stream:
+            return self._stream()
+        return StubResponse("Based on the documents, the answer is 42.")
+
+    async def _stream(self):
+        for word in "Based on the documents, the answer is 42.".split():
+            yield StubResponse(word + " ")
+
+
+def make_stub_llm(latency: LatencyModel, transfer_to: Optional[str] = None):
+    """Build a fake ADK model that transfers, calls a search tool, then answers."""
+    from google.adk.models.base_llm import BaseLlm
+    from google.adk.models.llm_response import LlmResponse
+    from google.genai import types
+
+    tool_arguments = {
+        "rag_search_async": "question",
+        "rag_search": "question",
+        "google_search_async": "query",
+        "google_search": "query",
+        "web_scrape_async": "url",
+        "web_scrape": "url",
+    }
+
+    class StubLlm(BaseLlm):
+        async def generate_content_async(self, llm_request, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+            await asyncio.sleep(latency.sample())
+            if latency.fails():
+                raise StubError("Injected LLM failure")
+
+            last = llm_request.contents[-1] if llm_request.contents else None
+            answered = last is not None and any(part.function_response for part in last.parts or [])
+            question = next(
+                (part.text for content in reversed(llm_request.contents) if content.role == "user"
+                 for part in content.parts or [] if part.text),
+                "",
+            )
+            tools = llm_request.tools_dict
+
+            call = None
+            if not answered:
+                name = next((name for name in tool_arguments if name in tools), None)
+                if name:
+                    call = types.FunctionCall(name=name, args={tool_arguments[name]: question})
+                elif transfer_to and "transfer_to_agent" in tools:
+                    call = types.FunctionCall(name="transfer_to_agent", args={"agent_name": transfer_to})
+
+            part = types.Part(function_call=call) if call else types.Part(text="Here is the answer.")
+            yield LlmResponse(content=types.Content(role="model", parts=[part]))
+
+    return StubLlm(model=f"stub-{transfer_to or 'agent'}")
+
+
+def install_stubs(args, server: ThreadingHTTPServer) -> None:
+    """Point every backend the tools use at the stubs."""
+    from googleapiclient.discovery import build
+
+    from multi_agent import rag_agent, researcher
+    from multi_agent.services import registry
+
+    gemini = LatencyModel.parse(args.gemini)
+    chroma = LatencyModel.parse(args.chroma)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+    def build_rag_service():
+        service = rag_agent.RAGService(backend=StubCollection(chroma))
+        service.model = StubGemini(gemini)
+        return service
+
+    def build_search_service():
+        service = researcher.GoogleSearchService()
+        # The sync path uses the discovery client; send it to the stub server too
+        service.service = build("customsearch", "v1", developerKey="stub", client_options={"api_endpoint": base_url})
+        return service
+
+    researcher.CSE_ENDPOINT = base_url + "customsearch/v1"
+    registry.reset()
+    registry.register("rag", build_rag_service)
+    registry.register("search", build_search_service)
+
+
+def rss_mb() -> float:
+    """Current resident set size in MB (0 where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        return 0.0
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+def call_tool(tool: Callable[..., Any], *args, **kwargs) -> Awaitable[dict]:
+    """Call an async tool directly and a sync tool in a worker thread."""
+    if asyncio.iscoroutinefunction(tool):
+        return tool(*args, **kwargs)
+    return asyncio.to_thread(tool, *args, **kwargs)
+
+
+def make_call(scenario: str, args, server: ThreadingHTTPServer) -> Callable[[int], Awaitable[dict]]:
+    """
+    Return a coroutine function that performs request number i of the scenario.
+
+    Sync tools run in worker threads, the way a thread-pooled server would call them.
+    """
+    port = server.server_address[1]
+    # Inputs are distinct per scenario, so one scenario never warms the caches of the next
+    question = lambda i: f"What does the internal handbook say about {scenario} topic {i % args.distinct}?"
+
+    if scenario in ("rag_search", "rag_search_async"):
+        from multi_agent import rag_agent
+
+        tool = getattr(rag_agent, scenario)
+        return lambda i: call_tool(tool, question(i), k=3)
+
+    if scenario in ("google_search", "google_search_async"):
+        from multi_agent import researcher
+
+        tool = getattr(researcher, scenario)
+        return lambda i: call_tool(tool, f"{scenario} query {i % args.distinct}", num_results=10)
+
+    if scenario in ("web_scrape", "web_scrape_async"):
+        from multi_agent import researcher
+
+        tool = getattr(researcher, scenario)
+        return lambda i: call_tool(tool, f"http://127.0.0.1:{port}/{scenario}/{i % args.distinct}")
+
+    if scenario == "coordinator":
+        from google.adk.agents import LlmAgent
+        from google.adk.runners import InMemoryRunner
+        from google.genai import types
+
+        from multi_agent.agent import coordinator_agent, rag_agent
+
+        llm = LatencyModel.parse(args.llm)
+        pending = [coordinator_agent]
+        while pending:
+            agent = pending.pop()
+            if isinstance(agent, LlmAgent):
+                agent.model = make_stub_llm(llm, rag_agent.name if agent is coordinator_agent else None)
+            pending.extend(agent.sub_agents)
+
+        runner = InMemoryRunner(agent=coordinator_agent, app_name="load_test")
+
+        async def ask(i: int) -> dict:
+            session = await runner.session_service.create_session(app_name="load_test", user_id="load")
+            message = types.Content(role="user", parts=[types.Part(text=question(i))])
+            answer = None
+            async for event in runner.run_async(user_id="load", session_id=session.id, new_message=message):
+                if event.error_code:
+                    return {"status": "error", "error": event.error_message}
+                if event.is_final_response() and event.content and event.content.parts:
+                    answer = event.content.parts[0].text
+            return {"status": "success" if answer else "error", "answer": answer}
+
+        return ask
+
+    raise ValueError(f"Unknown scenario: {scenario}")
+
+
+async def drive(call: Callable[[int], Awaitable[dict]], total: int, concurrency: int, warmup: int) -> Dict[str, Any]:
+    """Make `total` calls from `concurrency` workers and measure each one."""
+    loop = asyncio.get_running_loop()
+    # Sync tools run in worker threads, one per concurrent caller
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=concurrency))
+
+    async def one(i: int) -> bool:
+        try:
+            result = await call(i)
+            return result.get("status") == "success"
+        except Exception:
+            return False
+
+    # Warm-up calls build the services and fill connection pools
+    await asyncio.gather(*(one(total + i) for i in range(warmup)))
+
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            ok = await one(i)
+            latencies.append(time.perf_counter() - started)
+            errors += not ok
+
+    rss_before = rss_mb()
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": total,
+        "errors": errors,
+        "throughput": round(total / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        "rss_mb": round(rss_mb(), 1),
+        "rss_growth_mb": round(rss_mb() - rss_before, 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], max_regression: float) -> List[str]:
+    """Return a message for every scenario that got slower than the baseline allows."""
+    regressions = []
+    for scenario, result in results.items():
+        previous = baseline.get(scenario)
+        if not previous:
+            continue
+        if result["throughput"] < previous["throughput"] * (1 - max_regression):
+            regressions.append(f"{scenario}: throughput {result['throughput']} req/s vs {previous['throughput']} req/s")
+        if result["p95_ms"] > previous["p95_ms"] * (1 + max_regression):
+            regressions.append(f"{scenario}: p95 {result['p95_ms']} ms vs {previous['p95_ms']} ms")
+    return regressions
+
+
+def main():
+    """Run the load test."""
+    parser = argparse.ArgumentParser(description="Offline load test for the agent tools and coordinator.")
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=10, help="Unmeasured requests before each scenario")
+    parser.add_argument("--distinct", type=int, default=0,
+                        help="Distinct questions/URLs per scenario; lower values exercise the caches (default: all distinct)")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated scenarios")
+    parser.add_argument("--gemini", default="400:0.4:0", help="Gemini generate_content latency spec")
+    parser.add_argument("--chroma", default="50:0.3:0", help="Chroma query latency spec")
+    parser.add_argument("--cse", default="250:0.4:0", help="Custom Search API latency spec")
+    parser.add_argument("--web", default="150:0.6:0", help="Scraped website latency spec")
+    parser.add_argument("--llm", default="600:0.4:0", help="Agent LLM latency spec (coordinator scenario)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--baseline", help="Results file to compare against; exits non-zero on regression")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="Allowed throughput drop / p95 increase relative to the baseline")
+    args = parser.parse_args()
+    args.distinct = args.distinct or (args.requests + args.warmup)
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    random.seed(args.seed)
+    # Keep the caches, quota tracking and credentials of this run to itself
+    os.environ["ADK_CACHE_DIR"] = tempfile.mkdtemp(prefix="adk-load-test-")
+    os.environ.setdefault("GOOGLE_API_KEY", "stub")
+    os.environ["GOOGLE_CSE_API_KEY"] = "stub"
+    os.environ["GOOGLE_CSE_ID"] = "stub"
+    os.environ["GOOGLE_CSE_DAILY_QUOTA"] = "0"
+    os.environ["RAG_CACHE_SEMANTIC_DISTANCE"] = "0"
+
+    server = start_stub_server(LatencyModel.parse(args.web), LatencyModel.parse(args.cse))
+    install_stubs(args, server)
+
+    print("Offline Load Test")
+    print("=" * 40)
+    print(f"Requests: {args.requests}  Concurrency: {args.concurrency}  Distinct inputs: {args.distinct}")
+    for name in ("gemini", "chroma", "cse", "web", "llm"):
+        print(f"  {name:<7} {LatencyModel.parse(getattr(args, name))}")
+    print()
+    print(f"{'scenario':<22}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}{'RSS MB':>9}{'+MB':>7}")
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for scenario in scenarios:
+        call = make_call(scenario, args, server)
+        result = asyncio.run(drive(call, args.requests, args.concurrency, args.warmup))
+        results[scenario] = result
+        print(
+            f"{scenario:<22}{result['throughput']:>8.1f}{result['p50_ms']:>9.1f}{result['p95_ms']:>9.1f}"
+            f"{result['p99_ms']:>9.1f}{result['errors']:>8}{result['rss_mb']:>9.1f}{result['rss_growth_mb']:>7.1f}"
+        )
+
+    server.shutdown()
+
+    from multi_agent.resilience import resilience_stats
+    from multi_agent.result_shaping import shaping_stats
+    from multi_agent.single_flight import single_flight_stats
+
+    backends = resilience_stats()
+    if backends:
+        print()
+        for name, stats in backends.items():
+            print(f"  {name:<10} calls {stats['calls']}  retries {stats['retries']}  timeouts {stats['timeouts']}  "
+                  f"hedges {stats['hedges']} (won {stats['hedge_wins']})  short-circuited {stats['short_circuits']}")
+
+    flights = single_flight_stats()
+    if flights:
+        print()
+        for name, stats in flights.items():
+            print(f"  {name:<14} calls {stats['calls']}  executed {stats['executions']}  coalesced {stats['coalesced']}")
+
+    shaped = shaping_stats()
+    if shaped:
+        print()
+        for name, stats in shaped.items():
+            print(f"  {name:<20} results {stats['results']}  tokens {stats['raw_tokens']} -> {stats['tokens']} "
+                  f"({stats['saved_ratio']:.0%} saved)  artifacts {stats['artifacts']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": {k: v for k, v in vars(args).items() if k not in ("json", "baseline")},
+                       "results": results, "resilience": backends, "single_flight": flights,
+                       "result_shaping": shaped}, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.max_regression)
+        if regressions:
+            print("\nRegressions against baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("\nNo regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
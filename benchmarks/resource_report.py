@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Resource report for the agent packages served from one process.
+
+Imports the agent packages the way the ADK web server does (including the
+`agents` shim, which re-imports `multi_agent`), optionally builds every
+registered service, and prints the process-wide service registry's report:
+RSS and open sockets for the process, memory and open connections per agent
+package and per service, and the import cost of each package.
+
+Usage:
+    python benchmarks/resource_report.py [--agents weather_agent,multi_agent,agents] [--warm-up]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def rss_bytes() -> int:
+    """Resident set size of this process (0 where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+
+def main():
+    """Print the resource report."""
+    parser = argparse.ArgumentParser(description="Report memory and sockets held by the agents' shared services.")
+    parser.add_argument("--agents", default="weather_agent,multi_agent,agents",
+                        help="Comma-separated agent packages to import, in order")
+    parser.add_argument("--warm-up", action="store_true", help="Build every registered service (needs credentials)")
+    args = parser.parse_args()
+
+    # Nothing from the project is imported before this loop, so import costs are attributed correctly
+    imports = {}
+    for package in filter(None, (name.strip() for name in args.agents.split(","))):
+        before, started = rss_bytes(), time.perf_counter()
+        try:
+            __import__(package)
+            imports[package] = {
+                "import_ms": round((time.perf_counter() - started) * 1000, 1),
+                "import_rss_mb": round(max(0, rss_bytes() - before) / (1024 * 1024), 1),
+            }
+        except Exception as e:
+            imports[package] = {"error": str(e)}
+
+    from multi_agent.services import registry
+
+    if args.warm_up:
+        registry.warm_up(background=False)
+
+    report = registry.report()
+    report["imports"] = imports
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
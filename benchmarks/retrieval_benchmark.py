@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Latency and recall benchmark for the RAG retrieval backends.
+
+Builds a synthetic clustered corpus with known embeddings, loads it into each
+backend and reports ingest time, query latency percentiles and recall@k
+against exact brute-force search. No network access or API keys are needed:
+the embedding function looks vectors up from the synthetic corpus.
+
+Usage:
+    python benchmarks/retrieval_benchmark.py [--docs 50000] [--dim 768] [--queries 200] [--k 10]
+        [--partitions 0] [--probes 8] [--backends local,ivf,memory]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Add the project root to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from multi_agent.retrieval import ChromaBackend, LocalVectorIndex
+
+
+def make_corpus(docs: int, dim: int, queries: int, seed: int = 0):
+    """Return (document vectors, query vectors) drawn around random cluster centres."""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(max(1, docs // 100), dim)).astype(np.float32)
+    doc_vectors = centres[rng.integers(len(centres), size=docs)] + 0.5 * rng.normal(size=(docs, dim)).astype(np.float32)
+    query_vectors = doc_vectors[rng.integers(docs, size=queries)] + 0.3 * rng.normal(size=(queries, dim)).astype(np.float32)
+    return doc_vectors, query_vectors
+
+
+def exact_top_k(doc_vectors: np.ndarray, query_vectors: np.ndarray, k: int) -> list:
+    """Brute-force cosine top-k used as ground truth."""
+    docs = doc_vectors / np.linalg.norm(doc_vectors, axis=1, keepdims=True)
+    queries = query_vectors / np.linalg.norm(query_vectors, axis=1, keepdims=True)
+    scores = queries @ docs.T
+    return [set(np.argsort(-row)[:k].tolist()) for row in scores]
+
+
+def build_backend(name: str, directory: str, lookup, partitions: int, probes: int):
+    if name == "local":
+        return LocalVectorIndex(os.path.join(directory, "flat"), embed_fn=lookup)
+    if name == "ivf":
+        return LocalVectorIndex(
+            os.path.join(directory, "ivf"), embed_fn=lookup, n_partitions=partitions, n_probe=probes,
+            train_threshold=sys.maxsize,
+        )
+    if name == "memory":
+        import chromadb
+
+        client = chromadb.EphemeralClient()
+        collection = client.get_or_create_collection(name="retrieval_benchmark", metadata={"hnsw:space": "cosine"})
+        return ChromaBackend(collection, embed_fn=lookup)
+    raise ValueError(f"Unknown backend: {name}")
+
+
+def main():
+    """Run the retrieval benchmark."""
+    parser = argparse.ArgumentParser(description="Compare RAG retrieval backends.")
+    parser.add_argument("--docs", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--partitions", type=int, default=0, help="IVF partitions (default: sqrt(docs))")
+    parser.add_argument("--probes", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--backends", default="local,ivf,memory")
+    args = parser.parse_args()
+
+    partitions = args.partitions or max(1, int(np.sqrt(args.docs)))
+    doc_vectors, query_vectors = make_corpus(args.docs, args.dim, args.queries)
+    truth = exact_top_k(doc_vectors, query_vectors, args.k)
+
+    # Texts are "d<i>" / "q<i>"; the embedding function maps them back to vectors
+    def lookup(texts):
+        return [(doc_vectors if text[0] == "d" else query_vectors)[int(text[1:])].tolist() for text in texts]
+
+    print("Retrieval Benchmark")
+    print("=" * 40)
+    print(f"Docs: {args.docs}  Dim: {args.dim}  Queries: {args.queries}  k: {args.k}  "
+          f"IVF: {partitions} partitions / {args.probes} probes")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name in args.backends.split(","):
+            try:
+                backend = build_backend(name.strip(), directory, lookup, partitions, args.probes)
+            except ImportError as e:
+                print(f"{name:<8} skipped ({e})")
+                continue
+
+            start = time.perf_counter()
+            for offset in range(0, args.docs, args.batch_size):
+                ids = [f"d{i}" for i in range(offset, min(offset + args.batch_size, args.docs))]
+                backend.upsert(ids=ids, documents=ids)
+            if isinstance(backend, LocalVectorIndex) and backend.n_partitions:
+                backend.train_partitions()
+            ingest_seconds = time.perf_counter() - start
+
+            latencies = []
+            hits = 0
+            for i in range(args.queries):
+                start = time.perf_counter()
+                result = backend.query(query_texts=[f"q{i}"], n_results=args.k)
+                latencies.append((time.perf_counter() - start) * 1000)
+                found = {int(doc_id[1:]) for doc_id in result["ids"][0]}
+                hits += len(found & truth[i])
+
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            print(
+                f"{name:<8} ingest {args.docs / ingest_seconds:9.0f} docs/s   "
+                f"query p50 {p50:7.2f} ms  p95 {p95:7.2f} ms  p99 {p99:7.2f} ms   "
+                f"recall@{args.k} {hits / (args.queries * args.k):.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Throughput of the multi-process server (serve.py) from 1 to N workers.
+
+Serves a benchmark agent whose model is the load test's fake LLM and whose
+only tool is `web_scrape_async`, pointed at the load test's local stub
+website, so each request does real HTTP fetching and HTML extraction but
+never leaves the machine. For each worker count the server is started, each
+request creates a session and runs one `/run` turn through the front door,
+and throughput, latency and scaling efficiency (req/s relative to N times
+the single-worker rate) are reported. With --reload, a rolling reload is
+triggered halfway through each run to show that it drops no requests.
+
+Usage:
+    python benchmarks/serving_benchmark.py [--workers 1,2,4] [--requests 400] [--concurrency 32]
+        [--llm 20:0:0] [--web 5:0:0] [--reload]
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from benchmarks.load_test import LatencyModel, percentile, start_stub_server  # noqa: E402
+
+BENCH_AGENT = '''
+import os
+import sys
+
+sys.path.insert(0, {root!r})
+
+from google.adk.agents import LlmAgent
+
+from benchmarks.load_test import LatencyModel, make_stub_llm
+from multi_agent.researcher import web_scrape_async
+
+root_agent = LlmAgent(
+    name="bench",
+    model=make_stub_llm(LatencyModel.parse(os.environ["SERVING_BENCH_LLM"])),
+    instruction="Scrape the URL the user sends and summarize it.",
+    tools=[web_scrape_async],
+)
+'''
+
+
+def write_agents_dir() -> str:
+    """Create an agents directory holding only the benchmark agent."""
+    agents_dir = tempfile.mkdtemp(prefix="adk-serving-agents-")
+    os.makedirs(os.path.join(agents_dir, "bench"))
+    with open(os.path.join(agents_dir, "bench", "__init__.py"), "w") as f:
+        f.write("from . import agent\n")
+    with open(os.path.join(agents_dir, "bench", "agent.py"), "w") as f:
+        f.write(BENCH_AGENT.format(root=ROOT))
+    return agents_dir
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_ready(base_url: str, process: subprocess.Popen, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"server exited with {process.returncode}")
+            try:
+                if (await client.get("/list-apps")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"server did not start within {timeout:.0f} seconds")
+
+
+async def drive(base_url: str, page_base: str, requests: int, concurrency: int, offset: int,
+                reload: bool) -> Dict[str, Any]:
+    """Run `requests` session + /run pairs at the given concurrency."""
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(requests))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        async def one(i: int) -> None:
+            nonlocal errors
+            started = time.perf_counter()
+            try:
+                created = await client.post("/apps/bench/users/bench/sessions", json={})
+                created.raise_for_status()
+                response = await client.post("/run", json={
+                    "appName": "bench",
+                    "userId": "bench",
+                    "sessionId": created.json()["id"],
+                    "newMessage": {"role": "user", "parts": [{"text": f"{page_base}{offset + i}"}]},
+                })
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+            except httpx.HTTPError:
+                errors += 1
+
+        async def worker() -> None:
+            for i in counter:
+                if reload and i == requests // 2:
+                    await client.post("/_serving/reload")
+                await one(i)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+        status = (await client.get("/_serving/status")).json()
+
+    return {
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "reloads": status["reloads"],
+    }
+
+
+async def run_workers(workers: int, args, agents_dir: str, page_base: str, env: Dict[str, str]) -> Dict[str, Any]:
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "serve.py"), "--agents-dir", agents_dir,
+         "--workers", str(workers), "--port", str(port), "--log-level", "error"],
+        env=env,
+    )
+    try:
+        await wait_ready(base_url, process, args.start_timeout)
+        await drive(base_url, page_base, args.warmup, args.concurrency, 10_000_000 * workers, reload=False)
+        return await drive(base_url, page_base, args.requests, args.concurrency, 0, reload=args.reload)
+    finally:
+        process.terminate()
+        process.wait(timeout=60)
+
+
+def main():
+    """Run the serving benchmark."""
+    parser = argparse.ArgumentParser(description="Throughput of serve.py from 1 to N worker processes.")
+    parser.add_argument("--workers", default=None,
+                        help="Comma-separated worker counts (default: 1 up to the CPU count, doubling)")
+    parser.add_argument("--requests", type=int, default=400, help="Measured requests per worker count")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--warmup", type=int, default=20, help="Unmeasured requests before each run")
+    parser.add_argument("--llm", default="20:0:0", help="Fake agent LLM latency spec (MEDIAN_MS:SIGMA:ERROR_RATE)")
+    parser.add_argument("--web", default="5:0:0", help="Stub website latency spec")
+    parser.add_argument("--reload", action="store_true", help="Trigger a rolling reload halfway through each run")
+    parser.add_argument("--start-timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    if args.workers:
+        counts = [int(count) for count in args.workers.split(",")]
+    else:
+        counts, count = [], 1
+        while count < (os.cpu_count() or 1):
+            counts.append(count)
+            count *= 2
+        counts.append(os.cpu_count() or 1)
+
+    server = start_stub_server(LatencyModel.parse(args.web), LatencyModel(0))
+    page_base = f"http://127.0.0.1:{server.server_address[1]}/page/"
+    agents_dir = write_agents_dir()
+    env = dict(
+        os.environ,
+        ADK_CACHE_DIR=tempfile.mkdtemp(prefix="adk-serving-cache-"),
+        SERVING_BENCH_LLM=args.llm,
+        GOOGLE_API_KEY=os.environ.get("GOOGLE_API_KEY", "stub"),
+        # Every page is fetched and extracted once per request
+        HTTP_CACHE_MAX_MB="0",
+    )
+
+    print("Serving Benchmark")
+    print("=" * 40)
+    print(f"CPUs: {os.cpu_count()}  Requests: {args.requests}  Concurrency: {args.concurrency}")
+    print(f"LLM: {LatencyModel.parse(args.llm)}  Web: {LatencyModel.parse(args.web)}")
+    print()
+    print(f"{'workers':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'errors':>8}{'scaling':>9}{'reloads':>9}")
+
+    single = None
+    for workers in counts:
+        result = asyncio.run(run_workers(workers, args, agents_dir, page_base, env))
+        single = single or result["throughput_rps"] / workers
+        efficiency = result["throughput_rps"] / (workers * single) if single else 0.0
+        print(f"{workers:>8}{result['throughput_rps']:>9.1f}{result['p50_ms']:>9.0f}{result['p95_ms']:>9.0f}"
+              f"{result['errors']:>8}{efficiency:>9.0%}{result['reloads']:>9}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Cost of long conversations with each session service.
+
+Runs one long conversation per configuration against an agent whose fake
+LLM charges latency per prompt token (so a growing history is slower, as
+with a real model) and whose tool returns a large report every turn:
+
+- memory:  ADK's InMemorySessionService (the default; lost on restart)
+- sqlite:  SQLiteSessionService with compaction off
+- compact: SQLiteSessionService with compaction at --compact-tokens
+
+For each it reports the mean and last-turn latency, the prompt size of the
+last turn, the total prompt tokens sent, the database size and the session
+metrics. The SQLite store is then closed and reopened, as after a worker
+restart, to check that every event was persisted.
+
+Usage:
+    python benchmarks/session_benchmark.py [--turns 40] [--report-tokens 1500]
+        [--compact-tokens 8000] [--llm-ms 5] [--ms-per-1k-tokens 2]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from typing import Any, AsyncGenerator, Dict
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from multi_agent.session_store import SQLiteSessionService, content_tokens  # noqa: E402
+
+APP_NAME = "session_bench"
+USER_ID = "bench"
+
+
+def make_agent(args, prompt_sizes: list):
+    """Build an agent that fetches a report every turn, then answers."""
+    from google.adk.agents import LlmAgent
+    from google.adk.models.base_llm import BaseLlm
+    from google.adk.models.llm_response import LlmResponse
+    from google.genai import types
+
+    report = ("Quarterly figures for the region were reviewed line by line. " * 200)
+
+    def fetch_report(topic: str) -> dict:
+        """Return the full report on a topic."""
+        return {
+            "status": "success",
+            "topic": topic,
+            "content": report[: args.report_tokens * 4],
+            "answer": f"The report on {topic} shows steady growth.",
+        }
+
+    class CostedLlm(BaseLlm):
+        async def generate_content_async(self, llm_request, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+            tokens = sum(content_tokens(content) for content in llm_request.contents)
+            prompt_sizes.append(tokens)
+            await asyncio.sleep((args.llm_ms + args.ms_per_1k_tokens * tokens / 1000) / 1000)
+
+            last = llm_request.contents[-1]
+            if any(part.function_response for part in last.parts or []):
+                part = types.Part(text="Growth was steady.")
+            else:
+                topic = next((part.text for part in last.parts or [] if part.text), "")
+                part = types.Part(function_call=types.FunctionCall(name="fetch_report", args={"topic": topic}))
+            yield LlmResponse(content=types.Content(role="model", parts=[part]))
+
+    return LlmAgent(
+        name="bench",
+        model=CostedLlm(model="stub-costed"),
+        instruction="Fetch the report the user asks about and summarize it.",
+        tools=[fetch_report],
+    )
+
+
+async def converse(session_service, args) -> Dict[str, Any]:
+    """Run --turns user turns in one session and measure them."""
+    from google.adk.runners import Runner
+    from google.genai import types
+
+    prompt_sizes: list = []
+    runner = Runner(app_name=APP_NAME, agent=make_agent(args, prompt_sizes), session_service=session_service)
+    session = await session_service.create_session(app_name=APP_NAME, user_id=USER_ID)
+
+    latencies = []
+    for turn in range(args.turns):
+        started = time.perf_counter()
+        message = types.Content(role="user", parts=[types.Part(text=f"topic {turn}")])
+        async for _ in runner.run_async(user_id=USER_ID, session_id=session.id, new_message=message):
+            pass
+        latencies.append(time.perf_counter() - started)
+
+    return {
+        "session_id": session.id,
+        "mean_ms": sum(latencies) / len(latencies) * 1000,
+        "last_ms": latencies[-1] * 1000,
+        "last_prompt_tokens": prompt_sizes[-1],
+        "prompt_tokens": sum(prompt_sizes),
+    }
+
+
+def main():
+    """Run the session benchmark."""
+    parser = argparse.ArgumentParser(description="Latency and prompt size of long conversations per session service.")
+    parser.add_argument("--turns", type=int, default=40, help="User turns in the conversation")
+    parser.add_argument("--report-tokens", type=int, default=1500, help="Size of the tool result of every turn")
+    parser.add_argument("--compact-tokens", type=int, default=8000, help="Compaction threshold of the compact run")
+    parser.add_argument("--llm-ms", type=float, default=5.0, help="Fixed fake LLM latency per call")
+    parser.add_argument("--ms-per-1k-tokens", type=float, default=2.0, help="Fake LLM latency per 1000 prompt tokens")
+    args = parser.parse_args()
+    os.environ.setdefault("GOOGLE_API_KEY", "stub")
+
+    from google.adk.sessions import InMemorySessionService
+
+    print("Session Benchmark")
+    print("=" * 40)
+    print(f"Turns: {args.turns}  Report: {args.report_tokens} tokens  "
+          f"LLM: {args.llm_ms:g} ms + {args.ms_per_1k_tokens:g} ms/1k tokens")
+    print()
+    print(f"{'store':>8}{'mean ms':>9}{'last ms':>9}{'last prompt':>13}{'prompt tokens':>15}{'db KB':>8}{'compacted':>11}")
+
+    work_dir = tempfile.mkdtemp(prefix="adk-session-bench-")
+    runs = [
+        ("memory", lambda: InMemorySessionService()),
+        ("sqlite", lambda: SQLiteSessionService(os.path.join(work_dir, "plain.sqlite"), compact_tokens=0)),
+        ("compact", lambda: SQLiteSessionService(os.path.join(work_dir, "compact.sqlite"),
+                                                 compact_tokens=args.compact_tokens)),
+    ]
+    for name, build in runs:
+        service = build()
+        result = asyncio.run(converse(service, args))
+        db_kb, compacted, restart = "-", "-", ""
+        if isinstance(service, SQLiteSessionService):
+            metrics = service.session_metrics(APP_NAME, USER_ID, result["session_id"])
+            db_kb = f"{service.db_bytes() / 1024:.0f}"
+            compacted = f"{metrics['compacted_tool_results']}/{metrics['tool_results']}"
+            service.close()
+
+            # A restarted worker sees the whole conversation
+            reopened = SQLiteSessionService(service.path, compact_tokens=0)
+            session = asyncio.run(reopened.get_session(app_name=APP_NAME, user_id=USER_ID,
+                                                       session_id=result["session_id"]))
+            restart = f"  (after restart: {len(session.events)}/{metrics['events']} events)"
+            reopened.close()
+        print(f"{name:>8}{result['mean_ms']:>9.1f}{result['last_ms']:>9.1f}{result['last_prompt_tokens']:>13}"
+              f"{result['prompt_tokens']:>15}{db_kb:>8}{compacted:>11}{restart}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark for the agent packages.
+
+Measures the time it takes to import each agent package in a fresh Python
+process, which is what an ADK worker pays on a cold start.
+
+Usage:
+    python benchmarks/startup_benchmark.py [--runs 5] [package ...]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_PACKAGES = ["weather_agent", "multi_agent", "agents"]
+
+IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import {package}
+print(time.perf_counter() - start)
+"""
+
+
+def time_import(package: str) -> float:
+    """Import a package in a fresh interpreter and return the import time in seconds."""
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET.format(package=package)],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        last_line = (result.stderr.strip().splitlines() or ["unknown error"])[-1]
+        raise RuntimeError(last_line)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    """Run the startup benchmark."""
+    parser = argparse.ArgumentParser(description="Measure time-to-import for each agent package.")
+    parser.add_argument("packages", nargs="*", default=DEFAULT_PACKAGES)
+    parser.add_argument("--runs", type=int, default=5, help="Fresh imports per package")
+    args = parser.parse_args()
+
+    print("Agent Startup Benchmark")
+    print("=" * 40)
+
+    for package in args.packages:
+        timings = []
+        try:
+            for _ in range(args.runs):
+                timings.append(time_import(package))
+        except RuntimeError as e:
+            print(f"{package:<16} failed: {e}")
+            continue
+
+        print(
+            f"{package:<16} min {min(timings) * 1000:8.1f} ms   "
+            f"median {statistics.median(timings) * 1000:8.1f} ms   "
+            f"max {max(timings) * 1000:8.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,53 @@
 # multi_agent/agent.py
+import os
 from google.adk.agents import LlmAgent
+from multi_agent import tracing
 from multi_agent.conversation import root_agent as conversation_agent
-from multi_agent.rag_agent import root_agent as rag_agent
+from multi_agent.services import warm_up_from_env
 
-root_agent = LlmAgent(
+# RAG_STREAMING=1 swaps in the RAG agent that streams answers token by token
+if os.getenv("RAG_STREAMING", "").strip().lower() in ("1", "true", "yes"):
+    from multi_agent.rag_streaming import root_agent as rag_agent
+else:
+    from multi_agent.rag_agent import root_agent as rag_agent
+
+sub_agents = [conversation_agent, rag_agent]
+instruction = "Route user queries to the conversation agent and rag agent for internal document in the organization."
+
+# ADK_PARALLEL_RESEARCH=1 adds an agent that searches internal documents and
+# the web at the same time and merges the results
+if os.getenv("ADK_PARALLEL_RESEARCH", "").strip().lower() in ("1", "true", "yes"):
+    from multi_agent.parallel_research import root_agent as parallel_research_agent
+
+    sub_agents.append(parallel_research_agent)
+    instruction += (
+        " Route questions that need both internal documents and current information from the web"
+        " to the parallel research agent."
+    )
+
+coordinator_agent = LlmAgent(
     name="coordinator",
     model="gemini-2.0-flash",
     description="Routes tasks to appropriate agents.",
-    instruction="Route user queries to the conversation agent and rag agent for internal document in the organization.",
-    sub_agents=[conversation_agent, rag_agent],
-)
\ No newline at end of file
+    instruction=instruction,
+    sub_agents=sub_agents,
+    **tracing.agent_callbacks(),
+)
+
+# ADK_PREROUTER=1 puts a local classifier in front of the coordinator that
+# sends confident queries straight to the RAG or research agent
+if os.getenv("ADK_PREROUTER", "").strip().lower() in ("1", "true", "yes"):
+    from multi_agent.routing import PreRoutingAgent
+
+    root_agent = PreRoutingAgent(
+        name="router",
+        description="Routes queries locally when confident, otherwise through the coordinator.",
+        sub_agents=[coordinator_agent],
+        routes={"rag": rag_agent.name, "research": "researcher"},
+        **tracing.agent_callbacks(llm=False),
+    )
+else:
+    root_agent = coordinator_agent
+
+# Optionally build backend services in the background (ADK_SERVICE_WARMUP=background)
+warm_up_from_env()
@@ -0,0 +1,338 @@
+"""
+Answer cache for RAG responses.
+
+Tier one matches a normalized question exactly. Tier two (optional) reuses an
+answer whose question embedding is within a cosine distance of the new one.
+Exact-match answers can also be shared between worker processes through a
+SQLite file (RAG_CACHE_SHARED=1), so that a question answered by one worker
+is a cache hit on every other worker.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from multi_agent.services import cache_path
+
+EmbedFn = Callable[[str], List[float]]
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation."""
+    text = re.sub(r"\s+", " ", question.strip().lower())
+    return text.rstrip(" ?!.")
+
+
+def _unit_vector(embedding: List[float]) -> Optional[np.ndarray]:
+    """Return the embedding scaled to unit length, or None for a zero vector."""
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else None
+
+
+class SharedAnswerStore:
+    """Exact-match answers in a SQLite file shared by every worker process."""
+
+    def __init__(self, path: str, ttl_seconds: float = 600.0):
+        """
+        Args:
+            path: SQLite database file
+            ttl_seconds: Lifetime of a shared answer
+        """
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        # Bumped by invalidate() so that other processes drop their in-memory entries
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._conn.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('generation', 0)")
+
+    def generation(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT value FROM meta WHERE name = 'generation'").fetchone()[0]
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM answers WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key: str, value: Dict[str, Any], generation: Optional[int] = None) -> bool:
+        """
+        Store an answer unless the cache was invalidated since `generation`.
+
+        Returns:
+            True if the answer was stored
+        """
+        # SDK response objects stay in the process-local tier only
+        try:
+            payload = json.dumps({name: item for name, item in value.items() if name != "raw_response"})
+        except TypeError:
+            return False
+        with self._lock:
+            if generation is None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO answers (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, payload, time.time() + self.ttl_seconds),
+                )
+                return True
+            # The generation check and the write are one statement, so an invalidate() cannot slip between them
+            cursor = self._conn.execute(
+                "INSERT OR REPLACE INTO answers (key, value, expires_at) "
+                "SELECT ?, ?, ? WHERE (SELECT value FROM meta WHERE name = 'generation') = ?",
+                (key, payload, time.time() + self.ttl_seconds, generation),
+            )
+            return cursor.rowcount > 0
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute("DELETE FROM answers")
+            self._conn.execute("UPDATE meta SET value = value + 1 WHERE name = 'generation'")
+            self._conn.execute("COMMIT")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class AnswerCache:
+    """Size-bounded LRU cache with TTL, exact and semantic lookup."""
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        ttl_seconds: float = 600.0,
+        semantic_distance: float = 0.0,
+        embed_fn: Optional[EmbedFn] = None,
+        shared: Optional[SharedAnswerStore] = None,
+    ):
+        """
+        Args:
+            max_entries: Maximum cached answers before LRU eviction
+            ttl_seconds: Lifetime of a cached answer
+            semantic_distance: Max cosine distance for a semantic hit (0 disables the tier)
+            embed_fn: Function returning an embedding for a question
+            shared: Exact-match store shared with other processes (None keeps the cache process-local)
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.semantic_distance = semantic_distance
+        self.embed_fn = embed_fn
+        self.shared = shared
+        # Bumped by every invalidate(); answers generated before one are not stored
+        self._generation = shared.generation() if shared else 0
+
+        # key -> (expires_at, value, unit embedding)
+        self._entries: "OrderedDict[Tuple[str, int, str], Tuple[float, Any, Optional[List[float]]]]" = OrderedDict()
+        # unit embeddings computed during a missed lookup, reused by the following put
+        self._pending_embeddings: "OrderedDict[Tuple[str, int, str], np.ndarray]" = OrderedDict()
+        # (k, model) -> (keys, embedding matrix, expiry times) for the semantic tier
+        self._index: Dict[Tuple[int, str], Tuple[List[Tuple[str, int, str]], Any, Any]] = {}
+        self._lock = threading.Lock()
+
+        self.exact_hits = 0
+        self.shared_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.stale_puts = 0
+
+    @classmethod
+    def from_env(cls, embed_fn: Optional[EmbedFn] = None) -> "AnswerCache":
+        """Build a cache from RAG_CACHE_* environment variables."""
+        ttl_seconds = float(os.getenv("RAG_CACHE_TTL_SECONDS", "600"))
+        shared = None
+        if os.getenv("RAG_CACHE_SHARED", "").strip().lower() in ("1", "true", "yes"):
+            shared = SharedAnswerStore(os.getenv("RAG_CACHE_SHARED_PATH", cache_path("answer_cache.sqlite")), ttl_seconds)
+        return cls(
+            max_entries=int(os.getenv("RAG_CACHE_MAX_ENTRIES", "256")),
+            ttl_seconds=ttl_seconds,
+            semantic_distance=float(os.getenv("RAG_CACHE_SEMANTIC_DISTANCE", "0")),
+            embed_fn=embed_fn,
+            shared=shared,
+        )
+
+    @property
+    def semantic_enabled(self) -> bool:
+        return self.semantic_distance > 0 and self.embed_fn is not None
+
+    def get(self, question: str, k: int, model_name: str) -> Tuple[Optional[Any], Optional[str], int]:
+        """
+        Look up a cached answer.
+
+        Returns:
+            Tuple of (cached value or None, "exact" / "shared" / "semantic" / None,
+            cache generation to pass to `put` with an answer generated after a miss)
+        """
+        key = (normalize_question(question), k, model_name)
+        now = time.monotonic()
+
+        if self.shared is not None:
+            generation = self.shared.generation()
+            if generation != self._generation:
+                # Another process invalidated the cache
+                with self._lock:
+                    self._entries.clear()
+                    self._pending_embeddings.clear()
+                    self._index.clear()
+                    self._generation = generation
+
+        with self._lock:
+            generation = self._generation
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self.exact_hits += 1
+                    return entry[1], "exact", generation
+                del self._entries[key]
+                self._index.clear()
+
+        if self.shared is not None:
+            value = self.shared.get(json.dumps(key))
+            if value is not None:
+                self._store(key, value, generation)
+                with self._lock:
+                    self.shared_hits += 1
+                return value, "shared", generation
+
+        if not self.semantic_enabled:
+            with self._lock:
+                self.misses += 1
+            return None, None, generation
+
+        try:
+            embedding = self.embed_fn(question)
+        except Exception as e:
+            # The semantic tier is best effort; fall back to a normal miss
+            print(f"Warning: answer cache embedding failed: {e}")
+            with self._lock:
+                self.misses += 1
+            return None, None, generation
+
+        vector = _unit_vector(embedding)
+        with self._lock:
+            keys, matrix, expires = self._semantic_index(key[1:])
+
+        # One matrix-vector product over the cached questions, outside the lock
+        best_key = None
+        if keys and vector is not None:
+            distances = 1.0 - matrix @ vector
+            distances[expires <= now] = np.inf
+            best = int(np.argmin(distances))
+            if distances[best] <= self.semantic_distance:
+                best_key = keys[best]
+
+        with self._lock:
+            entry = self._entries.get(best_key) if best_key is not None else None
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(best_key)
+                self.semantic_hits += 1
+                return entry[1], "semantic", generation
+
+            self.misses += 1
+            if vector is not None:
+                self._pending_embeddings[key] = vector
+            while len(self._pending_embeddings) > self.max_entries:
+                self._pending_embeddings.popitem(last=False)
+
+        return None, None, generation
+
+    def put(self, question: str, k: int, model_name: str, value: Any, generation: Optional[int] = None) -> None:
+        """
+        Store an answer, evicting the least recently used entries if full.
+
+        Args:
+            generation: Generation returned by the `get` that missed. If the cache was
+                invalidated since (e.g. a document was added while the answer was being
+                generated), the answer may be stale and is dropped.
+        """
+        if self.max_entries <= 0:
+            return
+        key = (normalize_question(question), k, model_name)
+        if self.shared is not None and not self.shared.put(json.dumps(key), value, generation):
+            if generation is not None and self.shared.generation() != generation:
+                with self._lock:
+                    self.stale_puts += 1
+                return
+        self._store(key, value, generation)
+
+    def _store(self, key: Tuple[str, int, str], value: Any, generation: Optional[int] = None) -> None:
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                self.stale_puts += 1
+                return
+            embedding = self._pending_embeddings.pop(key, None)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value, embedding)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._index.clear()
+
+    def _semantic_index(self, scope: Tuple[int, str]) -> Tuple[List[Tuple[str, int, str]], Any, Any]:
+        """
+        Return (keys, unit embedding matrix, expiry times) of the entries for one (k, model).
+
+        Called with the lock held. Rebuilt only after the entries changed.
+        """
+        index = self._index.get(scope)
+        if index is None:
+            items = [(key, expires_at, embedding) for key, (expires_at, _, embedding) in self._entries.items()
+                     if key[1:] == scope and embedding is not None]
+            if items:
+                index = (
+                    [key for key, _, _ in items],
+                    np.vstack([embedding for _, _, embedding in items]),
+                    np.array([expires_at for _, expires_at, _ in items]),
+                )
+            else:
+                index = ([], None, None)
+            self._index[scope] = index
+        return index
+
+    def invalidate(self) -> None:
+        """Drop every cached answer, e.g. after the collection changed."""
+        with self._lock:
+            self._entries.clear()
+            self._pending_embeddings.clear()
+            self._index.clear()
+            self.invalidations += 1
+            self._generation += 1
+        if self.shared is not None:
+            self.shared.invalidate()
+            with self._lock:
+                self._generation = self.shared.generation()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current size."""
+        with self._lock:
+            hits = self.exact_hits + self.shared_hits + self.semantic_hits
+            lookups = hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "exact_hits": self.exact_hits,
+                "shared_hits": self.shared_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "stale_puts": self.stale_puts,
+            }
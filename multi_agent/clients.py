@@ -0,0 +1,60 @@
+"""
+Process-wide SDK clients shared by every agent.
+
+The Gemini SDK is configured once per process, and there is one Chroma client
+per backend kind, all held by the service registry so that every agent
+package loaded into the server reuses them. HTTP clients live in
+`multi_agent.http_clients`.
+"""
+
+import os
+from functools import partial
+from typing import Any
+
+from multi_agent.services import cache_path, registry
+
+CHROMA_KINDS = ("cloud", "persistent", "memory")
+
+
+def _configure_genai() -> Any:
+    import google.generativeai as genai
+
+    genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+    return genai
+
+
+def _build_chroma_client(kind: str) -> Any:
+    # Imported here so that importing the agent does not pay for chromadb
+    import chromadb
+
+    if kind == "cloud":
+        return chromadb.CloudClient(
+            api_key=os.getenv("CHROMA_API_KEY"),
+            tenant=os.getenv("CHROMA_TENANT"),
+            database=os.getenv("CHROMA_DATABASE")
+        )
+    if kind == "persistent":
+        return chromadb.PersistentClient(path=os.getenv("RAG_CHROMA_PATH", cache_path("chroma")))
+    return chromadb.EphemeralClient()
+
+
+def _backend_is(kind: str) -> bool:
+    return os.getenv("RAG_BACKEND", "cloud").strip().lower() == kind
+
+
+registry.register("genai", _configure_genai)
+for _kind in CHROMA_KINDS:
+    # Warm-up only connects the client RAG_BACKEND selects
+    registry.register(f"chroma:{_kind}", partial(_build_chroma_client, _kind), warm=partial(_backend_is, _kind))
+
+
+def get_genai() -> Any:
+    """Return the `google.generativeai` module, configured once per process."""
+    return registry.get("genai")
+
+
+def get_chroma_client(kind: str) -> Any:
+    """Return the shared Chroma client for "cloud", "persistent" or "memory"."""
+    if kind not in CHROMA_KINDS:
+        raise ValueError(f"Unknown RAG_BACKEND: {kind}")
+    return registry.get(f"chroma:{kind}")
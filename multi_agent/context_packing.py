@@ -0,0 +1,123 @@
+"""
+Token-budgeted context packing for the RAG prompt.
+
+Retrieved chunks are ordered by relevance, near-duplicates are dropped, and
+chunks are added until the token budget is spent.
+"""
+
+import math
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+def count_tokens(text: str) -> int:
+    """
+    Estimate the number of model tokens in `text` without a network call.
+
+    Every word or punctuation mark counts as one token, and long words count
+    as one token per four characters, which tracks SentencePiece-style
+    tokenizers closely enough for budgeting.
+    """
+    return sum(max(1, math.ceil(len(token) / 4)) for token in _TOKEN_PATTERN.findall(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut `text` so that it holds at most `max_tokens` estimated tokens."""
+    used = 0
+    for match in _TOKEN_PATTERN.finditer(text):
+        used += max(1, math.ceil(len(match.group()) / 4))
+        if used > max_tokens:
+            return text[:match.start()].rstrip() + " ..."
+    return text
+
+
+def _shingles(text: str, size: int = 3) -> set:
+    words = _WORD_PATTERN.findall(text.lower())
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _similarity(a: set, b: set) -> float:
+    """Overlap of two shingle sets relative to the smaller one."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / min(len(a), len(b))
+
+
+class ContextPacker:
+    """Select the most relevant, non-redundant chunks within a token budget."""
+
+    def __init__(self, token_budget: int = 2000, duplicate_threshold: float = 0.8, min_chunk_tokens: int = 50):
+        """
+        Args:
+            token_budget: Maximum estimated tokens of retrieved context
+            duplicate_threshold: Shingle overlap above which a chunk is a near-duplicate
+            min_chunk_tokens: Smallest truncated chunk worth including when the budget runs low
+        """
+        self.token_budget = token_budget
+        self.duplicate_threshold = duplicate_threshold
+        self.min_chunk_tokens = min_chunk_tokens
+
+    @classmethod
+    def from_env(cls) -> "ContextPacker":
+        """Build a packer from RAG_CONTEXT_* environment variables."""
+        return cls(
+            token_budget=int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", "2000")),
+            duplicate_threshold=float(os.getenv("RAG_CONTEXT_DUPLICATE_THRESHOLD", "0.8")),
+        )
+
+    def pack(self, documents: List[str], distances: Optional[List[float]] = None) -> Tuple[List[str], Dict[str, Any]]:
+        """
+        Pack retrieved documents into the context.
+
+        Args:
+            documents: Retrieved chunks
+            distances: Matching vector distances (lower is more relevant)
+
+        Returns:
+            Tuple of (selected chunks in relevance order, packing stats)
+        """
+        order = list(range(len(documents)))
+        if distances and len(distances) == len(documents):
+            order.sort(key=lambda i: distances[i])
+
+        selected: List[str] = []
+        selected_shingles: List[set] = []
+        used_tokens = 0
+        duplicates = 0
+        over_budget = 0
+
+        for index in order:
+            document = documents[index]
+            if not document:
+                continue
+            shingles = _shingles(document)
+            if any(_similarity(shingles, other) >= self.duplicate_threshold for other in selected_shingles):
+                duplicates += 1
+                continue
+
+            tokens = count_tokens(document)
+            remaining = self.token_budget - used_tokens
+            if tokens > remaining:
+                if remaining < self.min_chunk_tokens:
+                    over_budget += 1
+                    continue
+                document = truncate_to_tokens(document, remaining)
+                tokens = count_tokens(document)
+
+            selected.append(document)
+            selected_shingles.append(shingles)
+            used_tokens += tokens
+
+        return selected, {
+            "candidates": len(documents),
+            "selected": len(selected),
+            "duplicates_dropped": duplicates,
+            "over_budget_dropped": over_budget,
+            "context_tokens": used_tokens,
+        }
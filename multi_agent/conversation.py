@@ -1,5 +1,6 @@
 # multi_agent/conversation.py
 from google.adk.agents import Agent
+from multi_agent import tracing
 from multi_agent.researcher import root_agent as researcher_agent
 # Temporarily disabled RAG agent due to ChromaDB/OpenTelemetry dependency conflict
 # from multi_agent.rag_agent import root_agent as rag_agent
@@ -10,4 +11,5 @@ root_agent = Agent(
     description="Handles user queries by delegating to other agents.",
     instruction="You are a friendly assistant. Delegate research tasks to the researcher agent for web searches and information gathering.",
     sub_agents=[researcher_agent],  # rag_agent temporarily disabled
+    **tracing.agent_callbacks(),
 )
\ No newline at end of file
@@ -0,0 +1,236 @@
+"""
+Client-side embedding layer with batching and a persistent cache.
+
+Texts are embedded in batches of a configurable size, and every vector is
+kept in a size-bounded SQLite cache as compact float32 bytes, keyed by a hash
+of the embedding namespace (model and task) and the text. Repeated queries
+and re-ingested documents are served from the cache instead of being
+embedded again.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from multi_agent.ingestion import content_hash
+from multi_agent.services import cache_path, registry
+
+EmbedFn = Callable[[List[str]], List[List[float]]]
+
+
+class EmbeddingCache:
+    """Size-bounded SQLite cache of float32 embeddings keyed by content hash."""
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024):
+        """
+        Args:
+            path: SQLite database file
+            max_bytes: Total vector bytes kept before LRU eviction (0 disables the cache)
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_access ON embeddings (last_access)")
+        self._size = self._conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls) -> "EmbeddingCache":
+        """Build a cache from RAG_EMBEDDING_CACHE_* environment variables."""
+        return cls(
+            path=os.getenv("RAG_EMBEDDING_CACHE_PATH", cache_path("embedding_cache.sqlite")),
+            max_bytes=int(float(os.getenv("RAG_EMBEDDING_CACHE_MB", "256")) * 1024 * 1024),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """Return {key: vector} for the cached keys."""
+        if not self.enabled or not keys:
+            return {}
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            try:
+                # Stay below SQLite's bound-parameter limit
+                for start in range(0, len(keys), 500):
+                    part = keys[start:start + 500]
+                    placeholders = ",".join("?" * len(part))
+                    for key, vector in self._conn.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", part
+                    ):
+                        found[key] = np.frombuffer(vector, dtype=np.float32).tolist()
+                if found:
+                    now = time.time()
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_access = ? WHERE key = ?", [(now, key) for key in found]
+                    )
+            except sqlite3.Error as e:
+                # A broken or locked cache must never break embedding
+                print(f"Warning: embedding cache lookup failed: {e}")
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]) -> None:
+        """Store vectors by key."""
+        if not self.enabled or not items:
+            return
+        now = time.time()
+        rows = [(key, sqlite3.Binary(np.asarray(vector, dtype=np.float32).tobytes()), now) for key, vector in items.items()]
+        with self._lock:
+            try:
+                self._conn.execute("BEGIN")
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)", rows
+                )
+                self._conn.execute("COMMIT")
+                self._size += sum(len(row[1]) for row in rows)
+                if self._size > self.max_bytes:
+                    self._evict()
+            except sqlite3.Error as e:
+                print(f"Warning: embedding cache store failed: {e}")
+
+    def _evict(self) -> None:
+        """Drop least recently used vectors until the cache fits in max_bytes (caller holds the lock)."""
+        self._size = self._conn.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()[0]
+        # Evict down to 90% so that eviction does not run on every store
+        target = int(self.max_bytes * 0.9)
+        while self._size > target:
+            rows = self._conn.execute(
+                "SELECT key, LENGTH(vector) FROM embeddings ORDER BY last_access LIMIT 256"
+            ).fetchall()
+            if not rows:
+                break
+            evicted = []
+            for key, size in rows:
+                if self._size <= target:
+                    break
+                evicted.append((key,))
+                self._size -= size
+            self._conn.executemany("DELETE FROM embeddings WHERE key = ?", evicted)
+            self.evictions += len(evicted)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return {"entries": entries, "size_bytes": self._size, "max_bytes": self.max_bytes, "evictions": self.evictions}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+registry.register("embedding_cache", EmbeddingCache.from_env)
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Return the shared on-disk embedding cache."""
+    return registry.get("embedding_cache")
+
+
+# Live embedders, for process-wide metrics
+_embedders: "weakref.WeakSet[Embedder]" = weakref.WeakSet()
+
+
+class Embedder:
+    """Batching, caching wrapper around an embedding function."""
+
+    def __init__(self, embed_fn: EmbedFn, namespace: str, batch_size: int = 100, cache: Optional[EmbeddingCache] = None):
+        """
+        Args:
+            embed_fn: Embeds a list of texts
+            namespace: Identifies the model and task; part of every cache key
+            batch_size: Maximum texts per embed_fn call
+            cache: Persistent embedding cache (None disables caching)
+        """
+        self.embed_fn = embed_fn
+        self.namespace = namespace
+        self.batch_size = max(1, batch_size)
+        self.cache = cache
+        self._lock = threading.Lock()
+
+        self.texts = 0
+        self.cache_hits = 0
+        self.embedded = 0
+        self.batches = 0
+        self.embed_seconds = 0.0
+        _embedders.add(self)
+
+    @classmethod
+    def from_env(cls, embed_fn: EmbedFn, namespace: str) -> "Embedder":
+        """Build an embedder using RAG_EMBED_BATCH_SIZE and the shared embedding cache."""
+        return cls(
+            embed_fn,
+            namespace,
+            batch_size=int(os.getenv("RAG_EMBED_BATCH_SIZE", "100")),
+            cache=get_embedding_cache(),
+        )
+
+    def __call__(self, texts: List[str]) -> List[List[float]]:
+        return self.embed(texts)
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts, serving repeats from the cache and batching the rest."""
+        keys = [content_hash(f"{self.namespace}\n{text}") for text in texts]
+        vectors: Dict[str, List[float]] = self.cache.get_many(list(set(keys))) if self.cache else {}
+        hits = sum(1 for key in keys if key in vectors)
+
+        # Embed each distinct missing text once
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                missing.setdefault(key, text)
+
+        missing_keys = list(missing)
+        for start in range(0, len(missing_keys), self.batch_size):
+            batch_keys = missing_keys[start:start + self.batch_size]
+            started = time.perf_counter()
+            batch_vectors = self.embed_fn([missing[key] for key in batch_keys])
+            elapsed = time.perf_counter() - started
+
+            new = {key: [float(value) for value in vector] for key, vector in zip(batch_keys, batch_vectors)}
+            vectors.update(new)
+            if self.cache:
+                self.cache.put_many(new)
+            with self._lock:
+                self.batches += 1
+                self.embedded += len(batch_keys)
+                self.embed_seconds += elapsed
+
+        with self._lock:
+            self.texts += len(texts)
+            self.cache_hits += hits
+        return [vectors[key] for key in keys]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "texts": self.texts,
+                "cache_hits": self.cache_hits,
+                "hit_rate": round(self.cache_hits / self.texts, 3) if self.texts else 0.0,
+                "embedded": self.embedded,
+                "batches": self.batches,
+                "embeddings_per_second": round(self.embedded / self.embed_seconds, 1) if self.embed_seconds else 0.0,
+            }
+
+
+def embedding_stats() -> Dict[str, Any]:
+    """Return metrics for every live embedder and the shared cache."""
+    stats: Dict[str, Any] = {"embedders": {embedder.namespace: embedder.stats() for embedder in list(_embedders)}}
+    if registry.is_ready("embedding_cache"):
+        stats["cache"] = get_embedding_cache().stats()
+    return stats
@@ -0,0 +1,102 @@
+"""
+Streaming, bounded-memory text extraction from HTML.
+
+The extractor is fed the response body chunk by chunk, skips script/style and
+head content, and reports `done` as soon as it has collected enough text so the
+download can be stopped early.
+"""
+
+import codecs
+import re
+from html.parser import HTMLParser
+from typing import List
+
+# Elements whose content is never visible text
+SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "head"}
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class StreamingTextExtractor(HTMLParser):
+    """Incrementally strip HTML tags and collect up to `max_chars` of text."""
+
+    def __init__(self, max_chars: int = 2000, encoding: str = "utf-8"):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.done = False
+        self.bytes_fed = 0
+
+        try:
+            self._decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        except LookupError:
+            self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self._parts: List[str] = []
+        self._length = 0
+        self._skip_depth = 0
+
+    def feed_bytes(self, chunk: bytes) -> None:
+        """Feed a chunk of the raw response body."""
+        if self.done:
+            return
+        self.bytes_fed += len(chunk)
+        self.feed(self._decoder.decode(chunk))
+
+    def close(self) -> None:
+        if not self.done:
+            self.feed(self._decoder.decode(b"", final=True))
+        super().close()
+
+    def handle_starttag(self, tag: str, attrs) -> None:
+        if tag == "body":
+            # Pages that never close <head> still have a visible body
+            self._skip_depth = 0
+        elif tag in SKIP_TAGS:
+            self._skip_depth += 1
+
+    def handle_startendtag(self, tag: str, attrs) -> None:
+        # Self-closing tags (<br/>, <svg/>) never open a skipped block
+        pass
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_data(self, data: str) -> None:
+        if self._skip_depth or self.done:
+            return
+        text = _WHITESPACE.sub(" ", data).strip()
+        if not text:
+            return
+        self._parts.append(text)
+        self._length += len(text) + 1
+        if self._length > self.max_chars:
+            self.done = True
+
+    def text(self) -> str:
+        """Return the collected text, cut to `max_chars` with a trailing ellipsis."""
+        content = " ".join(self._parts)
+        if len(content) > self.max_chars:
+            content = content[:self.max_chars] + "..."
+        return content
+
+
+def extract_text(body: bytes, max_chars: int = 2000, encoding: str = "utf-8", chunk_size: int = 65536) -> str:
+    """Extract visible text from a complete HTML body."""
+    extractor = StreamingTextExtractor(max_chars=max_chars, encoding=encoding)
+    for start in range(0, len(body), chunk_size):
+        extractor.feed_bytes(body[start:start + chunk_size])
+        if extractor.done:
+            break
+    extractor.close()
+    return extractor.text()
+
+
+def charset_from_headers(headers: dict, default: str = "utf-8") -> str:
+    """Return the charset declared in a Content-Type header."""
+    match = re.search(r"charset=([\w-]+)", headers.get("content-type", ""), re.I)
+    return match.group(1) if match else default
+
+
+def make_extractor(headers: dict, max_chars: int = 2000) -> StreamingTextExtractor:
+    """Build an extractor for a response with the given (lowercase) headers."""
+    return StreamingTextExtractor(max_chars=max_chars, encoding=charset_from_headers(headers))
@@ -0,0 +1,388 @@
+"""
+On-disk HTTP response cache for the web tools.
+
+Responses are stored in SQLite so that threads and worker processes can share
+them. Freshness follows Cache-Control / Expires, stale entries are revalidated
+with If-None-Match / If-Modified-Since, and the cache is size-bounded with
+least-recently-used eviction. Entries are keyed by URL alone, so responses
+marked private or that vary on request headers are never stored.
+"""
+
+import asyncio
+import email.utils
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from multi_agent.services import cache_path
+
+
+def parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    """Parse a Cache-Control header into a dict of lowercase directives."""
+    directives: Dict[str, Optional[str]] = {}
+    for part in (value or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, arg = part.partition("=")
+        directives[name.strip().lower()] = arg.strip().strip('"') or None
+    return directives
+
+
+def freshness_lifetime(headers: Dict[str, str], now: Optional[float] = None) -> float:
+    """Return how many seconds a response may be served without revalidation."""
+    directives = parse_cache_control(headers.get("cache-control"))
+    if "no-cache" in directives:
+        return 0.0
+    for name in ("s-maxage", "max-age"):
+        if directives.get(name):
+            try:
+                return max(0.0, float(directives[name]))
+            except ValueError:
+                return 0.0
+    expires = headers.get("expires")
+    if expires:
+        try:
+            expires_at = email.utils.parsedate_to_datetime(expires).timestamp()
+        except (TypeError, ValueError):
+            return 0.0
+        return max(0.0, expires_at - (now or time.time()))
+    return 0.0
+
+
+def _varies(headers: Dict[str, str]) -> bool:
+    """Return True if the response depends on request headers other than Accept-Encoding."""
+    # Clients decode the body before it reaches the cache, so Accept-Encoding is harmless
+    fields = {field.strip().lower() for field in headers.get("vary", "").split(",")}
+    return bool(fields - {"", "accept-encoding"})
+
+
+class CachedResponse:
+    """A response stored in the HTTP cache."""
+
+    def __init__(self, url: str, status: int, headers: Dict[str, str], body: bytes, expires_at: float):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.expires_at = expires_at
+
+    def is_fresh(self) -> bool:
+        return self.expires_at > time.time()
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """Request headers used to revalidate this response."""
+        headers = {}
+        if self.headers.get("etag"):
+            headers["If-None-Match"] = self.headers["etag"]
+        if self.headers.get("last-modified"):
+            headers["If-Modified-Since"] = self.headers["last-modified"]
+        return headers
+
+
+class HTTPCache:
+    """Size-bounded SQLite cache of GET responses keyed by URL."""
+
+    def __init__(self, path: str, max_bytes: int = 100 * 1024 * 1024, max_entry_bytes: int = 5 * 1024 * 1024):
+        """
+        Args:
+            path: SQLite database file
+            max_bytes: Total body bytes kept before LRU eviction
+            max_entry_bytes: Larger responses are never cached
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls) -> "HTTPCache":
+        """Build a cache from HTTP_CACHE_* environment variables."""
+        return cls(
+            path=os.getenv("HTTP_CACHE_PATH", cache_path("http_cache.sqlite")),
+            max_bytes=int(float(os.getenv("HTTP_CACHE_MAX_MB", "100")) * 1024 * 1024),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def lookup(self, url: str) -> Optional[CachedResponse]:
+        """Return the cached response for `url`, fresh or stale, or None."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    "SELECT status, headers, body, expires_at FROM responses WHERE url = ?", (url,)
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute("UPDATE responses SET last_access = ? WHERE url = ?", (time.time(), url))
+            except sqlite3.Error as e:
+                # A broken or locked cache must never break fetching
+                print(f"Warning: HTTP cache lookup failed: {e}")
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+        status, headers, body, expires_at = row
+        return CachedResponse(url, status, json.loads(headers), bytes(body), expires_at)
+
+    def record_hit(self) -> None:
+        with self._lock:
+            self.hits += 1
+
+    def is_storable(self, status: int, headers: Dict[str, str]) -> bool:
+        """Return True if a response with these (lowercase) headers may be cached."""
+        if not self.enabled or status != 200:
+            return False
+        directives = parse_cache_control(headers.get("cache-control"))
+        if "no-store" in directives or "private" in directives:
+            return False
+        if _varies(headers):
+            return False
+        try:
+            if int(headers.get("content-length", "0")) > self.max_entry_bytes:
+                return False
+        except ValueError:
+            pass
+        # Responses that are neither fresh nor revalidatable would never be reused
+        return freshness_lifetime(headers) > 0 or bool(headers.get("etag") or headers.get("last-modified"))
+
+    def store(self, url: str, status: int, headers: Dict[str, str], body: bytes) -> bool:
+        """
+        Store a response if its headers allow it.
+
+        Returns:
+            True if the response was stored
+        """
+        headers = {name.lower(): value for name, value in headers.items()}
+        if not self.is_storable(status, headers) or len(body) > self.max_entry_bytes:
+            return False
+
+        lifetime = freshness_lifetime(headers)
+
+        kept = {name: headers[name] for name in ("content-type", "cache-control", "expires", "etag", "last-modified") if name in headers}
+        now = time.time()
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (url, status, headers, body, size, expires_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (url, status, json.dumps(kept), sqlite3.Binary(body), len(body), now + lifetime, now),
+                )
+                self._evict()
+            except sqlite3.Error as e:
+                print(f"Warning: HTTP cache store failed: {e}")
+                return False
+            self.stores += 1
+        return True
+
+    def refresh(self, cached: CachedResponse, headers: Dict[str, str]) -> CachedResponse:
+        """Update a cached entry after a 304 Not Modified response."""
+        updated = dict(cached.headers)
+        for name, value in headers.items():
+            if name.lower() in ("cache-control", "expires", "etag", "last-modified", "vary"):
+                updated[name.lower()] = value
+        cached.headers = updated
+        cached.expires_at = time.time() + freshness_lifetime(updated)
+        with self._lock:
+            try:
+                if not self.is_storable(cached.status, updated):
+                    # The origin has since marked the response private or varying
+                    self._conn.execute("DELETE FROM responses WHERE url = ?", (cached.url,))
+                else:
+                    self._conn.execute(
+                        "UPDATE responses SET headers = ?, expires_at = ?, last_access = ? WHERE url = ?",
+                        (json.dumps(updated), cached.expires_at, time.time(), cached.url),
+                    )
+            except sqlite3.Error as e:
+                print(f"Warning: HTTP cache refresh failed: {e}")
+            self.revalidations += 1
+        return cached
+
+    def _evict(self) -> None:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        while total > self.max_bytes:
+            row = self._conn.execute("SELECT url, size FROM responses ORDER BY last_access LIMIT 1").fetchone()
+            if row is None:
+                break
+            self._conn.execute("DELETE FROM responses WHERE url = ?", (row[0],))
+            total -= row[1]
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current size."""
+        with self._lock:
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+            return {
+                "entries": entries,
+                "bytes": size,
+                "hits": self.hits,
+                "revalidations": self.revalidations,
+                "misses": self.misses,
+                "stores": self.stores,
+                "evictions": self.evictions,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# Bytes read from the network per iteration while streaming a body
+CHUNK_SIZE = 64 * 1024
+
+
+class _BodyCollector:
+    """Feed a streamed body to a sink while keeping a copy for the cache."""
+
+    def __init__(self, cache: HTTPCache, url: str, status: int, headers: Dict[str, str], sink: Any, max_bytes: int):
+        self.cache = cache
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.sink = sink
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+        self.truncated = False
+        self.buffer: Optional[bytearray] = bytearray() if cache.is_storable(status, headers) else None
+
+    def feed(self, chunk: bytes) -> bool:
+        """Consume a chunk and return False once reading can stop."""
+        if self.bytes_read + len(chunk) > self.max_bytes:
+            chunk = chunk[:self.max_bytes - self.bytes_read]
+            self.truncated = True
+        self.bytes_read += len(chunk)
+
+        if not self.sink.done:
+            self.sink.feed_bytes(chunk)
+        if self.buffer is not None:
+            if len(self.buffer) + len(chunk) > self.cache.max_entry_bytes:
+                self.buffer = None
+            else:
+                self.buffer.extend(chunk)
+
+        if self.truncated:
+            return False
+        # Keep downloading only while the sink wants more or the cache needs the full body
+        return self.buffer is not None or not self.sink.done
+
+    def finish(self) -> Any:
+        self.sink.close()
+        if self.buffer is not None and not self.truncated:
+            self.cache.store(self.url, self.status, self.headers, bytes(self.buffer))
+        return self.sink
+
+
+def _feed_cached(cached: CachedResponse, make_sink: Callable[[Dict[str, str]], Any]) -> Any:
+    sink = make_sink(cached.headers)
+    for start in range(0, len(cached.body), CHUNK_SIZE):
+        if sink.done:
+            break
+        sink.feed_bytes(cached.body[start:start + CHUNK_SIZE])
+    sink.close()
+    return sink
+
+
+def fetch_through_cache(
+    session: Any,
+    cache: HTTPCache,
+    url: str,
+    timeout: float,
+    make_sink: Callable[[Dict[str, str]], Any],
+    max_bytes: int,
+) -> Tuple[Any, str, int, bool]:
+    """
+    Stream a GET response through the cache into a sink, using a `requests` session.
+
+    The sink is built from the lowercase response headers by `make_sink` and
+    must provide `feed_bytes(chunk)`, `close()` and a `done` flag. Reading
+    stops at `max_bytes`, or as soon as the sink is done unless the full body
+    is needed to populate the cache.
+
+    Returns:
+        Tuple of (sink, source, bytes_read, truncated) where source is
+        "cache", "revalidated" or "network"
+    """
+    cached = cache.lookup(url)
+    if cached is not None and cached.is_fresh():
+        cache.record_hit()
+        return _feed_cached(cached, make_sink), "cache", len(cached.body), False
+
+    headers = cached.conditional_headers() if cached is not None else {}
+    with session.get(url, headers=headers, timeout=timeout, stream=True) as response:
+        if cached is not None and response.status_code == 304:
+            cached = cache.refresh(cached, dict(response.headers))
+            return _feed_cached(cached, make_sink), "revalidated", len(cached.body), False
+
+        response.raise_for_status()
+        response_headers = {name.lower(): value for name, value in response.headers.items()}
+        collector = _BodyCollector(cache, url, response.status_code, response_headers, make_sink(response_headers), max_bytes)
+        for chunk in response.iter_content(CHUNK_SIZE):
+            if not collector.feed(chunk):
+                break
+        return collector.finish(), "network", collector.bytes_read, collector.truncated
+
+
+async def fetch_through_cache_async(
+    client: Any,
+    cache: HTTPCache,
+    url: str,
+    make_sink: Callable[[Dict[str, str]], Any],
+    max_bytes: int,
+) -> Tuple[Any, str, int, bool]:
+    """
+    Async version of `fetch_through_cache` using an `httpx.AsyncClient`.
+
+    Cache reads and writes (SQLite) and replaying cached bodies into the sink
+    run in worker threads, so they do not block the event loop.
+    """
+    cached = await asyncio.to_thread(cache.lookup, url)
+    if cached is not None and cached.is_fresh():
+        await asyncio.to_thread(cache.record_hit)
+        return await asyncio.to_thread(_feed_cached, cached, make_sink), "cache", len(cached.body), False
+
+    headers = cached.conditional_headers() if cached is not None else {}
+    async with client.stream("GET", url, headers=headers) as response:
+        if cached is not None and response.status_code == 304:
+            cached = await asyncio.to_thread(cache.refresh, cached, dict(response.headers))
+            return await asyncio.to_thread(_feed_cached, cached, make_sink), "revalidated", len(cached.body), False
+
+        response.raise_for_status()
+        response_headers = {name.lower(): value for name, value in response.headers.items()}
+        collector = _BodyCollector(cache, url, response.status_code, response_headers, make_sink(response_headers), max_bytes)
+        async for chunk in response.aiter_bytes(CHUNK_SIZE):
+            if not collector.feed(chunk):
+                break
+        return await asyncio.to_thread(collector.finish), "network", collector.bytes_read, collector.truncated
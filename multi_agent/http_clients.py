@@ -0,0 +1,150 @@
+"""
+Shared, connection-pooled HTTP clients for the agent tools.
+
+The synchronous tools share one `requests` session, the async tools share one
+`httpx.AsyncClient` per event loop, and both go through the on-disk HTTP cache.
+Both reject cookies: the clients are shared by every user of the process, so
+a cookie set for one user's request must not be sent with another's.
+"""
+
+import asyncio
+import http.cookiejar
+import os
+import threading
+import weakref
+from typing import Dict, Optional
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from multi_agent.http_cache import HTTPCache
+from multi_agent.services import registry
+
+# Browser-like headers used when fetching web pages
+DEFAULT_HEADERS: Dict[str, str] = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# Default timeout in seconds for outgoing HTTP requests
+DEFAULT_TIMEOUT = float(os.getenv("HTTP_TIMEOUT_SECONDS", "10"))
+
+
+def _no_cookies() -> http.cookiejar.CookiePolicy:
+    """A cookie policy that accepts no cookies."""
+    return http.cookiejar.DefaultCookiePolicy(allowed_domains=[])
+
+
+def _build_session() -> requests.Session:
+    """Build a connection-pooled session with a per-host connection limit."""
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    session.cookies.set_policy(_no_cookies())
+    adapter = HTTPAdapter(
+        pool_connections=int(os.getenv("HTTP_POOL_HOSTS", "32")),
+        pool_maxsize=int(os.getenv("HTTP_MAX_PER_HOST", "8")),
+        pool_block=True,  # wait for a free connection instead of exceeding the per-host limit
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _session_connections(session: requests.Session) -> int:
+    """Count the open pooled connections of a `requests` session."""
+    count = 0
+    for adapter in session.adapters.values():
+        pools = getattr(getattr(adapter, "poolmanager", None), "pools", None)
+        if pools is None:
+            continue
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None and pool.pool is not None:
+                count += sum(1 for conn in list(pool.pool.queue) if conn is not None and conn.sock is not None)
+    return count
+
+
+registry.register("http_session", _build_session, probe=_session_connections)
+registry.register("http_cache", HTTPCache.from_env)
+
+
+def get_session() -> requests.Session:
+    """Return the shared, connection-pooled `requests` session."""
+    return registry.get("http_session")
+
+
+def get_http_cache() -> HTTPCache:
+    """Return the shared on-disk HTTP response cache."""
+    return registry.get("http_cache")
+
+
+class AsyncClientPool:
+    """One pooled `httpx.AsyncClient` per event loop (httpx clients are bound to their loop)."""
+
+    def __init__(self):
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def get(self, loop: asyncio.AbstractEventLoop) -> httpx.AsyncClient:
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            with self._lock:
+                client = self._clients.get(loop)
+                if client is None or client.is_closed:
+                    client = httpx.AsyncClient(
+                        headers=DEFAULT_HEADERS,
+                        timeout=DEFAULT_TIMEOUT,
+                        follow_redirects=True,
+                        limits=httpx.Limits(
+                            max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "100")),
+                            max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE", "20")),
+                        ),
+                    )
+                    client.cookies.jar.set_policy(_no_cookies())
+                    self._clients[loop] = client
+        return client
+
+    def pop(self, loop: asyncio.AbstractEventLoop) -> Optional[httpx.AsyncClient]:
+        with self._lock:
+            return self._clients.pop(loop, None)
+
+    def open_connections(self) -> int:
+        count = 0
+        for client in list(self._clients.values()):
+            pool = getattr(getattr(client, "_transport", None), "_pool", None)
+            count += len(getattr(pool, "connections", []))
+        return count
+
+    def close(self) -> None:
+        """Close every client whose event loop can still run the shutdown."""
+        with self._lock:
+            clients = list(self._clients.items())
+            self._clients.clear()
+        for loop, client in clients:
+            if client.is_closed or loop.is_closed():
+                continue
+            if loop.is_running():
+                # Closed on its own loop, from whichever thread calls close()
+                asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+            else:
+                loop.run_until_complete(client.aclose())
+
+
+registry.register("async_http", AsyncClientPool)
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Return the pooled async HTTP client for the running event loop.
+
+    Must be called from inside a coroutine. The pool size is controlled by
+    HTTP_MAX_CONNECTIONS and HTTP_MAX_KEEPALIVE.
+    """
+    return registry.get("async_http").get(asyncio.get_running_loop())
+
+
+async def close_async_client() -> None:
+    """Close the async HTTP client of the running event loop, if any."""
+    client = registry.get("async_http").pop(asyncio.get_running_loop())
+    if client is not None:
+        await client.aclose()
@@ -0,0 +1,367 @@
+"""
+Hybrid keyword + vector retrieval for the RAG service.
+
+A BM25 inverted index is kept in SQLite next to the vector backend and
+updated on every upsert. Documents already in the vector backend (e.g. an
+existing Chroma collection) are indexed once, in a background thread started
+when the retriever is built; until that finishes, queries use the vector
+results alone.
+Queries run against both, the two rankings are merged with reciprocal rank
+fusion (RRF), optionally reranked by query-term coverage, and filtered by a
+relevance threshold so that the RAG service can skip generation when nothing
+relevant was found.
+
+The vector distance threshold (RAG_RELEVANCE_MAX_DISTANCE) is off by default:
+distances are not comparable across backends (Chroma collections default to
+squared L2, LocalVectorIndex uses cosine distance) or embedding models, so no
+single value is safe to ship. Calibrate it per deployment from the distances
+returned for known-relevant and known-irrelevant questions. The BM25 threshold
+defaults to 0, which only drops keyword hits that share no term with the query.
+"""
+
+import heapq
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from multi_agent.ingestion import content_hash
+from multi_agent.retrieval import RetrievalBackend
+from multi_agent.services import cache_path
+
+_TERM_PATTERN = re.compile(r"\w+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have how i in is it its of on or that the this to was what when "
+    "where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens with common stopwords removed."""
+    return [term for term in _TERM_PATTERN.findall(text.lower()) if term not in STOPWORDS]
+
+
+class BM25Index:
+    """Incrementally maintained BM25 index stored in SQLite."""
+
+    def __init__(self, path: str, k1: float = 1.2, b: float = 0.75):
+        """
+        Args:
+            path: SQLite database file
+            k1: Term-frequency saturation
+            b: Document length normalization
+        """
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS docs (id TEXT PRIMARY KEY, document TEXT NOT NULL, "
+            "metadata TEXT NOT NULL, length INTEGER NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS postings (term TEXT NOT NULL, id TEXT NOT NULL, tf INTEGER NOT NULL, "
+            "PRIMARY KEY (term, id)) WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS postings_by_id ON postings (id)")
+        self._docs, self._total_length = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM docs"
+        ).fetchone()
+
+    def add(self, ids: List[str], documents: List[str], metadatas: Optional[List[Dict[str, Any]]] = None) -> None:
+        """Index documents, replacing any earlier version with the same ID."""
+        metadatas = metadatas or [{} for _ in ids]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for doc_id, document, metadata in zip(ids, documents, metadatas):
+                    old = self._conn.execute("SELECT length FROM docs WHERE id = ?", (doc_id,)).fetchone()
+                    if old is not None:
+                        self._conn.execute("DELETE FROM postings WHERE id = ?", (doc_id,))
+                        self._docs -= 1
+                        self._total_length -= old[0]
+
+                    terms = tokenize(document)
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO docs (id, document, metadata, length) VALUES (?, ?, ?, ?)",
+                        (doc_id, document, json.dumps(metadata or {}), len(terms)),
+                    )
+                    self._conn.executemany(
+                        "INSERT INTO postings (term, id, tf) VALUES (?, ?, ?)",
+                        [(term, doc_id, tf) for term, tf in Counter(terms).items()],
+                    )
+                    self._docs += 1
+                    self._total_length += len(terms)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, float]]:
+        """Return up to `k` (document ID, BM25 score) pairs, best first."""
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+
+        scores: Dict[str, float] = {}
+        with self._lock:
+            if not self._docs:
+                return []
+            average_length = self._total_length / self._docs
+            for term in terms:
+                rows = self._conn.execute(
+                    "SELECT p.id, p.tf, d.length FROM postings p JOIN docs d ON d.id = p.id WHERE p.term = ?",
+                    (term,),
+                ).fetchall()
+                if not rows:
+                    continue
+                idf = math.log(1 + (self._docs - len(rows) + 0.5) / (len(rows) + 0.5))
+                for doc_id, tf, length in rows:
+                    norm = self.k1 * (1 - self.b + self.b * length / average_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def get(self, ids: List[str]) -> Dict[str, Tuple[str, Dict[str, Any]]]:
+        """Return {id: (document, metadata)} for the stored IDs."""
+        if not ids:
+            return {}
+        placeholders = ",".join("?" * len(ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, document, metadata FROM docs WHERE id IN ({placeholders})", ids
+            ).fetchall()
+        return {doc_id: (document, json.loads(metadata)) for doc_id, document, metadata in rows}
+
+    def count(self) -> int:
+        return self._docs
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """Merge ranked ID lists; each list contributes 1 / (k + rank) per ID."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def term_coverage(query: str, document: str) -> float:
+    """Fraction of distinct query terms that appear in the document."""
+    terms = set(tokenize(query))
+    if not terms:
+        return 0.0
+    return len(terms & set(tokenize(document))) / len(terms)
+
+
+def bm25_path(vector_backend: RetrievalBackend) -> str:
+    """
+    Default keyword index file for a vector backend.
+
+    One file per backend namespace (backend kind and collection), so that
+    switching RAG_BACKEND or collections never fuses in documents from
+    another store.
+    """
+    return cache_path(f"bm25-{content_hash(vector_backend.namespace)[:16]}.sqlite")
+
+
+class HybridRetriever(RetrievalBackend):
+    """
+    Retrieval backend that fuses BM25 and vector results.
+
+    Wraps a vector backend; upserts go to both indexes and queries return
+    Chroma-shaped results whose "distances" are the final rank scaled to
+    [0, 1), so downstream code that orders by distance keeps the fused order.
+    """
+
+    def __init__(
+        self,
+        vector_backend: RetrievalBackend,
+        keyword_index: Optional[BM25Index] = None,
+        rrf_k: int = 60,
+        candidates: int = 10,
+        rerank: bool = False,
+        max_distance: Optional[float] = None,
+        min_keyword_score: float = 0.0,
+    ):
+        """
+        Args:
+            vector_backend: Backend used for vector similarity
+            keyword_index: BM25 index (None disables the keyword side)
+            rrf_k: RRF smoothing constant
+            candidates: Minimum candidates fetched from each side before fusion
+            rerank: Rerank fused candidates by query-term coverage
+            max_distance: Vector distance above which a hit is not relevant (None keeps all)
+            min_keyword_score: BM25 score a keyword hit must exceed to be relevant
+        """
+        self.vector_backend = vector_backend
+        self.namespace = vector_backend.namespace
+        self.keyword_index = keyword_index
+        self.rrf_k = rrf_k
+        self.candidates = candidates
+        self.rerank = rerank
+        self.max_distance = max_distance
+        self.min_keyword_score = min_keyword_score
+        self._backfill_lock = threading.Lock()
+        self._backfill_thread: Optional[threading.Thread] = None
+        # Set once the keyword index covers the vector backend; until then queries are vector-only
+        self._backfilled = threading.Event()
+        if keyword_index is None:
+            self._backfilled.set()
+
+    @classmethod
+    def from_env(cls, vector_backend: RetrievalBackend) -> "HybridRetriever":
+        """Build a retriever from RAG_HYBRID / RAG_RERANK / RAG_RELEVANCE_* environment variables."""
+        hybrid = os.getenv("RAG_HYBRID", "1").strip().lower() in ("1", "true", "yes")
+        max_distance = os.getenv("RAG_RELEVANCE_MAX_DISTANCE", "").strip()
+        retriever = cls(
+            vector_backend,
+            keyword_index=BM25Index(os.getenv("RAG_BM25_PATH") or bm25_path(vector_backend)) if hybrid else None,
+            rrf_k=int(os.getenv("RAG_RRF_K", "60")),
+            candidates=int(os.getenv("RAG_HYBRID_CANDIDATES", "10")),
+            rerank=os.getenv("RAG_RERANK", "").strip().lower() in ("1", "true", "yes"),
+            max_distance=float(max_distance) if max_distance else None,
+            min_keyword_score=float(os.getenv("RAG_RELEVANCE_MIN_BM25", "0")),
+        )
+        retriever.start_backfill()
+        return retriever
+
+    def upsert(self, ids: List[str], documents: List[str], metadatas: Optional[List[Dict[str, Any]]] = None) -> None:
+        self.vector_backend.upsert(ids=ids, documents=documents, metadatas=metadatas)
+        if self.keyword_index is not None:
+            self.keyword_index.add(ids, documents, metadatas)
+
+    def count(self) -> int:
+        return self.vector_backend.count()
+
+    def close(self) -> None:
+        self.vector_backend.close()
+        if self.keyword_index is not None:
+            self.keyword_index.close()
+
+    def start_backfill(self) -> Optional[threading.Thread]:
+        """
+        Start `backfill()` in a daemon thread unless it is done or already running.
+
+        Called when the retriever is built and again by queries, so a backfill
+        that failed (e.g. the vector backend was unreachable) is retried.
+        """
+        with self._backfill_lock:
+            if self._backfilled.is_set() or (self._backfill_thread is not None and self._backfill_thread.is_alive()):
+                return None
+            self._backfill_thread = threading.Thread(target=self._run_backfill, name="bm25-backfill", daemon=True)
+            self._backfill_thread.start()
+            return self._backfill_thread
+
+    def _run_backfill(self) -> None:
+        try:
+            indexed = self.backfill()
+        except Exception as e:
+            print(f"Warning: keyword index backfill failed, queries stay vector-only: {e}")
+            return
+        if indexed:
+            print(f"Keyword index backfilled with {indexed} documents")
+
+    def backfill(self) -> int:
+        """
+        Index documents that are in the vector backend but not in the keyword index.
+
+        The keyword index only sees documents upserted through this retriever, so
+        an existing collection starts with an empty or partial BM25 index; fusing
+        vector results with it would skew the ranking. If the vector backend
+        cannot list its documents, the keyword side is turned off instead.
+
+        Returns:
+            Number of documents indexed
+        """
+        if self._backfilled.is_set():
+            return 0
+        indexed = 0
+        try:
+            if self.keyword_index.count() < self.vector_backend.count():
+                for ids, documents, metadatas in self.vector_backend.iter_documents():
+                    self.keyword_index.add(ids, documents, metadatas)
+                    indexed += len(ids)
+        except NotImplementedError:
+            print("Warning: the vector backend cannot list its documents; hybrid search is off")
+            self.keyword_index = None
+        self._backfilled.set()
+        return indexed
+
+    def query(self, query_texts: List[str], n_results: int = 1, include: Optional[List[str]] = None) -> Dict[str, Any]:
+        # Never wait for the backfill here: this runs under the retrieval timeout
+        if self._backfilled.is_set():
+            keyword_index = self.keyword_index
+        else:
+            keyword_index = None
+            self.start_backfill()
+        fetch = max(n_results, self.candidates)
+        vector_results = self.vector_backend.query(
+            query_texts=query_texts, n_results=fetch, include=["documents", "distances", "metadatas"]
+        )
+
+        results: Dict[str, List[List[Any]]] = {"ids": [], "documents": [], "distances": [], "metadatas": []}
+        for position, question in enumerate(query_texts):
+            ids, documents, distances, metadatas = self._fuse(
+                question, vector_results, position, fetch, n_results, keyword_index
+            )
+            results["ids"].append(ids)
+            results["documents"].append(documents)
+            results["distances"].append(distances)
+            results["metadatas"].append(metadatas)
+        return results
+
+    def _fuse(self, question: str, vector_results: Dict[str, Any], position: int, fetch: int, n_results: int,
+              keyword_index: Optional[BM25Index]):
+        found: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        vector_ranking = []
+        for doc_id, document, distance, metadata in zip(
+            _column(vector_results, "ids", position),
+            _column(vector_results, "documents", position),
+            _column(vector_results, "distances", position) or [None] * fetch,
+            _column(vector_results, "metadatas", position) or [None] * fetch,
+        ):
+            if self.max_distance is not None and distance is not None and distance > self.max_distance:
+                continue
+            vector_ranking.append(doc_id)
+            found[doc_id] = (document, metadata or {})
+
+        keyword_ranking = []
+        if keyword_index is not None:
+            hits = [
+                doc_id for doc_id, score in keyword_index.search(question, fetch)
+                if score > self.min_keyword_score
+            ]
+            missing = [doc_id for doc_id in hits if doc_id not in found]
+            found.update(keyword_index.get(missing))
+            keyword_ranking = [doc_id for doc_id in hits if doc_id in found]
+
+        fused = reciprocal_rank_fusion([vector_ranking, keyword_ranking], k=self.rrf_k)
+        if self.rerank:
+            # Stable sort: ties on coverage keep the fused order
+            fused.sort(key=lambda item: term_coverage(question, found[item[0]][0]), reverse=True)
+        ids = [doc_id for doc_id, _ in fused[:n_results]]
+        return (
+            ids,
+            [found[doc_id][0] for doc_id in ids],
+            [rank / len(ids) for rank in range(len(ids))],
+            [found[doc_id][1] for doc_id in ids],
+        )
+
+
+def _column(results: Dict[str, Any], key: str, position: int) -> List[Any]:
+    values = results.get(key) or []
+    return (values[position] or []) if position < len(values) else []
@@ -0,0 +1,255 @@
+"""
+Bulk document ingestion for the RAG knowledge base.
+
+Documents are chunked, deduplicated by content hash and upserted to the
+collection in fixed-size batches. Chunk IDs are content hashes, so ingesting
+the same text twice never creates duplicates.
+"""
+
+import hashlib
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+Source = Union[str, "os.PathLike[str]", Dict[str, Any]]
+
+
+def content_hash(text: str) -> str:
+    """Return the stable ID used for a chunk of text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 100) -> List[str]:
+    """
+    Split text into chunks of roughly `chunk_size` characters.
+
+    Chunks end on whitespace where possible and consecutive chunks share
+    `overlap` characters so that sentences cut at a boundary stay retrievable.
+    """
+    text = text.strip()
+    if not text:
+        return []
+    if chunk_size <= 0 or len(text) <= chunk_size:
+        return [text]
+
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + chunk_size, len(text))
+        if end < len(text):
+            split_at = text.rfind(" ", start + chunk_size // 2, end)
+            if split_at != -1:
+                end = split_at
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+    return chunks
+
+
+def iter_sources(
+    sources: Iterable[Source], read_files: bool = True, allowed_dir: Optional[str] = None
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Yield (text, metadata) pairs from raw strings, file paths or dicts.
+
+    A string that names an existing file is read from disk; any other string is
+    treated as document content. Dicts must have a "content" key and may have
+    a "metadata" key.
+
+    Args:
+        sources: Document strings, file paths or {"content", "metadata"} dicts
+        read_files: If False, every string is document content and no file is read
+        allowed_dir: If set, relative paths are resolved against this directory and
+            files outside it (after resolving symlinks) raise PermissionError
+    """
+    root = os.path.realpath(allowed_dir) if allowed_dir else None
+    for source in sources:
+        if isinstance(source, dict):
+            yield source["content"], dict(source.get("metadata") or {})
+            continue
+        path = _source_path(source, root) if read_files else None
+        if path is None:
+            yield source, {}
+            continue
+        if root is not None and os.path.commonpath([root, os.path.realpath(path)]) != root:
+            raise PermissionError(f"{os.fspath(source)} is outside the ingest directory")
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            yield f.read(), {"source": os.fspath(source)}
+
+
+def _source_path(source: Source, root: Optional[str]) -> Optional[str]:
+    """Return the file a source names, or None if it is document content."""
+    if isinstance(source, os.PathLike):
+        path = os.fspath(source)
+    elif isinstance(source, str) and len(source) < 4096 and "\n" not in source:
+        path = source
+    else:
+        return None
+    if root is not None:
+        path = os.path.join(root, os.path.expanduser(path))
+    return path if os.path.isfile(path) else None
+
+
+class DocumentIngestor:
+    """Chunk, deduplicate and upsert documents to a collection in batches."""
+
+    def __init__(
+        self,
+        collection: Any,
+        batch_size: int = 100,
+        chunk_size: int = 1000,
+        chunk_overlap: int = 100,
+        workers: int = 2,
+        max_pending_batches: int = 4,
+        checkpoint_path: Optional[str] = None,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+        read_files: bool = True,
+        allowed_dir: Optional[str] = None,
+    ):
+        """
+        Args:
+            collection: Chroma collection (anything with an `upsert` method)
+            batch_size: Chunks per upsert call
+            chunk_size: Target chunk size in characters
+            chunk_overlap: Characters shared by consecutive chunks
+            workers: Concurrent upload threads
+            max_pending_batches: Batches queued before reading blocks (backpressure)
+            checkpoint_path: File recording uploaded chunk hashes, used to resume
+            progress: Called with the running stats after every uploaded batch
+            read_files: Whether string sources naming a file are read from disk
+            allowed_dir: Directory file sources must be inside (see `iter_sources`)
+        """
+        self.collection = collection
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.workers = max(1, workers)
+        self.max_pending_batches = max(1, max_pending_batches)
+        self.checkpoint_path = checkpoint_path
+        self.progress = progress
+        self.read_files = read_files
+        self.allowed_dir = allowed_dir
+
+        self._lock = threading.Lock()
+        self._completed = self._load_checkpoint()
+
+    def _load_checkpoint(self) -> set:
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return set()
+        with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+            return {line.strip() for line in f if line.strip()}
+
+    def _record_checkpoint(self, ids: List[str]) -> None:
+        if not self.checkpoint_path:
+            return
+        with open(self.checkpoint_path, "a", encoding="utf-8") as f:
+            f.write("\n".join(ids) + "\n")
+
+    def ingest(self, sources: Iterable[Source], metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Ingest documents from an iterable or generator of sources.
+
+        Args:
+            sources: Document strings, file paths or {"content", "metadata"} dicts
+            metadata: Metadata added to every chunk
+
+        Returns:
+            Dictionary with counts, errors and throughput
+        """
+        stats = {
+            "documents": 0,
+            "chunks": 0,
+            "uploaded_chunks": 0,
+            "skipped_duplicates": 0,
+            "skipped_checkpointed": 0,
+            "batches": 0,
+            "failed_batches": 0,
+            "errors": [],
+        }
+        started = time.perf_counter()
+        batches: "queue.Queue[Optional[Tuple[List[str], List[str], List[Dict[str, Any]]]]]" = queue.Queue(
+            maxsize=self.max_pending_batches
+        )
+
+        def upload_worker():
+            while True:
+                batch = batches.get()
+                if batch is None:
+                    return
+                ids, documents, metadatas = batch
+                try:
+                    self.collection.upsert(ids=ids, documents=documents, metadatas=metadatas)
+                except Exception as e:
+                    with self._lock:
+                        stats["failed_batches"] += 1
+                        stats["errors"].append(str(e))
+                    continue
+                with self._lock:
+                    self._record_checkpoint(ids)
+                    self._completed.update(ids)
+                    stats["batches"] += 1
+                    stats["uploaded_chunks"] += len(ids)
+                    snapshot = self._with_throughput(stats, started)
+                if self.progress:
+                    self.progress(snapshot)
+
+        threads = [
+            threading.Thread(target=upload_worker, name=f"ingest-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+
+        seen = set()
+        ids: List[str] = []
+        documents: List[str] = []
+        metadatas: List[Dict[str, Any]] = []
+
+        try:
+            for text, source_metadata in iter_sources(sources, self.read_files, self.allowed_dir):
+                stats["documents"] += 1
+                for index, chunk in enumerate(chunk_text(text, self.chunk_size, self.chunk_overlap)):
+                    stats["chunks"] += 1
+                    chunk_id = content_hash(chunk)
+                    if chunk_id in seen:
+                        stats["skipped_duplicates"] += 1
+                        continue
+                    seen.add(chunk_id)
+                    if chunk_id in self._completed:
+                        stats["skipped_checkpointed"] += 1
+                        continue
+
+                    ids.append(chunk_id)
+                    documents.append(chunk)
+                    metadatas.append({**(metadata or {}), **source_metadata, "chunk": index})
+
+                    if len(ids) >= self.batch_size:
+                        # Blocks while max_pending_batches are waiting for upload
+                        batches.put((ids, documents, metadatas))
+                        ids, documents, metadatas = [], [], []
+
+            if ids:
+                batches.put((ids, documents, metadatas))
+        finally:
+            for _ in threads:
+                batches.put(None)
+            for thread in threads:
+                thread.join()
+
+        return self._with_throughput(stats, started)
+
+    @staticmethod
+    def _with_throughput(stats: Dict[str, Any], started: float) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - started
+        return {
+            **stats,
+            "errors": list(stats["errors"]),
+            "elapsed_seconds": round(elapsed, 3),
+            "docs_per_second": round(stats["documents"] / elapsed, 2) if elapsed else 0.0,
+            "chunks_per_second": round(stats["uploaded_chunks"] / elapsed, 2) if elapsed else 0.0,
+        }
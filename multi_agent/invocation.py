@@ -0,0 +1,12 @@
+"""
+Helpers for custom agents that read their invocation context directly.
+"""
+
+from google.adk.agents.invocation_context import InvocationContext
+
+
+def user_text(ctx: InvocationContext) -> str:
+    """Return the text of the user message that started this invocation."""
+    if not ctx.user_content or not ctx.user_content.parts:
+        return ""
+    return " ".join(part.text for part in ctx.user_content.parts if part.text).strip()
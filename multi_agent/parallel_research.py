@@ -0,0 +1,220 @@
+# multi_agent/parallel_research.py
+"""
+Parallel research topology: internal-document retrieval and web search run
+concurrently for the same query, then a synthesizer agent merges them.
+
+Each branch has its own timeout, and the whole answer (branches plus
+synthesis) has a global deadline, so a slow branch or backend never blocks
+the answer: whatever finished in time is synthesized, and if synthesis
+itself runs out of time the raw findings are returned instead.
+"""
+
+import asyncio
+import os
+from typing import Any, AsyncGenerator, Dict, Optional
+
+from google.adk.agents import BaseAgent, LlmAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event, EventActions
+from google.genai import types
+
+from multi_agent import resilience, tracing
+from multi_agent.context_packing import truncate_to_tokens
+from multi_agent.invocation import user_text
+from multi_agent.rag_agent import get_rag_service
+from multi_agent.researcher import get_search_service, web_scrape_many
+
+# Session state key the synthesizer reads its sources from
+CONTEXT_STATE_KEY = "parallel_research_context"
+
+
+async def rag_branch(question: str, k: int) -> Dict[str, Any]:
+    """Retrieve internal documents for the question."""
+    return await asyncio.to_thread(get_rag_service().retrieve, question, k)
+
+
+async def web_branch(question: str, num_results: int, scrape_pages: int, deadline: float) -> Dict[str, Any]:
+    """Search the web and scrape the top pages until `deadline` (a loop.time() value)."""
+    search = await get_search_service().search_async(question, num_results)
+    if search.get("status") != "success":
+        raise RuntimeError(search.get("error", "search failed"))
+
+    pages = []
+    urls = [result["link"] for result in search["results"][:scrape_pages] if result.get("link")]
+    remaining = deadline - asyncio.get_running_loop().time()
+    if urls and remaining > 0.5:
+        scraped = await web_scrape_many(urls, timeout_seconds=remaining - 0.25)
+        pages = [page for page in scraped["results"] if page["status"] == "success"]
+    return {"results": search["results"], "pages": pages}
+
+
+def format_context(branches: Dict[str, Dict[str, Any]], token_budget: int) -> str:
+    """Render the branch findings as the synthesizer's source material."""
+    half = token_budget // 2
+    sections = []
+
+    rag = branches["rag"]
+    if rag["status"] == "success" and rag["result"]["documents"]:
+        documents = "\n\n---\n\n".join(rag["result"]["documents"])
+        sections.append("## Internal documents\n" + truncate_to_tokens(documents, half))
+    else:
+        sections.append(f"## Internal documents\n(unavailable: {rag.get('error', 'no relevant documents')})")
+
+    web = branches["web"]
+    if web["status"] == "success":
+        lines = [f"- {item['title']} ({item['link']}): {item['snippet']}" for item in web["result"]["results"]]
+        for page in web["result"]["pages"]:
+            lines.append(f"\nPage excerpt from {page['url']}:\n{page['content']}")
+        sections.append("## Web results\n" + truncate_to_tokens("\n".join(lines), half))
+    else:
+        sections.append(f"## Web results\n(unavailable: {web.get('error', 'no results')})")
+
+    return "\n\n".join(sections)
+
+
+class ParallelResearchAgent(BaseAgent):
+    """
+    Runs RAG retrieval and web search concurrently, then the synthesizer sub-agent.
+
+    The synthesizer (the only sub-agent) reads the merged findings from the
+    session state key CONTEXT_STATE_KEY.
+    """
+
+    rag_timeout: float = float(os.getenv("PARALLEL_RAG_TIMEOUT_SECONDS", "5"))
+    """Seconds allowed for internal-document retrieval."""
+
+    web_timeout: float = float(os.getenv("PARALLEL_WEB_TIMEOUT_SECONDS", "8"))
+    """Seconds allowed for web search plus page scraping."""
+
+    deadline: float = float(os.getenv("PARALLEL_DEADLINE_SECONDS", "20"))
+    """Seconds allowed for the whole answer, including synthesis."""
+
+    rag_k: int = int(os.getenv("PARALLEL_RAG_K", "3"))
+    search_results: int = int(os.getenv("PARALLEL_SEARCH_RESULTS", "5"))
+    scrape_pages: int = int(os.getenv("PARALLEL_SCRAPE_PAGES", "2"))
+    context_tokens: int = int(os.getenv("PARALLEL_CONTEXT_TOKENS", "3000"))
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        question = user_text(ctx)
+        if not question:
+            yield self._event(ctx, "Please tell me what you would like me to research.")
+            return
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        deadline = started + self.deadline
+        parent = tracing.invocation_span(ctx.invocation_id, self.name)
+
+        async def run_branch(name: str, coroutine, timeout: float) -> Dict[str, Any]:
+            branch_started = loop.time()
+            with tracing.span(f"parallel.{name}", parent=parent) as span:
+                try:
+                    # Backend retries inside the branch stop at the branch timeout too
+                    with resilience.deadline(timeout):
+                        result = await asyncio.wait_for(coroutine, timeout)
+                    outcome = {"status": "success", "result": result}
+                except asyncio.TimeoutError:
+                    outcome = {"status": "timeout", "error": f"no result within {timeout:.1f} seconds"}
+                except Exception as e:
+                    outcome = {"status": "error", "error": str(e)}
+                span.set_attribute("status", outcome["status"])
+            outcome["elapsed_ms"] = round((loop.time() - branch_started) * 1000, 1)
+            return outcome
+
+        # Leave part of the global deadline for synthesis
+        branch_budget = max(0.5, self.deadline * 0.6)
+        rag_timeout = min(self.rag_timeout, branch_budget)
+        web_timeout = min(self.web_timeout, branch_budget)
+        rag, web = await asyncio.gather(
+            run_branch("rag", rag_branch(question, self.rag_k), rag_timeout),
+            run_branch("web", web_branch(question, self.search_results, self.scrape_pages, started + web_timeout), web_timeout),
+        )
+        branches = {"rag": rag, "web": web}
+        timings = {name: {"status": branch["status"], "elapsed_ms": branch["elapsed_ms"]} for name, branch in branches.items()}
+
+        if all(branch["status"] != "success" for branch in branches.values()):
+            yield self._event(
+                ctx,
+                "Sorry, I could not gather any information in time: "
+                f"internal documents {rag['status']} ({rag.get('error')}), web search {web['status']} ({web.get('error')}).",
+                metadata={"branches": timings},
+            )
+            return
+
+        context = format_context(branches, self.context_tokens)
+        # Hand the findings to the synthesizer through session state
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            actions=EventActions(state_delta={CONTEXT_STATE_KEY: context}),
+            custom_metadata={"branches": timings},
+        )
+
+        # Run the synthesizer in its own task so the deadline can cancel it cleanly
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+        done = object()
+
+        async def pump():
+            try:
+                async for event in self.sub_agents[0].run_async(ctx):
+                    await queue.put(event)
+            finally:
+                await queue.put(done)
+
+        task = asyncio.ensure_future(pump())
+        produced_answer = False
+        try:
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError
+                item = await asyncio.wait_for(queue.get(), remaining)
+                if item is done:
+                    break
+                produced_answer = produced_answer or bool(item.content)
+                yield item
+            await task  # surface synthesizer errors
+        except asyncio.TimeoutError:
+            task.cancel()
+            if not produced_answer:
+                yield self._event(
+                    ctx,
+                    "I ran out of time combining the sources; here is what I found:\n\n" + context,
+                    metadata={"branches": timings, "synthesis": "timeout"},
+                )
+        except Exception as e:
+            yield self._event(ctx, f"Here is what I found (synthesis failed: {e}):\n\n" + context)
+
+    def _event(self, ctx: InvocationContext, text: str, metadata: Optional[dict] = None) -> Event:
+        return Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text=text)]),
+            custom_metadata=metadata,
+        )
+
+
+synthesizer_agent = LlmAgent(
+    name="synthesizer",
+    model="gemini-2.0-flash",
+    description="Merges internal-document and web findings into one answer.",
+    instruction="""You combine research from two sources into one answer to the user's latest question.
+
+{""" + CONTEXT_STATE_KEY + """}
+
+Prefer the internal documents for questions about the organization and the web results for public or
+recent information. If the sources disagree, say so. Cite web sources by URL and quote internal
+documents briefly. If a source was unavailable, answer from the other and mention the gap.""",
+    disallow_transfer_to_parent=True,
+    disallow_transfer_to_peers=True,
+    **tracing.agent_callbacks(),
+)
+
+root_agent = ParallelResearchAgent(
+    name="parallel_research",
+    description="Researches questions that need both internal documents and the web, searching both at once.",
+    sub_agents=[synthesizer_agent],
+    **tracing.agent_callbacks(llm=False),
+)
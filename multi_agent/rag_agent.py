@@ -1,33 +1,103 @@
 # multi_agent/rag_agent.py
-import chromadb
+import asyncio
 import google.generativeai as genai
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from google.adk.agents import Agent
-from typing import Dict, List, Any, Optional
+from google.adk.tools import load_artifacts
+from typing import AsyncIterator, Dict, List, Any, Optional, Tuple
 from dotenv import load_dotenv
+from multi_agent import tracing
+from multi_agent.clients import get_genai
+from multi_agent.services import registry
+from multi_agent.answer_cache import AnswerCache, normalize_question
+from multi_agent.ingestion import DocumentIngestor, content_hash
+from multi_agent.context_packing import ContextPacker, count_tokens
+from multi_agent.retrieval import RetrievalBackend, create_backend
+from multi_agent.hybrid_retrieval import HybridRetriever
+from multi_agent.embeddings import Embedder, embedding_stats
+from multi_agent.resilience import get_backend
+from multi_agent.single_flight import coalesce
+from multi_agent.result_shaping import shape_tool_result
+
+# Embedding model used for semantic answer-cache lookups and the local vector index
+EMBEDDING_MODEL = os.getenv("RAG_EMBEDDING_MODEL", "models/text-embedding-004")
+
+# Returned instead of calling the model when retrieval finds nothing relevant
+NO_RELEVANT_DOCUMENTS_ANSWER = "I couldn't find any relevant information about this in the knowledge base."
 
 # Load environment variables
 load_dotenv()
 
 class RAGService:
-    """RAG service using ChromaDB and Google Gemini."""
+    """RAG service using a pluggable retrieval backend and Google Gemini."""
     
-    def __init__(self):
-        # Initialize ChromaDB client
-        self.client = chromadb.CloudClient(
-            api_key=os.getenv("CHROMA_API_KEY"),
-            tenant=os.getenv("CHROMA_TENANT"),
-            database=os.getenv("CHROMA_DATABASE")
+    def __init__(
+        self,
+        answer_cache: Optional[AnswerCache] = None,
+        context_packer: Optional[ContextPacker] = None,
+        backend: Optional[RetrievalBackend] = None,
+    ):
+        # Configure Google Generative AI (once per process)
+        get_genai()
+
+        # Batched, cached Gemini embeddings (configured via RAG_EMBED_* variables)
+        self.query_embedder = Embedder.from_env(
+            lambda texts: self._embed_remote(texts, "retrieval_query"), f"{EMBEDDING_MODEL}:retrieval_query"
+        )
+        self.document_embedder = Embedder.from_env(
+            lambda texts: self._embed_remote(texts, "retrieval_document"), f"{EMBEDDING_MODEL}:retrieval_document"
         )
         
-        # Configure Google Generative AI
-        genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
-        
-        # Get or create collection
-        self.collection = self.client.get_or_create_collection(name="uniplexity_collection")
+        # Vector backend selected by RAG_BACKEND (Chroma Cloud by default), fused
+        # with a BM25 keyword index and relevance threshold (RAG_HYBRID / RAG_RELEVANCE_*)
+        self.backend = backend or HybridRetriever.from_env(
+            create_backend(embed_fn=self.embed_documents, query_embed_fn=self.embed_queries)
+        )
+        # Kept for callers that used the Chroma collection directly
+        self.collection = self.backend
         
         # Initialize the model
         self.model = genai.GenerativeModel('gemini-2.5-flash')
+
+        # Cache answers to repeated questions (configured via RAG_CACHE_* variables)
+        self.answer_cache = answer_cache or AnswerCache.from_env(embed_fn=self.embed_query)
+
+        # Keep the prompt within a token budget (configured via RAG_CONTEXT_* variables)
+        self.context_packer = context_packer or ContextPacker.from_env()
+
+    @staticmethod
+    def _embed_remote(texts: List[str], task_type: str) -> List[List[float]]:
+        """Embed one batch of texts with the Gemini embedding API."""
+        with tracing.span("gemini.embed", client=True, texts=len(texts), task_type=task_type):
+            result = get_backend("gemini").call(
+                lambda: genai.embed_content(model=EMBEDDING_MODEL, content=texts, task_type=task_type), idempotent=True
+            )
+        return result["embedding"]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a question for semantic cache lookups."""
+        return self.query_embedder([text])[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed questions for vector retrieval."""
+        return self.query_embedder(texts)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents for vector retrieval."""
+        return self.document_embedder(texts)
+
+    def close(self) -> None:
+        """Release the retrieval backend's files and connections."""
+        close = getattr(self.backend, "close", None)
+        if close is not None:
+            close()
+
+    @staticmethod
+    def embedding_stats() -> Dict[str, Any]:
+        """Embedding throughput and cache-hit metrics."""
+        return embedding_stats()
     
     def rag_answer(self, question: str, k: int = 1, model_name: str = "gemini-2.5-flash") -> Dict[str, Any]:
         """
@@ -41,21 +111,308 @@ class RAGService:
         Returns:
             Dictionary containing retrieved docs, model response, and raw response
         """
-        # 1) Retrieve top-k docs from Chroma (Chroma will embed query_texts for you)
-        results = self.collection.query(query_texts=[question], n_results=k)
-        
-        # Extract retrieved documents safely
+        cached, tier, generation = self.answer_cache.get(question, k, model_name)
+        if cached is not None:
+            return {**cached, "cache": tier}
+
+        # 1) Retrieve top-k docs from the retrieval backend
+        results = self._query([question], k)
+
+        # 2) Pack the context, compose the prompt and call Gemini to generate the final answer
+        result = self._generate_answer(question, results, 0)
+        self.answer_cache.put(question, k, model_name, result, generation)
+        return {**result, "cache": None}
+
+    def rag_answer_batch(
+        self,
+        questions: List[str],
+        k: int = 1,
+        model_name: str = "gemini-2.5-flash",
+        max_concurrency: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Answer many questions with a single retrieval query.
+
+        All uncached questions are retrieved in one `backend.query` call and
+        the answers are then generated concurrently.
+
+        Args:
+            questions: The questions to answer
+            k: Number of documents to retrieve per question
+            model_name: Name of the model to use
+            max_concurrency: Maximum concurrent generation calls (default: RAG_BATCH_CONCURRENCY)
+
+        Returns:
+            One dictionary per question, in input order. Failed questions have
+            status "error" and an "error" message instead of a model response.
+        """
+        if max_concurrency is None:
+            max_concurrency = int(os.getenv("RAG_BATCH_CONCURRENCY", "8"))
+
+        answers: List[Optional[Dict[str, Any]]] = [None] * len(questions)
+        pending: Dict[str, List[int]] = {}
+
+        # Serve cached answers first and collapse duplicate questions
+        generation = None
+        for index, question in enumerate(questions):
+            cached, tier, lookup_generation = self.answer_cache.get(question, k, model_name)
+            # The oldest generation seen: answers are dropped if the cache was invalidated since any lookup
+            generation = lookup_generation if generation is None else min(generation, lookup_generation)
+            if cached is not None:
+                answers[index] = {"status": "success", "question": question, **cached, "cache": tier}
+            else:
+                pending.setdefault(question, []).append(index)
+
+        if pending:
+            unique_questions = list(pending)
+            query_error = None
+            try:
+                results = self._query(unique_questions, k)
+            except Exception as e:
+                results, query_error = None, e
+
+            def answer_one(position: int) -> Dict[str, Any]:
+                question = unique_questions[position]
+                if results is None:
+                    return {"status": "error", "question": question, "error": f"Retrieval failed: {query_error}"}
+                try:
+                    result = self._generate_answer(question, results, position)
+                except Exception as e:
+                    return {"status": "error", "question": question, "error": str(e)}
+                self.answer_cache.put(question, k, model_name, result, generation)
+                return {"status": "success", "question": question, **result, "cache": None}
+
+            workers = max(1, min(max_concurrency, len(unique_questions)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for position, answer in enumerate(executor.map(tracing.bind(answer_one), range(len(unique_questions)))):
+                    for index in pending[unique_questions[position]]:
+                        answers[index] = answer
+
+        return answers
+
+    def _query(self, questions: List[str], k: int) -> Any:
+        """Retrieve the top-k documents and their distances for each question."""
+        with tracing.span("retrieval.query", client=True, questions=len(questions), k=k):
+            # Retried, timed out and hedged per the "retrieval" resilience policy
+            return get_backend("retrieval").call(
+                lambda: self.backend.query(query_texts=questions, n_results=k, include=["documents", "distances"]),
+                idempotent=True,
+            )
+
+    @staticmethod
+    def _documents_for(results: Any, position: int) -> List[str]:
+        """Extract the documents retrieved for the query at `position`."""
         try:
-            retrieved_docs = results['documents'][0]   # list of docs for the first query
+            return results['documents'][position]
         except Exception:
             # fallback: some clients return .documents
-            retrieved_docs = getattr(results, "documents", [[]])[0]
+            documents = getattr(results, "documents", None) or []
+            return documents[position] if position < len(documents) else []
+
+    @staticmethod
+    def _distances_for(results: Any, position: int) -> Optional[List[float]]:
+        """Extract the distances of the documents retrieved for the query at `position`."""
+        try:
+            return (results.get('distances') or [])[position]
+        except Exception:
+            return None
+
+    def retrieve(self, question: str, k: int = 3) -> Dict[str, Any]:
+        """
+        Retrieve and pack documents for a question without generating an answer.
+
+        Returns:
+            Dictionary with the packed "documents" and packing "usage" stats
+        """
+        results = self._query([question], k)
+        documents, usage = self.context_packer.pack(
+            self._documents_for(results, 0), self._distances_for(results, 0)
+        )
+        return {"documents": documents, "usage": usage}
+
+    def _prepare_prompt(self, question: str, results: Any, position: int) -> Tuple[List[str], str, Dict[str, Any]]:
+        """
+        Pack the retrieved documents into the token budget and build the prompt.
 
-        # join retrieved docs to include in prompt (limit size if necessary)
+        Returns:
+            Tuple of (documents used, prompt, usage stats including prompt_tokens)
+        """
+        retrieved_docs, usage = self.context_packer.pack(
+            self._documents_for(results, position), self._distances_for(results, position)
+        )
+        prompt = self._build_prompt(question, retrieved_docs)
+        usage["prompt_tokens"] = count_tokens(prompt)
+        return retrieved_docs, prompt, usage
+
+    def _generate_answer(self, question: str, results: Any, position: int) -> Dict[str, Any]:
+        """Build the RAG prompt for the retrieved documents and call Gemini."""
+        retrieved_docs, prompt, usage = self._prepare_prompt(question, results, position)
+        if not retrieved_docs:
+            return self._no_hit_result(usage)
+        with tracing.span("gemini.generate", client=True, prompt_tokens=usage["prompt_tokens"]):
+            response = get_backend("gemini").call(lambda: self.model.generate_content(
+                contents=prompt,
+                generation_config=self._generation_config()
+            ))
+        return {
+            "retrieved_docs": retrieved_docs,
+            "model_response": self._response_text(response),
+            "raw_response": response,
+            "usage": usage
+        }
+
+    async def rag_answer_async(self, question: str, k: int = 1, model_name: str = "gemini-2.5-flash") -> Dict[str, Any]:
+        """
+        Async version of `rag_answer` that does not block the event loop.
+        
+        The synchronous retrieval backend runs in a worker thread and the answer is
+        generated with Gemini's async API.
+        """
+        if self.answer_cache.semantic_enabled:
+            # The semantic tier makes an embedding call, keep it off the loop
+            cached, tier, generation = await asyncio.to_thread(self.answer_cache.get, question, k, model_name)
+        else:
+            cached, tier, generation = self.answer_cache.get(question, k, model_name)
+        if cached is not None:
+            return {**cached, "cache": tier}
+
+        results = await asyncio.to_thread(self._query, [question], k)
+        retrieved_docs, prompt, usage = self._prepare_prompt(question, results, 0)
+        if not retrieved_docs:
+            result = self._no_hit_result(usage)
+            self.answer_cache.put(question, k, model_name, result, generation)
+            return {**result, "cache": None}
+
+        with tracing.span("gemini.generate", client=True, prompt_tokens=usage["prompt_tokens"]):
+            response = await get_backend("gemini").call_async(lambda: self.model.generate_content_async(
+                contents=prompt,
+                generation_config=self._generation_config()
+            ))
+        result = {
+            "retrieved_docs": retrieved_docs,
+            "model_response": self._response_text(response),
+            "raw_response": response,
+            "usage": usage
+        }
+        self.answer_cache.put(question, k, model_name, result, generation)
+        return {**result, "cache": None}
+
+    async def rag_answer_stream(
+        self, question: str, k: int = 1, model_name: str = "gemini-2.5-flash"
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream a RAG answer as it is generated.
+        
+        Yields, in order:
+            {"type": "documents", "documents": [...]} once retrieval finishes
+            {"type": "text", "text": "..."} for every generated chunk
+            {"type": "done", "answer": ..., "time_to_first_token_ms": ..., "total_ms": ...}
+        """
+        started = time.perf_counter()
+
+        if self.answer_cache.semantic_enabled:
+            cached, tier, generation = await asyncio.to_thread(self.answer_cache.get, question, k, model_name)
+        else:
+            cached, tier, generation = self.answer_cache.get(question, k, model_name)
+        if cached is not None:
+            yield {"type": "documents", "documents": cached["retrieved_docs"]}
+            yield {"type": "text", "text": cached["model_response"]}
+            elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+            yield {
+                "type": "done",
+                "answer": cached["model_response"],
+                "cache": tier,
+                "prompt_tokens": cached.get("usage", {}).get("prompt_tokens"),
+                "time_to_first_token_ms": elapsed_ms,
+                "total_ms": elapsed_ms
+            }
+            return
+
+        results = await asyncio.to_thread(self._query, [question], k)
+        retrieved_docs, prompt, usage = self._prepare_prompt(question, results, 0)
+        yield {"type": "documents", "documents": retrieved_docs, "usage": usage}
+
+        if not retrieved_docs:
+            result = self._no_hit_result(usage)
+            self.answer_cache.put(question, k, model_name, result, generation)
+            yield {"type": "text", "text": result["model_response"]}
+            elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+            yield {
+                "type": "done",
+                "answer": result["model_response"],
+                "cache": None,
+                "prompt_tokens": 0,
+                "time_to_first_token_ms": elapsed_ms,
+                "total_ms": elapsed_ms
+            }
+            return
+
+        # Not a `with` block: the span stays open across the yields below
+        generate_span = tracing.start_span("gemini.generate_stream", client=True, prompt_tokens=usage["prompt_tokens"])
+        parts = []
+        first_token_at = None
+        try:
+            # Only opening the stream is retried; a stream that fails midway is not restarted
+            response = await get_backend("gemini").call_async(lambda: self.model.generate_content_async(
+                contents=prompt,
+                generation_config=self._generation_config(),
+                stream=True
+            ))
+
+            async for chunk in response:
+                try:
+                    text = chunk.text
+                except Exception:
+                    # chunks without text (e.g. only safety metadata)
+                    continue
+                if not text:
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                    generate_span.set_attribute("time_to_first_token_ms", round((first_token_at - started) * 1000, 1))
+                parts.append(text)
+                yield {"type": "text", "text": text}
+        except Exception as e:
+            generate_span.record_error(e)
+            raise
+        finally:
+            # also ends the span when the consumer stops reading mid-stream
+            generate_span.end()
+
+        answer = "".join(parts)
+        self.answer_cache.put(question, k, model_name, {
+            "retrieved_docs": retrieved_docs,
+            "model_response": answer,
+            "raw_response": response,
+            "usage": usage
+        }, generation)
+        finished = time.perf_counter()
+        yield {
+            "type": "done",
+            "answer": answer,
+            "cache": None,
+            "prompt_tokens": usage["prompt_tokens"],
+            "time_to_first_token_ms": round(((first_token_at or finished) - started) * 1000, 1),
+            "total_ms": round((finished - started) * 1000, 1)
+        }
+
+    @staticmethod
+    def _no_hit_result(usage: Dict[str, Any]) -> Dict[str, Any]:
+        """Result returned without calling the model when no relevant documents were retrieved."""
+        return {
+            "retrieved_docs": [],
+            "model_response": NO_RELEVANT_DOCUMENTS_ANSWER,
+            "raw_response": None,
+            "usage": {**usage, "prompt_tokens": 0, "generation_skipped": True}
+        }
+
+    @staticmethod
+    def _build_prompt(question: str, retrieved_docs: List[str]) -> str:
+        """Compose the RAG prompt for the model."""
+        # join retrieved docs (already packed into the token budget) to include in prompt
         joined_docs = "\n\n---\n\n".join(retrieved_docs) if retrieved_docs else ""
 
-        # 2) Compose the RAG prompt for the model
-        prompt = f"""You are an expert assistant. Use the retrieved documents below to answer the user's question.
+        return f"""You are an expert assistant. Use the retrieved documents below to answer the user's question.
 If the documents don't contain enough info, say so and answer with what you can infer.
 
 Retrieved documents:
@@ -67,32 +424,40 @@ User question:
 Answer concisely and cite the document snippet you used (by quoting it).
 """
 
-        # 3) Call Gemini to generate the final answer
-        response = self.model.generate_content(
-            contents=prompt,
-            generation_config=genai.GenerationConfig(
-                max_output_tokens=512  # adjust as needed
-            )
+    @staticmethod
+    def _generation_config() -> "genai.GenerationConfig":
+        return genai.GenerationConfig(
+            max_output_tokens=512  # adjust as needed
         )
 
-        # Extract model response safely
+    @staticmethod
+    def _response_text(response: Any) -> str:
+        """Extract model response text safely."""
         try:
-            model_text = response.text
+            return response.text
         except Exception:
             # some SDKs return a more nested structure
-            model_text = getattr(response, "output", None) or str(response)
+            return getattr(response, "output", None) or str(response)
 
-        return {
-            "retrieved_docs": retrieved_docs,
-            "model_response": model_text,
-            "raw_response": response
-        }
+
+# The RAG service is built on first use, not at import time
+registry.register("rag", RAGService)
 
 
-# Initialize RAG service instance
-rag_service = RAGService()
+def get_rag_service() -> RAGService:
+    """Return the shared RAG service, creating it on first use."""
+    return registry.get("rag")
 
 
+def __getattr__(name: str) -> Any:
+    # Keep `rag_agent.rag_service` working for existing callers
+    if name == "rag_service":
+        return get_rag_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+@tracing.traced("tool:rag_search")
+@coalesce("rag_search", question=normalize_question)
 def rag_search(question: str, k: int = 1) -> dict:
     """
     RAG search tool function for the agent.
@@ -105,13 +470,50 @@ def rag_search(question: str, k: int = 1) -> dict:
         Dictionary with status and result
     """
     try:
-        result = rag_service.rag_answer(question, k)
+        result = get_rag_service().rag_answer(question, k)
+        return {
+            "status": "success",
+            "question": question,
+            "retrieved_documents": result["retrieved_docs"],
+            "answer": result["model_response"],
+            "num_docs_retrieved": len(result["retrieved_docs"]),
+            "prompt_tokens": result.get("usage", {}).get("prompt_tokens"),
+            "generation_skipped": result.get("usage", {}).get("generation_skipped", False),
+            "cached": result.get("cache") is not None
+        }
+    except Exception as e:
+        return {
+            "status": "error",
+            "question": question,
+            "error": str(e),
+            "answer": f"Sorry, I encountered an error while searching for information about '{question}': {str(e)}"
+        }
+
+
+@tracing.traced("tool:rag_search_async")
+@coalesce("rag_search", question=normalize_question)
+async def rag_search_async(question: str, k: int = 1) -> dict:
+    """
+    RAG search tool function for the agent (non-blocking).
+    
+    Args:
+        question: The question to search for
+        k: Number of documents to retrieve (default: 1)
+        
+    Returns:
+        Dictionary with status and result
+    """
+    try:
+        result = await get_rag_service().rag_answer_async(question, k)
         return {
             "status": "success",
             "question": question,
             "retrieved_documents": result["retrieved_docs"],
             "answer": result["model_response"],
-            "num_docs_retrieved": len(result["retrieved_docs"])
+            "num_docs_retrieved": len(result["retrieved_docs"]),
+            "prompt_tokens": result.get("usage", {}).get("prompt_tokens"),
+            "generation_skipped": result.get("usage", {}).get("generation_skipped", False),
+            "cached": result.get("cache") is not None
         }
     except Exception as e:
         return {
@@ -122,6 +524,56 @@ def rag_search(question: str, k: int = 1) -> dict:
         }
 
 
+@tracing.traced("tool:rag_search_batch")
+def rag_search_batch(questions: List[str], k: int = 1) -> dict:
+    """
+    Answer several questions at once from the knowledge base.
+    
+    Args:
+        questions: The questions to answer
+        k: Number of documents to retrieve per question (default: 1)
+        
+    Returns:
+        Dictionary with status and one result per question, in input order
+    """
+    try:
+        answers = get_rag_service().rag_answer_batch(questions, k)
+    except Exception as e:
+        return {
+            "status": "error",
+            "error": str(e),
+            "results": []
+        }
+
+    results = []
+    for answer in answers:
+        if answer["status"] == "success":
+            results.append({
+                "status": "success",
+                "question": answer["question"],
+                "retrieved_documents": answer["retrieved_docs"],
+                "answer": answer["model_response"],
+                "num_docs_retrieved": len(answer["retrieved_docs"]),
+                "prompt_tokens": answer.get("usage", {}).get("prompt_tokens"),
+                "generation_skipped": answer.get("usage", {}).get("generation_skipped", False),
+                "cached": answer.get("cache") is not None
+            })
+        else:
+            results.append({
+                "status": "error",
+                "question": answer["question"],
+                "error": answer["error"]
+            })
+
+    return {
+        "status": "success",
+        "num_questions": len(results),
+        "num_errors": sum(1 for result in results if result["status"] == "error"),
+        "results": results
+    }
+
+
+@tracing.traced("tool:add_document")
 def add_document(content: str, metadata: Optional[dict] = None) -> dict:
     """
     Add a document to the RAG knowledge base.
@@ -134,17 +586,19 @@ def add_document(content: str, metadata: Optional[dict] = None) -> dict:
         Dictionary with status and result
     """
     try:
-        # Generate a simple ID based on content hash or timestamp
-        import hashlib
-        import time
-        doc_id = hashlib.md5(f"{content}_{time.time()}".encode()).hexdigest()
+        # The ID is a hash of the content, so adding the same text twice is a no-op
+        doc_id = content_hash(content)
         
-        # Add document to collection
-        rag_service.collection.add(
+        # Add document to the retrieval backend
+        service = get_rag_service()
+        service.backend.upsert(
             documents=[content],
             ids=[doc_id],
             metadatas=[metadata or {}]
         )
+
+        # Cached answers may be stale now that the knowledge base changed
+        service.answer_cache.invalidate()
         
         return {
             "status": "success",
@@ -158,22 +612,69 @@ def add_document(content: str, metadata: Optional[dict] = None) -> dict:
         }
 
 
+@tracing.traced("tool:ingest_documents")
+def ingest_documents(sources: List[str], chunk_size: int = 1000) -> dict:
+    """
+    Bulk-add documents or files to the RAG knowledge base.
+    
+    Args:
+        sources: Document texts, or paths of text files in the ingest directory
+        chunk_size: Target chunk size in characters (default: 1000)
+        
+    Returns:
+        Dictionary with status, counts and throughput
+    """
+    ingest_dir = os.getenv("RAG_INGEST_DIR") or None
+    try:
+        service = get_rag_service()
+        ingestor = DocumentIngestor(
+            service.backend,
+            batch_size=int(os.getenv("RAG_INGEST_BATCH_SIZE", "100")),
+            chunk_size=chunk_size,
+            workers=int(os.getenv("RAG_INGEST_WORKERS", "2")),
+            # The model picks the sources, so it may only read files from RAG_INGEST_DIR
+            read_files=bool(ingest_dir),
+            allowed_dir=ingest_dir,
+        )
+        stats = ingestor.ingest(sources)
+
+        if stats["uploaded_chunks"]:
+            service.answer_cache.invalidate()
+
+        return {
+            "status": "success" if not stats["failed_batches"] else "partial",
+            "message": f"Ingested {stats['uploaded_chunks']} chunks from {stats['documents']} documents",
+            **stats,
+            "embedding": service.embedding_stats()
+        }
+    except Exception as e:
+        return {
+            "status": "error",
+            "message": f"Failed to ingest documents: {str(e)}"
+        }
+
+
 # Create the RAG agent
 root_agent = Agent(
     name="rag_agent",
     model="gemini-2.0-flash",
     description="Performs RAG (Retrieval-Augmented Generation) to answer questions using stored knowledge.",
     instruction="""You are a RAG (Retrieval-Augmented Generation) agent that can search through stored documents 
-    to answer questions. Use the rag_search tool to find relevant information from the knowledge base and provide 
-    comprehensive answers. You can also add new documents to the knowledge base using the add_document tool.
+    to answer questions. Use the rag_search_async tool to find relevant information from the knowledge base and provide 
+    comprehensive answers. You can also add new documents to the knowledge base using the add_document tool,
+    or many documents and files at once using the ingest_documents tool.
     
     When answering questions:
-    1. Use rag_search to find relevant information
+    1. Use rag_search_async to find relevant information (use rag_search_batch when you have several questions)
     2. Provide detailed answers based on the retrieved documents
     3. Cite the sources when possible
     4. If no relevant information is found, say so clearly
+
+    Search results quote the retrieved documents in their answer; the full documents are listed under
+    artifacts and can be read with load_artifacts if you need more than the answer quotes.
     """,
-    tools=[rag_search, add_document],
+    tools=[rag_search_async, rag_search_batch, add_document, ingest_documents, load_artifacts],
+    **tracing.agent_callbacks(after_tool=shape_tool_result),
 )
 
 
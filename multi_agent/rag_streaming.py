@@ -0,0 +1,66 @@
+# multi_agent/rag_streaming.py
+from typing import AsyncGenerator, Optional
+
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event
+from google.genai import types
+
+from multi_agent import tracing
+from multi_agent.invocation import user_text
+from multi_agent.rag_agent import get_rag_service
+
+
+class StreamingRAGAgent(BaseAgent):
+    """
+    RAG agent that streams the answer to the user as it is generated.
+
+    Retrieved documents are emitted first (in the event's custom_metadata),
+    followed by partial text events and a final event holding the full answer
+    with time-to-first-token and total latency.
+    """
+
+    k: int = 1
+    """Number of documents to retrieve."""
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        question = user_text(ctx)
+        if not question:
+            yield self._event(ctx, "Please ask a question about the internal documents.")
+            return
+
+        try:
+            with tracing.span("rag.stream", parent=tracing.invocation_span(ctx.invocation_id, self.name)):
+                async for item in get_rag_service().rag_answer_stream(question, self.k):
+                    if item["type"] == "documents":
+                        yield self._event(ctx, None, partial=True, metadata={"rag_documents": item["documents"]})
+                    elif item["type"] == "text":
+                        yield self._event(ctx, item["text"], partial=True)
+                    else:
+                        yield self._event(ctx, item["answer"], metadata={
+                            "cache": item["cache"],
+                            "prompt_tokens": item["prompt_tokens"],
+                            "time_to_first_token_ms": item["time_to_first_token_ms"],
+                            "total_ms": item["total_ms"],
+                        })
+        except Exception as e:
+            yield self._event(
+                ctx, f"Sorry, I encountered an error while searching for information about '{question}': {str(e)}"
+            )
+
+    def _event(self, ctx: InvocationContext, text: Optional[str], partial: bool = False, metadata: Optional[dict] = None) -> Event:
+        return Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text=text)]) if text is not None else None,
+            partial=partial,
+            custom_metadata=metadata,
+        )
+
+
+root_agent = StreamingRAGAgent(
+    name="rag_stream_agent",
+    description="Answers questions from the internal document knowledge base, streaming the answer as it is generated.",
+    **tracing.agent_callbacks(llm=False),
+)
@@ -1,20 +1,52 @@
 # multi_agent/researcher.py
+import asyncio
+import json
 import os
+import threading
+import time
+import httpx
 import requests
-from typing import Dict, List, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
+from urllib.parse import urlparse
 from google.adk.agents import Agent
-from googleapiclient.discovery import build
+from google.adk.tools import load_artifacts
 from dotenv import load_dotenv
+from multi_agent import tracing
+from multi_agent.services import registry
+from multi_agent.http_clients import DEFAULT_TIMEOUT, get_async_client, get_http_cache, get_session
+from multi_agent.http_cache import fetch_through_cache, fetch_through_cache_async
+from multi_agent.html_extract import make_extractor
+from multi_agent.resilience import get_backend, is_transient, status_code
+from multi_agent.search_cache import SearchCache, normalize_query
+from multi_agent.single_flight import coalesce, normalize_url
+from multi_agent.result_shaping import shape_tool_result
 
 # Load environment variables
 load_dotenv()
 
+# Pages are never downloaded past this many bytes
+MAX_SCRAPE_BYTES = int(os.getenv("SCRAPE_MAX_BYTES", str(2 * 1024 * 1024)))
+
+# The Custom Search API never returns results past the 100th
+MAX_SEARCH_RESULTS = 100
+
+# Error reasons of a 403 that mean the quota, not the key, is the problem
+QUOTA_REASONS = ("quotaExceeded", "dailyLimitExceeded", "rateLimitExceeded", "RESOURCE_EXHAUSTED")
+
+# REST endpoint of the Custom Search JSON API, used by the async search path
+CSE_ENDPOINT = os.getenv("GOOGLE_CSE_ENDPOINT", "https://www.googleapis.com/customsearch/v1")
+
 class GoogleSearchService:
     """Google Custom Search API service."""
     
-    def __init__(self):
+    def __init__(self, cache: Optional[SearchCache] = None):
         self.api_key = os.getenv('GOOGLE_CSE_API_KEY')
         self.cse_id = os.getenv('GOOGLE_CSE_ID')
+
+        # Persistent result cache and daily quota tracker
+        self.cache = cache or SearchCache.from_env()
+        self._local = threading.local()
         
         if not self.api_key or not self.cse_id:
             print("Warning: Google Custom Search API credentials not found in environment variables.")
@@ -22,6 +54,7 @@ class GoogleSearchService:
             self.service = None
         else:
             try:
+                from googleapiclient.discovery import build
                 self.service = build("customsearch", "v1", developerKey=self.api_key)
             except Exception as e:
                 print(f"Error initializing Google Custom Search service: {e}")
@@ -31,9 +64,12 @@ class GoogleSearchService:
         """
         Perform Google Custom Search.
         
+        Results are served from the search cache when possible. Requests for
+        more than 10 results are split into pages fetched concurrently.
+        
         Args:
             query: Search query
-            num_results: Number of results to return (max 10 per request)
+            num_results: Number of results to return (max 100)
             
         Returns:
             Dictionary with search results
@@ -44,85 +80,300 @@ class GoogleSearchService:
                 "error": "Google Custom Search service not initialized. Please check your API credentials.",
                 "results": []
             }
+
+        num_results = max(1, min(num_results, MAX_SEARCH_RESULTS))
+        cached = self.cache.get(query, num_results)
+        if cached is not None:
+            return cached
+
+        pages = self._page_plan(num_results)
+        if not self.cache.try_acquire(len(pages)):
+            return self._fallback(query, num_results, "Daily Custom Search quota exhausted")
+
+        def fetch_page(page):
+            start, count = page
+            try:
+                with tracing.span("cse.page", client=True, start=start, num=count):
+                    return get_backend("cse", _is_retryable_search_error).call(
+                        lambda: self.service.cse().list(
+                            q=query,
+                            cx=self.cse_id,
+                            num=count,  # API limit is 10 per request
+                            start=start
+                        ).execute(http=self._thread_http()),
+                        idempotent=True,
+                    )
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=len(pages)) as executor:
+            responses = list(executor.map(tracing.bind(fetch_page), pages))
+
+        return self._finish(query, num_results, responses)
+
+    async def search_async(self, query: str, num_results: int = 10) -> Dict[str, Any]:
+        """
+        Perform Google Custom Search without blocking the event loop.
         
-        try:
-            # Perform the search
-            result = self.service.cse().list(
-                q=query,
-                cx=self.cse_id,
-                num=min(num_results, 10)  # API limit is 10 per request
-            ).execute()
-            
-            # Extract relevant information
-            items = result.get('items', [])
-            search_results = []
-            
-            for item in items:
-                search_results.append({
-                    'title': item.get('title', ''),
-                    'link': item.get('link', ''),
-                    'snippet': item.get('snippet', ''),
-                    'displayLink': item.get('displayLink', '')
-                })
-            
-            return {
-                "status": "success",
-                "query": query,
-                "total_results": result.get('searchInformation', {}).get('totalResults', '0'),
-                "search_time": result.get('searchInformation', {}).get('searchTime', '0'),
-                "results": search_results
-            }
+        Args:
+            query: Search query
+            num_results: Number of results to return (max 100)
             
-        except Exception as e:
+        Returns:
+            Dictionary with search results
+        """
+        if not self.api_key or not self.cse_id:
             return {
                 "status": "error",
-                "error": f"Search failed: {str(e)}",
+                "error": "Google Custom Search service not initialized. Please check your API credentials.",
                 "results": []
             }
 
-# Initialize the search service
-search_service = GoogleSearchService()
+        num_results = max(1, min(num_results, MAX_SEARCH_RESULTS))
+        cached = self.cache.get(query, num_results)
+        if cached is not None:
+            return cached
+
+        pages = self._page_plan(num_results)
+        if not self.cache.try_acquire(len(pages)):
+            return self._fallback(query, num_results, "Daily Custom Search quota exhausted")
+
+        async def request_page(start, count):
+            response = await get_async_client().get(
+                CSE_ENDPOINT,
+                # In a header, so the key never appears in URLs quoted by error messages
+                headers={"X-Goog-Api-Key": self.api_key},
+                params={
+                    "cx": self.cse_id,
+                    "q": query,
+                    "num": count,  # API limit is 10 per request
+                    "start": start
+                }
+            )
+            response.raise_for_status()
+            return response.json()
+
+        async def fetch_page(page):
+            start, count = page
+            try:
+                with tracing.span("cse.page", client=True, start=start, num=count):
+                    return await get_backend("cse", _is_retryable_search_error).call_async(
+                        lambda: request_page(start, count), idempotent=True
+                    )
+            except Exception as e:
+                return e
+
+        responses = await asyncio.gather(*(fetch_page(page) for page in pages))
+        return self._finish(query, num_results, list(responses))
+
+    def close(self) -> None:
+        self.cache.close()
+
+    def _thread_http(self):
+        """Return this thread's HTTP transport (httplib2 objects are not thread-safe)."""
+        http = getattr(self._local, "http", None)
+        if http is None:
+            from googleapiclient.http import build_http
+            http = self._local.http = build_http()
+        return http
+
+    @staticmethod
+    def _page_plan(num_results: int) -> List[Tuple[int, int]]:
+        """Split a request into (start, num) pages of at most 10 results."""
+        return [
+            (start, min(10, num_results - start + 1))
+            for start in range(1, num_results + 1, 10)
+        ]
+
+    def _finish(self, query: str, num_results: int, responses: List[Any]) -> Dict[str, Any]:
+        """Merge page responses, cache the result or fall back on failure."""
+        first = responses[0]
+        if isinstance(first, Exception):
+            if _is_quota_error(first):
+                self.cache.mark_exhausted()
+            return self._fallback(query, num_results, f"Search failed: {_describe_search_error(first)}")
+
+        result = self._parse_response(query, first)
+        seen = {item['link'] for item in result["results"]}
+        for response in responses[1:]:
+            # Later pages that fail only shorten the result list
+            if isinstance(response, Exception):
+                if _is_quota_error(response):
+                    self.cache.mark_exhausted()
+                break
+            page = self._parse_response(query, response)["results"]
+            result["results"].extend(item for item in page if item['link'] not in seen)
+            seen.update(item['link'] for item in page)
+            if len(page) < 10:
+                break
+
+        result["results"] = result["results"][:num_results]
+        if len(result["results"]) == num_results or all(not isinstance(r, Exception) for r in responses):
+            self.cache.put(query, num_results, result)
+        return result
+
+    def _fallback(self, query: str, num_results: int, error: str) -> Dict[str, Any]:
+        """Serve stale cached results when the API cannot be used."""
+        stale = self.cache.get(query, num_results, allow_stale=True)
+        if stale is not None:
+            return stale
+        return {
+            "status": "error",
+            "error": error,
+            "results": []
+        }
+
+    @staticmethod
+    def _parse_response(query: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Extract the relevant fields from a Custom Search API response."""
+        items = result.get('items', [])
+        search_results = []
+        
+        for item in items:
+            search_results.append({
+                'title': item.get('title', ''),
+                'link': item.get('link', ''),
+                'snippet': item.get('snippet', ''),
+                'displayLink': item.get('displayLink', '')
+            })
+        
+        return {
+            "status": "success",
+            "query": query,
+            "total_results": result.get('searchInformation', {}).get('totalResults', '0'),
+            "search_time": result.get('searchInformation', {}).get('searchTime', '0'),
+            "results": search_results
+        }
+
+
+def _error_reasons(error: Exception) -> List[str]:
+    """Return the `error.errors[].reason` values of a Google API error response body."""
+    response = getattr(error, "response", None)
+    if response is not None and hasattr(response, "content"):
+        body = response.content  # httpx
+    else:
+        body = getattr(error, "content", None)  # googleapiclient HttpError
+    try:
+        details = json.loads(body)["error"]
+        return [item["reason"] for item in details.get("errors", []) if item.get("reason")] or (
+            [details["status"]] if details.get("status") else []
+        )
+    except (TypeError, ValueError, KeyError, AttributeError):
+        return []
+
+
+def _describe_search_error(error: Exception) -> str:
+    """
+    Describe a search failure for the tool result.
+
+    Built from the status code and the API's error reason, never from str(error):
+    HTTP client messages quote the request URL, which carries the API key.
+    """
+    status = status_code(error)
+    if status is None:
+        return type(error).__name__
+    reasons = _error_reasons(error)
+    return f"HTTP {status}" + (f" ({', '.join(reasons)})" if reasons else "")
+
+
+def _is_quota_error(error: Exception) -> bool:
+    """Return True if an API error means the daily quota or rate limit was hit."""
+    status = status_code(error)
+    return status == 429 or (
+        status == 403 and any(reason in QUOTA_REASONS for reason in _error_reasons(error))
+    )
+
+
+def _is_retryable_search_error(error: Exception) -> bool:
+    """Transient search failures are retried, but never quota errors (retrying only burns quota)."""
+    return is_transient(error) and not _is_quota_error(error)
+
+# The search service is built on first use, not at import time
+registry.register("search", GoogleSearchService)
+
+
+def get_search_service() -> GoogleSearchService:
+    """Return the shared search service, creating it on first use."""
+    return registry.get("search")
+
+
+def __getattr__(name: str) -> Any:
+    # Keep `researcher.search_service` working for existing callers
+    if name == "search_service":
+        return get_search_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def _format_search_result(query: str, result: Dict[str, Any]) -> dict:
+    """Turn a search service result into the tool response for the agent."""
+    if result["status"] == "success":
+        # Format results for the agent
+        formatted_results = []
+        for item in result["results"]:
+            formatted_results.append(
+                f"Title: {item['title']}\n"
+                f"URL: {item['link']}\n"
+                f"Snippet: {item['snippet']}\n"
+                f"Source: {item['displayLink']}\n"
+            )
+        
+        return {
+            "status": "success",
+            "query": query,
+            "total_results": result["total_results"],
+            "search_time": result["search_time"],
+            "formatted_results": "\n---\n".join(formatted_results),
+            "raw_results": result["results"],
+            "from_cache": result.get("cache")
+        }
+    else:
+        return {
+            "status": "error",
+            "query": query,
+            "error": result.get("error", "Unknown error occurred"),
+            "formatted_results": f"Search failed for query '{query}': {result.get('error', 'Unknown error')}"
+        }
 
+@tracing.traced("tool:google_search")
+@coalesce("google_search", query=normalize_query)
 def google_search(query: str, num_results: int = 5) -> dict:
     """
     Google search tool function for the agent.
     
     Args:
         query: The search query
-        num_results: Number of results to return (default: 5, max: 10)
+        num_results: Number of results to return (default: 5, max: 100)
         
     Returns:
         Dictionary with search results
     """
     try:
-        result = search_service.search(query, num_results)
-        
-        if result["status"] == "success":
-            # Format results for the agent
-            formatted_results = []
-            for item in result["results"]:
-                formatted_results.append(
-                    f"Title: {item['title']}\n"
-                    f"URL: {item['link']}\n"
-                    f"Snippet: {item['snippet']}\n"
-                    f"Source: {item['displayLink']}\n"
-                )
+        result = get_search_service().search(query, num_results)
+        return _format_search_result(query, result)
             
-            return {
-                "status": "success",
-                "query": query,
-                "total_results": result["total_results"],
-                "search_time": result["search_time"],
-                "formatted_results": "\n---\n".join(formatted_results),
-                "raw_results": result["results"]
-            }
-        else:
-            return {
-                "status": "error",
-                "query": query,
-                "error": result.get("error", "Unknown error occurred"),
-                "formatted_results": f"Search failed for query '{query}': {result.get('error', 'Unknown error')}"
-            }
+    except Exception as e:
+        return {
+            "status": "error",
+            "query": query,
+            "error": str(e),
+            "formatted_results": f"Error performing search for '{query}': {str(e)}"
+        }
+
+@tracing.traced("tool:google_search_async")
+@coalesce("google_search", query=normalize_query)
+async def google_search_async(query: str, num_results: int = 5) -> dict:
+    """
+    Google search tool function for the agent (non-blocking).
+    
+    Args:
+        query: The search query
+        num_results: Number of results to return (default: 5, max: 100)
+        
+    Returns:
+        Dictionary with search results
+    """
+    try:
+        result = await get_search_service().search_async(query, num_results)
+        return _format_search_result(query, result)
             
     except Exception as e:
         return {
@@ -132,6 +383,8 @@ def google_search(query: str, num_results: int = 5) -> dict:
             "formatted_results": f"Error performing search for '{query}': {str(e)}"
         }
 
+@tracing.traced("tool:web_scrape")
+@coalesce("web_scrape", url=normalize_url)
 def web_scrape(url: str) -> dict:
     """
     Simple web scraping tool to get content from a URL.
@@ -143,41 +396,78 @@ def web_scrape(url: str) -> dict:
         Dictionary with the scraped content
     """
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        # Simple text extraction (you might want to use BeautifulSoup for better parsing)
-        content = response.text
+        # Pooled connection, served from the HTTP cache when still fresh. The body
+        # is parsed as it streams in and the download stops once there is enough text.
+        with tracing.span("http.fetch", client=True, host=urlparse(url).netloc) as span:
+            # Retries transient failures; repeated failures open the circuit for this host only
+            extractor, source, bytes_read, truncated = get_backend("web").call(
+                lambda: fetch_through_cache(
+                    get_session(), get_http_cache(), url, DEFAULT_TIMEOUT, make_extractor, MAX_SCRAPE_BYTES
+                ),
+                key=urlparse(url).netloc,
+            )
+            span.set_attribute("source", source)
+            span.set_attribute("bytes_read", bytes_read)
+        clean_content = extractor.text()
         
-        # Basic cleanup - extract text between body tags if present
-        if '<body' in content.lower() and '</body>' in content.lower():
-            start = content.lower().find('<body')
-            start = content.find('>', start) + 1
-            end = content.lower().rfind('</body>')
-            content = content[start:end]
+        return {
+            "status": "success",
+            "url": url,
+            "content": clean_content,
+            "length": len(clean_content),
+            "bytes_read": bytes_read,
+            "truncated": truncated
+        }
         
-        # Remove HTML tags (basic approach)
-        import re
-        clean_content = re.sub(r'<[^>]+>', ' ', content)
-        clean_content = re.sub(r'\s+', ' ', clean_content).strip()
+    except requests.exceptions.RequestException as e:
+        return {
+            "status": "error",
+            "url": url,
+            "error": f"Failed to fetch URL: {str(e)}",
+            "content": ""
+        }
+    except Exception as e:
+        return {
+            "status": "error",
+            "url": url,
+            "error": f"Error processing URL: {str(e)}",
+            "content": ""
+        }
+
+@tracing.traced("tool:web_scrape_async")
+@coalesce("web_scrape", url=normalize_url)
+async def web_scrape_async(url: str) -> dict:
+    """
+    Web scraping tool to get content from a URL (non-blocking).
+    
+    Args:
+        url: The URL to scrape
         
-        # Limit content length
-        max_length = 2000
-        if len(clean_content) > max_length:
-            clean_content = clean_content[:max_length] + "..."
+    Returns:
+        Dictionary with the scraped content
+    """
+    try:
+        with tracing.span("http.fetch", client=True, host=urlparse(url).netloc) as span:
+            extractor, source, bytes_read, truncated = await get_backend("web").call_async(
+                lambda: fetch_through_cache_async(
+                    get_async_client(), get_http_cache(), url, make_extractor, MAX_SCRAPE_BYTES
+                ),
+                key=urlparse(url).netloc,
+            )
+            span.set_attribute("source", source)
+            span.set_attribute("bytes_read", bytes_read)
+        clean_content = extractor.text()
         
         return {
             "status": "success",
             "url": url,
             "content": clean_content,
-            "length": len(clean_content)
+            "length": len(clean_content),
+            "bytes_read": bytes_read,
+            "truncated": truncated
         }
         
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         return {
             "status": "error",
             "url": url,
@@ -192,26 +482,90 @@ def web_scrape(url: str) -> dict:
             "content": ""
         }
 
+@tracing.traced("tool:web_scrape_many")
+async def web_scrape_many(urls: List[str], timeout_seconds: float = 20.0) -> dict:
+    """
+    Scrape several URLs concurrently.
+    
+    Args:
+        urls: The URLs to scrape
+        timeout_seconds: Overall deadline for the whole batch (default: 20)
+        
+    Returns:
+        Dictionary with one result per URL (in input order), including pages that
+        failed or did not finish before the deadline, and per-URL timings
+    """
+    started = time.perf_counter()
+    unique_urls = list(dict.fromkeys(urls))
+    global_limit = asyncio.Semaphore(int(os.getenv("SCRAPE_MAX_CONCURRENCY", "8")))
+    per_host = int(os.getenv("SCRAPE_MAX_PER_HOST", "2"))
+    host_limits: Dict[str, asyncio.Semaphore] = {}
+
+    async def scrape_one(url: str) -> dict:
+        host_limit = host_limits.setdefault(urlparse(url).netloc, asyncio.Semaphore(per_host))
+        async with host_limit:
+            async with global_limit:
+                fetch_started = time.perf_counter()
+                result = await web_scrape_async(url)
+        result["elapsed_ms"] = round((time.perf_counter() - fetch_started) * 1000, 1)
+        return result
+
+    tasks = {url: asyncio.ensure_future(scrape_one(url)) for url in unique_urls}
+    if tasks:
+        _, pending = await asyncio.wait(tasks.values(), timeout=timeout_seconds)
+        for task in pending:
+            task.cancel()
+
+    results = {}
+    for url, task in tasks.items():
+        if task.done() and not task.cancelled() and task.exception() is None:
+            results[url] = task.result()
+        elif task.done() and not task.cancelled():
+            results[url] = {"status": "error", "url": url, "error": f"Error processing URL: {task.exception()}", "content": ""}
+        else:
+            results[url] = {
+                "status": "timeout",
+                "url": url,
+                "error": f"Not finished within {timeout_seconds} seconds",
+                "content": "",
+                "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)
+            }
+
+    ordered = [results[url] for url in urls]
+    return {
+        "status": "success" if any(result["status"] == "success" for result in ordered) else "error",
+        "results": ordered,
+        "succeeded": sum(1 for result in results.values() if result["status"] == "success"),
+        "failed": sum(1 for result in results.values() if result["status"] == "error"),
+        "timed_out": sum(1 for result in results.values() if result["status"] == "timeout"),
+        "total_elapsed_ms": round((time.perf_counter() - started) * 1000, 1)
+    }
+
 root_agent = Agent(
     name="researcher",
     model="gemini-3.0-flash",
     description="Fetches information using Google Custom Search API and web scraping tools.",
     instruction="""You are a research agent that can search the web for information and scrape web pages. 
 
-    Use the google_search tool to find relevant information on the web. The tool returns formatted search results with titles, URLs, and snippets.
+    Use the google_search_async tool to find relevant information on the web. The tool returns formatted search results with titles, URLs, and snippets.
     
-    Use the web_scrape tool to get detailed content from specific URLs when you need more information than what's available in the search snippets.
+    Use the web_scrape_async tool to get detailed content from specific URLs when you need more information than what's available in the search snippets.
+    When you need the content of several pages (for example the top search results), use web_scrape_many to fetch them all in one call.
     
     When responding:
     1. Perform searches using relevant keywords
     2. Analyze the search results and identify the most relevant sources
-    3. If needed, scrape specific URLs for more detailed information
+    3. If needed, scrape specific URLs for more detailed information (several at once with web_scrape_many)
     4. Provide comprehensive answers based on the collected information
     5. Always cite your sources with URLs when possible
     6. If search fails or returns no results, acknowledge this clearly
     
+    Long page contents are shortened; the full text is listed under artifacts in the result and can be
+    read with load_artifacts when the excerpt is not enough.
+
     Be thorough in your research and provide accurate, up-to-date information.""",
-    tools=[google_search, web_scrape],
+    tools=[google_search_async, web_scrape_async, web_scrape_many, load_artifacts],
+    **tracing.agent_callbacks(after_tool=shape_tool_result),
 )
 
 # Example usage and testing
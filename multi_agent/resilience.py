@@ -0,0 +1,454 @@
+"""
+Shared resilience layer for calls to external backends.
+
+Each backend (Gemini, the retrieval backend, the Custom Search API, scraped
+websites) gets a `Backend` that wraps its calls with:
+
+- a per-attempt timeout;
+- retries of transient failures (timeouts, connection errors, 429 and 5xx)
+  with full-jitter exponential backoff, never sleeping past the deadline;
+- optional hedging for idempotent reads: if an attempt is still running
+  after `hedge_after` seconds a duplicate is started and the first result
+  wins;
+- a circuit breaker that fails fast after repeated transient failures and
+  lets a single probe through once the reset timeout has passed.
+
+Policies are configured per backend with RESILIENCE_<BACKEND>_<SETTING>
+environment variables (for example RESILIENCE_CSE_ATTEMPTS), falling back
+to RESILIENCE_<SETTING> and then to the backend's defaults.
+"""
+
+import asyncio
+import contextlib
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional
+
+from multi_agent import tracing
+from multi_agent.services import registry
+
+# Keyed circuit breakers kept per backend before closed ones are dropped
+MAX_BREAKERS = 1024
+
+# Status codes worth retrying
+TRANSIENT_STATUS = {408, 429, 500, 502, 503, 504}
+
+# Absolute deadline (time.monotonic()) of the current request, if any
+_deadline: ContextVar[Optional[float]] = ContextVar("resilience_deadline", default=None)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a backend whose circuit breaker is open."""
+
+
+def status_code(error: BaseException) -> Optional[int]:
+    """Return the HTTP status behind an exception from requests, httpx, googleapiclient or google-api-core."""
+    for owner, attribute in (("response", "status_code"), ("resp", "status")):
+        status = getattr(getattr(error, owner, None), attribute, None)
+        if status is not None:
+            try:
+                return int(status)
+            except (TypeError, ValueError):
+                return None
+    code = getattr(error, "code", None)
+    return code if isinstance(code, int) else None
+
+
+def is_transient(error: BaseException) -> bool:
+    """Return True if the call may succeed when retried."""
+    if isinstance(error, CircuitOpenError):
+        return False
+    status = status_code(error)
+    if status is not None:
+        return status in TRANSIENT_STATUS
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    # Connection and timeout errors of the HTTP libraries, without importing them here
+    names = {cls.__name__ for cls in type(error).__mro__}
+    return bool(names & {"ConnectionError", "Timeout", "TimeoutException", "TransportError", "ServiceUnavailable", "DeadlineExceeded"})
+
+
+@contextlib.contextmanager
+def deadline(seconds: float) -> Iterator[None]:
+    """Bound every resilient call made in this context (including retries) to `seconds` from now."""
+    end = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(end if current is None else min(current, end))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+class Policy:
+    """Retry, timeout, hedging and circuit breaker settings for one backend."""
+
+    def __init__(
+        self,
+        attempts: int = 3,
+        base_delay: float = 0.2,
+        max_delay: float = 2.0,
+        timeout: float = 0.0,
+        budget: float = 0.0,
+        hedge_after: float = 0.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+    ):
+        """
+        Args:
+            attempts: Maximum attempts per call, including the first
+            base_delay: Backoff before the first retry, doubled for each retry (seconds)
+            max_delay: Upper bound of a single backoff (seconds)
+            timeout: Per-attempt timeout (seconds, 0 for none)
+            budget: Time allowed for a call including retries (seconds, 0 for none)
+            hedge_after: Start a duplicate of an idempotent read still running after
+                this many seconds (0 disables hedging)
+            failure_threshold: Consecutive transient failures that open the circuit
+                (0 disables the breaker)
+            reset_timeout: Seconds the circuit stays open before a probe is allowed
+        """
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.budget = budget
+        self.hedge_after = hedge_after
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+    @classmethod
+    def from_env(cls, name: str, **defaults: Any) -> "Policy":
+        """Build a policy from RESILIENCE_<NAME>_* and RESILIENCE_* variables over `defaults`."""
+        policy = cls(**defaults)
+        for setting, value in vars(policy).items():
+            raw = os.getenv(f"RESILIENCE_{name.upper()}_{setting.upper()}", os.getenv(f"RESILIENCE_{setting.upper()}"))
+            if raw is not None:
+                setattr(policy, setting, type(value)(float(raw)))
+        policy.attempts = max(1, policy.attempts)
+        return policy
+
+    def backoff(self, retry: int) -> float:
+        """Full-jitter backoff before retry number `retry` (starting at 1)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (retry - 1)))
+
+
+class CircuitBreaker:
+    """Closed / open / half-open circuit breaker counting consecutive failures."""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opens = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Return True if a call may go ahead; in half-open state only one probe at a time."""
+        if self.failure_threshold <= 0:
+            return True
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def retry_in(self) -> float:
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == "half_open" or (self.failure_threshold > 0 and self.failures >= self.failure_threshold):
+                if self.state != "open":
+                    self.opens += 1
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """End a probe that finished without a verdict (e.g. a non-transient error)."""
+        with self._lock:
+            self._probing = False
+
+
+# Worker threads for sync calls that need a timeout or a hedge
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_worker = threading.local()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=int(os.getenv("RESILIENCE_MAX_THREADS", "32")),
+                    thread_name_prefix="resilience",
+                    initializer=lambda: setattr(_worker, "active", True),
+                )
+    return _executor
+
+
+class Backend:
+    """Resilient call wrapper for one backend, with its own breakers and metrics."""
+
+    def __init__(self, name: str, policy: Policy, retryable: Callable[[BaseException], bool] = is_transient):
+        """
+        Args:
+            name: Backend name, used in errors and metrics
+            policy: Retry, timeout, hedging and breaker settings
+            retryable: Decides whether a failure is transient (retried and counted by the breaker)
+        """
+        self.name = name
+        self.policy = policy
+        self.retryable = retryable
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+        self.calls = 0
+        self.failures = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.short_circuits = 0
+
+    def breaker(self, key: str = "") -> CircuitBreaker:
+        """Return the circuit breaker for `key` (e.g. a host), creating it on first use."""
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            with self._lock:
+                if len(self._breakers) >= MAX_BREAKERS:
+                    # Keyed breakers (one per host) must not grow without bound; closed ones hold no state worth keeping
+                    self._breakers = {k: b for k, b in self._breakers.items() if b.state != "closed" or b.failures}
+                breaker = self._breakers.setdefault(
+                    key, CircuitBreaker(self.policy.failure_threshold, self.policy.reset_timeout)
+                )
+        return breaker
+
+    def _count(self, **increments: int) -> None:
+        with self._lock:
+            for counter, increment in increments.items():
+                setattr(self, counter, getattr(self, counter) + increment)
+
+    def _end(self) -> Optional[float]:
+        """Absolute deadline of this call: the policy budget bounded by the request deadline."""
+        end = _deadline.get()
+        if self.policy.budget > 0:
+            own = time.monotonic() + self.policy.budget
+            end = own if end is None else min(end, own)
+        return end
+
+    def _attempt_timeout(self, end: Optional[float]) -> Optional[float]:
+        timeout = self.policy.timeout or None
+        if end is not None:
+            remaining = end - time.monotonic()
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        return timeout
+
+    def _enter(self, key: str) -> CircuitBreaker:
+        breaker = self.breaker(key)
+        if not breaker.allow():
+            self._count(calls=1, short_circuits=1)
+            label = f"{self.name}:{key}" if key else self.name
+            raise CircuitOpenError(f"Backend '{label}' is unavailable (circuit open, retrying in {breaker.retry_in():.0f}s)")
+        self._count(calls=1)
+        return breaker
+
+    def _next_delay(self, retry: int, error: BaseException, end: Optional[float]) -> Optional[float]:
+        """Return the backoff before the next attempt, or None if the call should give up."""
+        if retry >= self.policy.attempts or not self.retryable(error):
+            return None
+        delay = self.policy.backoff(retry)
+        # Do not start an attempt that cannot finish before the deadline
+        if end is not None and time.monotonic() + delay >= end:
+            return None
+        return delay
+
+    def _settle(self, breaker: CircuitBreaker, error: Optional[BaseException]) -> None:
+        if error is None:
+            breaker.record_success()
+        elif self.retryable(error):
+            breaker.record_failure()
+        else:
+            breaker.release()
+
+    def call(self, fn: Callable[[], Any], idempotent: bool = False, key: str = "") -> Any:
+        """
+        Call `fn()` with retries, timeouts, hedging (if idempotent) and the circuit breaker.
+
+        Args:
+            fn: Zero-argument callable making one attempt
+            idempotent: Allow hedged duplicate attempts
+            key: Circuit breaker key within this backend (e.g. a host name)
+        """
+        breaker = self._enter(key)
+        end = self._end()
+        retry = 0
+        while True:
+            try:
+                result = self._attempt(fn, idempotent, end)
+                self._settle(breaker, None)
+                return result
+            except Exception as e:
+                retry += 1
+                delay = self._next_delay(retry, e, end)
+                if delay is None:
+                    self._count(failures=1)
+                    self._settle(breaker, e)
+                    raise
+                self._count(retries=1)
+                time.sleep(delay)
+
+    def _attempt(self, fn: Callable[[], Any], idempotent: bool, end: Optional[float]) -> Any:
+        timeout = self._attempt_timeout(end)
+        hedge = idempotent and self.policy.hedge_after > 0
+        # Worker threads run attempts inline so that nested calls cannot exhaust the pool
+        if (timeout is None and not hedge) or getattr(_worker, "active", False):
+            return fn()
+
+        executor = _get_executor()
+        started = time.monotonic()
+        futures = [executor.submit(tracing.bind(fn))]
+        if hedge:
+            done, _ = wait(futures, timeout=self.policy.hedge_after if timeout is None else min(self.policy.hedge_after, timeout))
+            if not done and (timeout is None or time.monotonic() - started < timeout):
+                self._count(hedges=1)
+                futures.append(executor.submit(tracing.bind(fn)))
+
+        remaining = None if timeout is None else max(0.0, timeout - (time.monotonic() - started))
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None or not pending:
+                    if future is not futures[0]:
+                        self._count(hedge_wins=1)
+                    return future.result()
+            if remaining is not None:
+                remaining = max(0.0, timeout - (time.monotonic() - started))
+        # Abandoned attempts finish in the background; their results are dropped
+        self._count(timeouts=1)
+        raise TimeoutError(f"{self.name} call timed out after {timeout:.1f}s")
+
+    async def call_async(self, fn: Callable[[], Awaitable[Any]], idempotent: bool = False, key: str = "") -> Any:
+        """Async version of `call`; `fn` returns a new awaitable for every attempt."""
+        breaker = self._enter(key)
+        end = self._end()
+        retry = 0
+        while True:
+            try:
+                result = await self._attempt_async(fn, idempotent, end)
+                self._settle(breaker, None)
+                return result
+            except Exception as e:
+                retry += 1
+                delay = self._next_delay(retry, e, end)
+                if delay is None:
+                    self._count(failures=1)
+                    self._settle(breaker, e)
+                    raise
+                self._count(retries=1)
+                await asyncio.sleep(delay)
+
+    async def _attempt_async(self, fn: Callable[[], Awaitable[Any]], idempotent: bool, end: Optional[float]) -> Any:
+        timeout = self._attempt_timeout(end)
+        if not (idempotent and self.policy.hedge_after > 0):
+            try:
+                return await asyncio.wait_for(fn(), timeout)
+            except asyncio.TimeoutError:
+                self._count(timeouts=1)
+                raise
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        first = asyncio.ensure_future(fn())
+        tasks = [first]
+        try:
+            hedge_wait = self.policy.hedge_after if timeout is None else min(self.policy.hedge_after, timeout)
+            done, _ = await asyncio.wait(tasks, timeout=hedge_wait)
+            if not done and (timeout is None or loop.time() - started < timeout):
+                self._count(hedges=1)
+                tasks.append(asyncio.ensure_future(fn()))
+
+            pending = set(tasks)
+            while pending:
+                remaining = None if timeout is None else max(0.0, timeout - (loop.time() - started))
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    break
+                for task in done:
+                    if task.exception() is None or not pending:
+                        if task is not first:
+                            self._count(hedge_wins=1)
+                        return task.result()
+            self._count(timeouts=1)
+            raise asyncio.TimeoutError(f"{self.name} call timed out after {timeout:.1f}s")
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = {
+                counter: getattr(self, counter)
+                for counter in ("calls", "failures", "retries", "timeouts", "hedges", "hedge_wins", "short_circuits")
+            }
+            breakers = dict(self._breakers)
+        stats["breakers"] = {
+            key or "default": {"state": breaker.state, "opens": breaker.opens} for key, breaker in breakers.items()
+        }
+        return stats
+
+
+# Defaults per backend, overridable through RESILIENCE_* variables
+DEFAULT_POLICIES: Dict[str, Dict[str, Any]] = {
+    "gemini": {"attempts": 3, "timeout": 60.0},
+    "retrieval": {"attempts": 3, "timeout": 10.0, "hedge_after": 1.0},
+    "cse": {"attempts": 3, "timeout": 10.0},
+    "web": {"attempts": 2, "failure_threshold": 3, "reset_timeout": 60.0},
+}
+
+# Backends by name; kept in the registry so that breakers are shared process-wide
+registry.register("resilience_backends", dict)
+_backends_lock = threading.Lock()
+
+
+def get_backend(name: str, retryable: Callable[[BaseException], bool] = is_transient) -> Backend:
+    """Return the shared resilient wrapper for a backend, configured from the environment on first use."""
+    backends = registry.get("resilience_backends")
+    backend = backends.get(name)
+    if backend is None:
+        with _backends_lock:
+            backend = backends.get(name)
+            if backend is None:
+                policy = Policy.from_env(name, **DEFAULT_POLICIES.get(name, {}))
+                backend = backends[name] = Backend(name, policy, retryable)
+    return backend
+
+
+def resilience_stats() -> Dict[str, Any]:
+    """Return call, retry, hedge and breaker metrics for every backend used so far."""
+    if not registry.is_ready("resilience_backends"):
+        return {}
+    return {name: backend.stats() for name, backend in list(registry.get("resilience_backends").items())}
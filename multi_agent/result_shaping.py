@@ -0,0 +1,169 @@
+"""
+Compact, size-bounded tool results for the LLM context.
+
+Tool results become part of the session and are re-sent to the model on
+every later turn of the coordinator / conversation / researcher chain, so
+the agents' after-tool callback reshapes them before they enter the session:
+
+- fields that duplicate others are dropped: `raw_results` repeats
+  `formatted_results`, and `retrieved_documents` is already quoted by the
+  `answer`;
+- every other text field is capped at a token budget;
+- whatever was dropped or cut is saved to the session's artifact store and
+  the result keeps its handle under `artifacts`, so the model can read it
+  with the `load_artifacts` tool when it really needs it. Without an
+  artifact service, the content is simply left out.
+
+The tools still return full results to direct callers (scripts, tests and
+the parallel research agent). The size of every shaped result is added to
+it as `result_tokens`, recorded on a trace span and counted per tool in
+`shaping_stats()`.
+
+TOOL_RESULT_MODE=full turns shaping off (tokens are still counted).
+"""
+
+import json
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from google.genai import types
+
+from multi_agent import tracing
+from multi_agent.context_packing import count_tokens, truncate_to_tokens
+from multi_agent.services import registry
+
+# Fields that repeat information found elsewhere in the same result, per tool (without "_async")
+DUPLICATE_FIELDS = {
+    "google_search": ("raw_results",),
+    "rag_search": ("retrieved_documents",),
+    "rag_search_batch": ("retrieved_documents",),
+}
+
+ARTIFACTS_NOTE = "Fields listed in artifacts were shortened or left out; call load_artifacts with a name to read one in full."
+
+
+class ResultShaper:
+    """Drop duplicated fields and cap text fields of a tool result."""
+
+    def __init__(self, mode: str = "compact", field_tokens: int = 600):
+        """
+        Args:
+            mode: "compact" to shape results, "full" to leave them unchanged
+            field_tokens: Maximum estimated tokens per text field (per item for lists of results)
+        """
+        self.mode = mode
+        self.field_tokens = field_tokens
+
+    @classmethod
+    def from_env(cls) -> "ResultShaper":
+        """Build a shaper from TOOL_RESULT_* environment variables."""
+        return cls(
+            mode=os.getenv("TOOL_RESULT_MODE", "compact").strip().lower(),
+            field_tokens=int(os.getenv("TOOL_RESULT_FIELD_TOKENS", "600")),
+        )
+
+    def shape(self, tool_name: str, result: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Shape a tool result.
+
+        Returns:
+            Tuple of (compact result, removed or truncated content by field path)
+        """
+        if self.mode == "full":
+            return result, {}
+        base_name = tool_name[:-len("_async")] if tool_name.endswith("_async") else tool_name
+        payloads: Dict[str, Any] = {}
+        shaped = self._shape_fields(result, DUPLICATE_FIELDS.get(base_name, ()), "", payloads)
+        return shaped, payloads
+
+    def _shape_fields(self, result: Dict[str, Any], duplicates, prefix: str, payloads: Dict[str, Any]) -> Dict[str, Any]:
+        shaped = {}
+        for field, value in result.items():
+            path = prefix + field
+            if field in duplicates:
+                payloads[path] = value
+            elif isinstance(value, str) and count_tokens(value) > self.field_tokens:
+                payloads[path] = value
+                shaped[field] = truncate_to_tokens(value, self.field_tokens)
+            elif field == "results" and isinstance(value, list):
+                # Batch tools (web_scrape_many, rag_search_batch) return one result per item
+                shaped[field] = [
+                    self._shape_fields(item, duplicates, f"{path}.{index}.", payloads) if isinstance(item, dict) else item
+                    for index, item in enumerate(value)
+                ]
+            else:
+                shaped[field] = value
+        return shaped
+
+
+class ShapingStats:
+    """Per-tool counts of results and of their tokens before and after shaping."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tools: Dict[str, Dict[str, int]] = {}
+
+    def record(self, tool_name: str, raw_tokens: int, tokens: int, artifacts: int) -> None:
+        with self._lock:
+            stats = self._tools.setdefault(tool_name, {"results": 0, "raw_tokens": 0, "tokens": 0, "artifacts": 0})
+            stats["results"] += 1
+            stats["raw_tokens"] += raw_tokens
+            stats["tokens"] += tokens
+            stats["artifacts"] += artifacts
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                name: {**stats, "saved_ratio": 1 - stats["tokens"] / stats["raw_tokens"] if stats["raw_tokens"] else 0.0}
+                for name, stats in self._tools.items()
+            }
+
+
+registry.register("result_shaper", ResultShaper.from_env)
+registry.register("result_shaping_stats", ShapingStats)
+
+
+def _tokens(value: Any) -> int:
+    return count_tokens(json.dumps(value, ensure_ascii=False, default=str))
+
+
+async def shape_tool_result(tool, args: Dict[str, Any], tool_context, tool_response: Any) -> Optional[Dict[str, Any]]:
+    """ADK after-tool callback that replaces the tool result with its compact form."""
+    if not isinstance(tool_response, dict):
+        return None
+
+    shaped, payloads = registry.get("result_shaper").shape(tool.name, tool_response)
+    handles = {}
+    for path, value in payloads.items():
+        handle = f"{tool.name}-{tool_context.function_call_id}-{path}.txt"
+        text = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False, indent=2, default=str)
+        try:
+            await tool_context.save_artifact(handle, types.Part(text=text))
+        except ValueError:
+            # No artifact service configured for this runner
+            break
+        handles[path] = handle
+    if handles:
+        shaped = {**shaped, "artifacts": handles, "artifacts_note": ARTIFACTS_NOTE}
+
+    raw_tokens = _tokens(tool_response)
+    tokens = _tokens(shaped)
+    if shaped is not tool_response:
+        shaped = {**shaped, "result_tokens": tokens}
+    registry.get("result_shaping_stats").record(tool.name, raw_tokens, tokens, len(handles))
+
+    parent = tracing.invocation_span(tool_context.invocation_id, tool_context.agent_name)
+    with tracing.span(f"tool_result:{tool.name}", parent=parent) as span:
+        span.set_attribute("tool_result.raw_tokens", raw_tokens)
+        span.set_attribute("tool_result.tokens", tokens)
+        span.set_attribute("tool_result.artifacts", len(handles))
+
+    return shaped if shaped is not tool_response else None
+
+
+def shaping_stats() -> Dict[str, Any]:
+    """Return result and token counts per tool since the process started."""
+    if not registry.is_ready("result_shaping_stats"):
+        return {}
+    return registry.get("result_shaping_stats").snapshot()
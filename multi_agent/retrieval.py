@@ -0,0 +1,393 @@
+"""
+Pluggable retrieval backends for the RAG service.
+
+Every backend exposes the subset of the Chroma collection API that the RAG
+service uses (`query`, `upsert`, `count`) and returns Chroma-shaped results,
+so backends can be swapped with the RAG_BACKEND setting:
+
+    cloud       Chroma Cloud (default)
+    persistent  Chroma PersistentClient on local disk
+    memory      Chroma in-process EphemeralClient
+    local       LocalVectorIndex: memory-mapped NumPy index on local disk
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from multi_agent.clients import get_chroma_client
+from multi_agent.embeddings import Embedder
+from multi_agent.services import cache_path
+
+EmbedFn = Callable[[List[str]], List[List[float]]]
+
+# Collection used by the Chroma backends
+COLLECTION_NAME = "uniplexity_collection"
+
+
+class RetrievalBackend:
+    """Interface implemented by every retrieval backend."""
+
+    namespace = "default"
+    """Identifies the stored collection; indexes derived from it (e.g. BM25) are kept per namespace."""
+
+    def query(self, query_texts: List[str], n_results: int = 1, include: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Return the top `n_results` documents for each query text.
+
+        Returns:
+            Chroma-shaped dict with "ids", "documents", "distances" and
+            "metadatas" lists, one inner list per query
+        """
+        raise NotImplementedError
+
+    def upsert(self, ids: List[str], documents: List[str], metadatas: Optional[List[Dict[str, Any]]] = None) -> None:
+        """Insert or replace documents by ID."""
+        raise NotImplementedError
+
+    def count(self) -> int:
+        """Return the number of stored documents."""
+        raise NotImplementedError
+
+    def iter_documents(self, batch_size: int = 500) -> Iterator[Tuple[List[str], List[str], List[Dict[str, Any]]]]:
+        """Yield every stored document as (ids, documents, metadatas) batches."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Release files and connections held by the backend."""
+
+
+class ChromaBackend(RetrievalBackend):
+    """Retrieval backed by a Chroma collection (cloud, persistent or in-memory)."""
+
+    def __init__(
+        self,
+        collection: Any,
+        embed_fn: Optional[EmbedFn] = None,
+        query_embed_fn: Optional[EmbedFn] = None,
+        namespace: Optional[str] = None,
+    ):
+        """
+        Args:
+            collection: Chroma collection
+            embed_fn: Optional document embedder; when omitted the collection's embedding function runs on every call
+            query_embed_fn: Optional client-side query embedder (defaults to embed_fn)
+            namespace: Identifies the collection (default: "chroma:" and the collection name)
+        """
+        self.collection = collection
+        self.namespace = namespace or f"chroma:{getattr(collection, 'name', COLLECTION_NAME)}"
+        self.embed_fn = embed_fn
+        self.query_embed_fn = query_embed_fn or embed_fn
+
+    def query(self, query_texts: List[str], n_results: int = 1, include: Optional[List[str]] = None) -> Dict[str, Any]:
+        include = include or ["documents", "distances", "metadatas"]
+        if self.query_embed_fn is not None:
+            return self.collection.query(
+                query_embeddings=self.query_embed_fn(query_texts), n_results=n_results, include=include
+            )
+        return self.collection.query(query_texts=query_texts, n_results=n_results, include=include)
+
+    def upsert(self, ids: List[str], documents: List[str], metadatas: Optional[List[Dict[str, Any]]] = None) -> None:
+        kwargs = {"ids": ids, "documents": documents}
+        if metadatas is not None:
+            kwargs["metadatas"] = metadatas
+        if self.embed_fn is not None:
+            kwargs["embeddings"] = self.embed_fn(documents)
+        self.collection.upsert(**kwargs)
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def iter_documents(self, batch_size: int = 500) -> Iterator[Tuple[List[str], List[str], List[Dict[str, Any]]]]:
+        offset = 0
+        while True:
+            batch = self.collection.get(include=["documents", "metadatas"], limit=batch_size, offset=offset)
+            ids = batch.get("ids") or []
+            if not ids:
+                return
+            documents = batch.get("documents") or [""] * len(ids)
+            metadatas = [metadata or {} for metadata in batch.get("metadatas") or [None] * len(ids)]
+            yield ids, documents, metadatas
+            offset += len(ids)
+
+
+class LocalVectorIndex(RetrievalBackend):
+    """
+    In-process vector index persisted to a directory.
+
+    Embeddings are L2-normalized float32 rows in a memory-mapped matrix and
+    searched with a single matrix product (cosine distance). Documents and
+    metadata live in SQLite. With `n_partitions` > 0 an IVF layer clusters the
+    rows with k-means and only the `n_probe` nearest partitions are scanned.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        embed_fn: EmbedFn,
+        query_embed_fn: Optional[EmbedFn] = None,
+        n_partitions: int = 0,
+        n_probe: int = 4,
+        train_threshold: int = 10000,
+    ):
+        """
+        Args:
+            path: Directory holding the index files
+            embed_fn: Embeds documents
+            query_embed_fn: Embeds queries (defaults to embed_fn)
+            n_partitions: IVF partitions (0 disables partitioning)
+            n_probe: Partitions scanned per query when IVF is enabled
+            train_threshold: Rows needed before the IVF partitions are trained
+        """
+        self.path = path
+        self.namespace = f"local:{os.path.abspath(path)}"
+        self.embed_fn = embed_fn
+        self.query_embed_fn = query_embed_fn or embed_fn
+        self.n_partitions = n_partitions
+        self.n_probe = n_probe
+        self.train_threshold = train_threshold
+        self._lock = threading.RLock()
+
+        os.makedirs(path, exist_ok=True)
+        self._meta_path = os.path.join(path, "index.json")
+        self._matrix_path = os.path.join(path, "embeddings.f32")
+        self._assign_path = os.path.join(path, "partitions.i32")
+        self._centroids_path = os.path.join(path, "centroids.npy")
+
+        self._db = sqlite3.connect(os.path.join(path, "documents.sqlite"), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS documents (row INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL, "
+            "document TEXT NOT NULL, metadata TEXT NOT NULL)"
+        )
+
+        meta = {"count": 0, "capacity": 0, "dim": 0}
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        self._count = meta["count"]
+        self._capacity = meta["capacity"]
+        self._dim = meta["dim"]
+        self._matrix = self._open_matrix() if self._capacity else None
+        self._assignments = self._open_assignments() if self._capacity else None
+        self._centroids = np.load(self._centroids_path) if os.path.exists(self._centroids_path) else None
+
+    def _open_matrix(self) -> np.memmap:
+        return np.memmap(self._matrix_path, dtype=np.float32, mode="r+", shape=(self._capacity, self._dim))
+
+    def _open_assignments(self) -> np.memmap:
+        return np.memmap(self._assign_path, dtype=np.int32, mode="r+", shape=(self._capacity,))
+
+    def close(self) -> None:
+        with self._lock:
+            for array in (self._matrix, self._assignments):
+                if array is not None:
+                    array.flush()
+            self._db.close()
+
+    def _save_meta(self) -> None:
+        with open(self._meta_path, "w", encoding="utf-8") as f:
+            json.dump({"count": self._count, "capacity": self._capacity, "dim": self._dim}, f)
+
+    def _ensure_capacity(self, rows: int) -> None:
+        if rows <= self._capacity:
+            return
+        capacity = max(rows, self._capacity * 2, 1024)
+        old_matrix, old_assignments = self._matrix, self._assignments
+        # Grow the files in place; existing rows keep their offsets
+        for path, itemsize in ((self._matrix_path, 4 * self._dim), (self._assign_path, 4)):
+            with open(path, "ab") as f:
+                f.truncate(capacity * itemsize)
+        del old_matrix, old_assignments
+        self._capacity = capacity
+        self._matrix = self._open_matrix()
+        self._assignments = self._open_assignments()
+
+    @staticmethod
+    def _normalize(vectors: Any) -> np.ndarray:
+        array = np.asarray(vectors, dtype=np.float32)
+        if array.ndim == 1:
+            array = array[None, :]
+        norms = np.linalg.norm(array, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return array / norms
+
+    def upsert(self, ids: List[str], documents: List[str], metadatas: Optional[List[Dict[str, Any]]] = None) -> None:
+        if not ids:
+            return
+        vectors = self._normalize(self.embed_fn(documents))
+        metadatas = metadatas or [{} for _ in ids]
+
+        with self._lock:
+            if not self._dim:
+                self._dim = vectors.shape[1]
+            elif vectors.shape[1] != self._dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match index dimension {self._dim}")
+
+            rows = []
+            for doc_id in ids:
+                row = self._db.execute("SELECT row FROM documents WHERE id = ?", (doc_id,)).fetchone()
+                if row is None:
+                    rows.append(self._count)
+                    self._count += 1
+                else:
+                    rows.append(row[0])
+
+            self._ensure_capacity(self._count)
+            self._matrix[rows] = vectors
+            self._assignments[rows] = self._assign(vectors)
+            self._matrix.flush()
+            self._assignments.flush()
+
+            self._db.execute("BEGIN")
+            self._db.executemany(
+                "INSERT OR REPLACE INTO documents (row, id, document, metadata) VALUES (?, ?, ?, ?)",
+                [(row, doc_id, document, json.dumps(metadata or {}))
+                 for row, doc_id, document, metadata in zip(rows, ids, documents, metadatas)],
+            )
+            self._db.execute("COMMIT")
+            self._save_meta()
+
+            if self.n_partitions and self._centroids is None and self._count >= self.train_threshold:
+                self.train_partitions()
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        if self._centroids is None:
+            return np.full(len(vectors), -1, dtype=np.int32)
+        return np.argmax(vectors @ self._centroids.T, axis=1).astype(np.int32)
+
+    def train_partitions(self, iterations: int = 10, seed: int = 0) -> None:
+        """Cluster the stored rows into `n_partitions` IVF partitions (spherical k-means)."""
+        with self._lock:
+            if not self.n_partitions or self._count < self.n_partitions:
+                return
+            data = np.asarray(self._matrix[:self._count])
+            rng = np.random.default_rng(seed)
+            centroids = data[rng.choice(self._count, self.n_partitions, replace=False)].copy()
+            for _ in range(iterations):
+                labels = np.argmax(data @ centroids.T, axis=1)
+                for partition in range(self.n_partitions):
+                    members = data[labels == partition]
+                    if len(members):
+                        centroids[partition] = members.mean(axis=0)
+                centroids = self._normalize(centroids)
+
+            self._centroids = centroids
+            np.save(self._centroids_path, centroids)
+            self._assignments[:self._count] = self._assign(data)
+            self._assignments.flush()
+
+    def query(self, query_texts: List[str], n_results: int = 1, include: Optional[List[str]] = None) -> Dict[str, Any]:
+        vectors = self._normalize(self.query_embed_fn(query_texts))
+        results: Dict[str, List[List[Any]]] = {"ids": [], "documents": [], "distances": [], "metadatas": []}
+
+        with self._lock:
+            count = self._count
+            matrix = np.asarray(self._matrix[:count]) if count else None
+            assignments = np.asarray(self._assignments[:count]) if count else None
+            centroids = self._centroids
+
+        for vector in vectors:
+            if not count:
+                rows, scores = np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+            else:
+                candidates = None
+                if centroids is not None and self.n_probe < len(centroids):
+                    probes = np.argsort(-(centroids @ vector))[:self.n_probe]
+                    # Rows added before training (-1) are always scanned
+                    candidates = np.flatnonzero(np.isin(assignments, probes) | (assignments < 0))
+                subset = matrix if candidates is None else matrix[candidates]
+                similarities = subset @ vector
+                top = min(n_results, len(similarities))
+                best = np.argpartition(-similarities, top - 1)[:top] if top else np.array([], dtype=np.int64)
+                best = best[np.argsort(-similarities[best])]
+                scores = similarities[best]
+                rows = best if candidates is None else candidates[best]
+
+            documents, ids, metadatas = self._fetch_rows(rows.tolist())
+            results["ids"].append(ids)
+            results["documents"].append(documents)
+            results["metadatas"].append(metadatas)
+            results["distances"].append([float(1.0 - score) for score in scores])
+
+        return results
+
+    def _fetch_rows(self, rows: List[int]):
+        if not rows:
+            return [], [], []
+        placeholders = ",".join("?" * len(rows))
+        with self._lock:
+            found = {
+                row: (doc_id, document, metadata)
+                for row, doc_id, document, metadata in self._db.execute(
+                    f"SELECT row, id, document, metadata FROM documents WHERE row IN ({placeholders})", rows
+                )
+            }
+        ordered = [found[row] for row in rows if row in found]
+        return (
+            [document for _, document, _ in ordered],
+            [doc_id for doc_id, _, _ in ordered],
+            [json.loads(metadata) for _, _, metadata in ordered],
+        )
+
+    def count(self) -> int:
+        return self._count
+
+    def iter_documents(self, batch_size: int = 500) -> Iterator[Tuple[List[str], List[str], List[Dict[str, Any]]]]:
+        after = -1
+        while True:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT row, id, document, metadata FROM documents WHERE row > ? ORDER BY row LIMIT ?",
+                    (after, batch_size),
+                ).fetchall()
+            if not rows:
+                return
+            yield [row[1] for row in rows], [row[2] for row in rows], [json.loads(row[3]) for row in rows]
+            after = rows[-1][0]
+
+
+def create_backend(
+    kind: Optional[str] = None,
+    embed_fn: Optional[EmbedFn] = None,
+    query_embed_fn: Optional[EmbedFn] = None,
+) -> RetrievalBackend:
+    """
+    Create the retrieval backend selected by `kind` or the RAG_BACKEND variable.
+
+    Args:
+        kind: "cloud", "persistent", "memory" or "local"
+        embed_fn: Document embedder (required for "local", optional for Chroma)
+        query_embed_fn: Query embedder (defaults to embed_fn)
+    """
+    kind = (kind or os.getenv("RAG_BACKEND", "cloud")).strip().lower()
+
+    if kind == "local":
+        if embed_fn is None:
+            raise ValueError("The local vector index needs an embedding function")
+        return LocalVectorIndex(
+            path=os.getenv("RAG_LOCAL_INDEX_PATH", cache_path("vector_index")),
+            embed_fn=embed_fn,
+            query_embed_fn=query_embed_fn,
+            n_partitions=int(os.getenv("RAG_IVF_PARTITIONS", "0")),
+            n_probe=int(os.getenv("RAG_IVF_PROBES", "4")),
+        )
+
+    # One Chroma client per process, shared by every agent
+    collection = get_chroma_client(kind).get_or_create_collection(name=COLLECTION_NAME)
+    namespace = f"chroma:{kind}:{COLLECTION_NAME}"
+    if os.getenv("RAG_CLIENT_EMBEDDINGS", "1").strip().lower() not in ("1", "true", "yes"):
+        return ChromaBackend(collection, namespace=namespace)
+
+    # Batch and cache the collection's own embedding function, so vectors stay
+    # compatible with what is already stored, and pass the embeddings to Chroma
+    return ChromaBackend(
+        collection,
+        embed_fn=Embedder.from_env(lambda texts: collection._embed(input=texts), namespace),
+        query_embed_fn=Embedder.from_env(lambda texts: collection._embed(input=texts, is_query=True), f"{namespace}:query"),
+        namespace=namespace,
+    )
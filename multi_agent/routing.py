@@ -0,0 +1,432 @@
+"""
+Fast pre-routing in front of the LLM coordinator.
+
+Routing a query through the coordinator (and for web research, the
+conversation agent as well) costs one or two model round trips before any
+work starts. The pre-router classifies the query locally and, when it is
+confident, runs the target agent directly:
+
+1. Keyword rules (regular expressions) are checked first.
+2. A nearest-centroid classifier over query embeddings, trained from
+   logged routes, handles the rest.
+
+Anything it is not confident about falls back to LLM routing. With
+ROUTER_LOG=1, the query and the route the LLM picked are appended to the
+route log for the next training run; the log holds raw user queries, so it
+is off by default, readable only by its owner, and rotated at
+ROUTER_LOG_MAX_BYTES (one previous file is kept).
+
+    python -m multi_agent.routing train [--log PATH] [--embedder hashing]
+    python -m multi_agent.routing evaluate --dataset labelled.jsonl [--holdout 0.3]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, AsyncGenerator, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from google.adk.agents import BaseAgent
+from google.adk.agents.invocation_context import InvocationContext
+from google.adk.events import Event
+
+from multi_agent import tracing
+from multi_agent.invocation import user_text
+from multi_agent.services import cache_path, registry
+
+EmbedFn = Callable[[List[str]], List[List[float]]]
+
+# Route label -> LLM routing hops it skips (coordinator, plus conversation for research)
+HOPS_SAVED = {"rag": 1, "research": 2}
+
+DEFAULT_RULES: List[Tuple[str, str]] = [
+    (r"\b(internal|knowledge base|handbook|runbook|onboarding|uniplexity)\b"
+     r"|\bour\b.*\b(company|organi[sz]ation|team|docs?|documents?|polic(y|ies)|process|product)\b", "rag"),
+    (r"\b(search (the )?(web|internet|online)|google it|look up online|latest news|in the news)\b|https?://|www\.", "research"),
+]
+
+
+def hashing_embed(texts: List[str], dim: int = 512) -> List[List[float]]:
+    """Feature-hashed unigram + bigram vectors; no model or network call."""
+    vectors = []
+    for text in texts:
+        words = re.findall(r"\w+", text.lower())
+        vector = np.zeros(dim, dtype=np.float32)
+        for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            vector[value % dim] += 1.0 if value & (1 << 63) else -1.0
+        vectors.append(vector.tolist())
+    return vectors
+
+
+def _normalize(vectors: Any) -> np.ndarray:
+    array = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(array, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return array / norms
+
+
+class CentroidClassifier:
+    """Nearest-centroid classifier over L2-normalized embeddings."""
+
+    def __init__(self, labels: List[str], centroids: np.ndarray):
+        self.labels = labels
+        self.centroids = _normalize(centroids)
+
+    @classmethod
+    def train(cls, examples: List[Tuple[str, str]], embed_fn: EmbedFn) -> "CentroidClassifier":
+        """Train from (query, route) pairs."""
+        if not examples:
+            raise ValueError("No routing examples to train on")
+        vectors = _normalize(embed_fn([query for query, _ in examples]))
+        labels = sorted({route for _, route in examples})
+        routes = np.array([route for _, route in examples])
+        centroids = np.stack([vectors[routes == label].mean(axis=0) for label in labels])
+        return cls(labels, centroids)
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "wb") as f:
+            np.savez(f, labels=np.array(self.labels), centroids=self.centroids)
+
+    @classmethod
+    def load(cls, path: str) -> "CentroidClassifier":
+        with np.load(path) as data:
+            return cls([str(label) for label in data["labels"]], data["centroids"])
+
+    def predict(self, vector: List[float]) -> Tuple[str, float, float]:
+        """Return (label, cosine similarity, margin over the runner-up)."""
+        similarities = self.centroids @ _normalize(vector)
+        order = np.argsort(-similarities)
+        best = float(similarities[order[0]])
+        runner_up = float(similarities[order[1]]) if len(order) > 1 else -1.0
+        return self.labels[order[0]], best, best - runner_up
+
+
+class PreRouter:
+    """Keyword rules plus an optional centroid classifier."""
+
+    def __init__(
+        self,
+        rules: Optional[List[Tuple[str, str]]] = None,
+        classifier: Optional[CentroidClassifier] = None,
+        embed_fn: Optional[EmbedFn] = None,
+        min_similarity: float = 0.5,
+        min_margin: float = 0.05,
+        routes: Optional[List[str]] = None,
+    ):
+        """
+        Args:
+            rules: (regular expression, route) pairs, checked in order
+            classifier: Trained centroid classifier (None uses the rules only)
+            embed_fn: Embeds queries for the classifier
+            min_similarity: Cosine similarity the nearest centroid must reach
+            min_margin: Lead the nearest centroid must have over the runner-up
+            routes: Routes that may be dispatched directly (default: HOPS_SAVED)
+        """
+        self.rules = [(re.compile(pattern, re.IGNORECASE), route) for pattern, route in (rules or [])]
+        self.classifier = classifier
+        self.embed_fn = embed_fn
+        self.min_similarity = min_similarity
+        self.min_margin = min_margin
+        self.routes = set(routes or HOPS_SAVED)
+        self._lock = threading.Lock()
+
+        self.rule_hits = 0
+        self.classifier_hits = 0
+        self.fallbacks = 0
+
+    @classmethod
+    def from_env(cls) -> "PreRouter":
+        """Build a router from ROUTER_* environment variables."""
+        rules = DEFAULT_RULES
+        rules_path = os.getenv("ROUTER_RULES_PATH")
+        if rules_path:
+            with open(rules_path, "r", encoding="utf-8") as f:
+                rules = [(rule["pattern"], rule["route"]) for rule in json.load(f)]
+
+        classifier = None
+        model_path = os.getenv("ROUTER_MODEL_PATH", cache_path("router_centroids.npz"))
+        if os.path.exists(model_path):
+            try:
+                classifier = CentroidClassifier.load(model_path)
+            except Exception as e:
+                print(f"Warning: could not load routing model {model_path}: {e}")
+
+        return cls(
+            rules=rules,
+            classifier=classifier,
+            embed_fn=make_embed_fn(os.getenv("ROUTER_EMBEDDER", "gemini")),
+            min_similarity=float(os.getenv("ROUTER_MIN_SIMILARITY", "0.5")),
+            min_margin=float(os.getenv("ROUTER_MIN_MARGIN", "0.05")),
+        )
+
+    def route(self, text: str) -> Optional[Dict[str, Any]]:
+        """
+        Classify a query.
+
+        Returns:
+            {"route", "source", "confidence"} when confident, otherwise None
+        """
+        decision = None
+        for pattern, route in self.rules:
+            if route in self.routes and pattern.search(text):
+                decision = {"route": route, "source": "rule", "confidence": 1.0}
+                break
+
+        if decision is None and self.classifier is not None and self.embed_fn is not None:
+            try:
+                label, similarity, margin = self.classifier.predict(self.embed_fn([text])[0])
+            except Exception as e:
+                # A failed embedding call only costs the shortcut
+                print(f"Warning: routing classifier failed: {e}")
+            else:
+                if label in self.routes and similarity >= self.min_similarity and margin >= self.min_margin:
+                    decision = {"route": label, "source": "centroid", "confidence": round(similarity, 3)}
+
+        with self._lock:
+            if decision is None:
+                self.fallbacks += 1
+            elif decision["source"] == "rule":
+                self.rule_hits += 1
+            else:
+                self.classifier_hits += 1
+        return decision
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"rule_hits": self.rule_hits, "classifier_hits": self.classifier_hits, "fallbacks": self.fallbacks}
+
+
+def make_embed_fn(kind: str) -> EmbedFn:
+    """Return the query embedder for the classifier: "gemini" (cached) or "hashing" (local)."""
+    if kind == "hashing":
+        return hashing_embed
+    # Imported here to keep the router usable without the RAG stack
+    from multi_agent.clients import get_genai
+    from multi_agent.embeddings import Embedder
+
+    model = os.getenv("RAG_EMBEDDING_MODEL", "models/text-embedding-004")
+    genai = get_genai()
+
+    def embed(texts: List[str]) -> List[List[float]]:
+        with tracing.span("gemini.embed", client=True, texts=len(texts), task_type="classification"):
+            return genai.embed_content(model=model, content=texts, task_type="classification")["embedding"]
+
+    return Embedder.from_env(embed, f"{model}:classification")
+
+
+class RouteLog:
+    """Size-capped JSON-lines log of (query, route) pairs picked by LLM routing."""
+
+    def __init__(self, path: str, enabled: bool = True, max_bytes: int = 10 * 1024 * 1024):
+        """
+        Args:
+            path: Log file; the previous file is kept at `path` + ".1" on rotation
+            enabled: Write the log at all (it holds raw user queries)
+            max_bytes: Size at which the log is rotated
+        """
+        self.path = path
+        self.enabled = enabled
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "RouteLog":
+        return cls(
+            os.getenv("ROUTER_LOG_PATH", cache_path("routes.jsonl")),
+            enabled=os.getenv("ROUTER_LOG", "").strip().lower() in ("1", "true", "yes"),
+            max_bytes=int(os.getenv("ROUTER_LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+        )
+
+    def append(self, query: str, route: str) -> None:
+        if not self.enabled:
+            return
+        line = (json.dumps({"query": query, "route": route, "logged_at": time.time()}) + "\n").encode("utf-8")
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                if os.path.exists(self.path) and os.path.getsize(self.path) + len(line) > self.max_bytes:
+                    os.replace(self.path, self.path + ".1")
+                fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+                with os.fdopen(fd, "ab") as f:
+                    f.write(line)
+            except OSError as e:
+                print(f"Warning: could not write route log: {e}")
+
+
+def load_log_examples(path: str) -> List[Tuple[str, str]]:
+    """Read the (query, route) pairs of a route log, including its rotated file."""
+    return [example for part in (path + ".1", path) if os.path.exists(part) for example in load_examples(part)]
+
+
+def load_examples(path: str) -> List[Tuple[str, str]]:
+    """Read (query, route) pairs from a JSON-lines file."""
+    examples = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                examples.append((record["query"], record["route"]))
+    return examples
+
+
+registry.register("router", PreRouter.from_env)
+registry.register("route_log", RouteLog.from_env)
+
+
+class PreRoutingAgent(BaseAgent):
+    """
+    Root agent that dispatches confident queries straight to a sub-agent.
+
+    The first sub-agent is the LLM coordinator used as the fallback; `routes`
+    maps route labels to the names of agents anywhere below it.
+    """
+
+    routes: Dict[str, str]
+    """Route label -> agent name."""
+
+    async def _run_async_impl(self, ctx: InvocationContext) -> AsyncGenerator[Event, None]:
+        text = user_text(ctx)
+        with tracing.span("router.classify", parent=tracing.invocation_span(ctx.invocation_id, self.name)) as span:
+            router = registry.get("router")
+            if not text:
+                decision = None
+            elif router.classifier is not None:
+                # The classifier may call the embedding API; keep it off the loop
+                decision = await asyncio.to_thread(router.route, text)
+            else:
+                decision = router.route(text)
+            span.set_attribute("route", decision["route"] if decision else "llm")
+            span.set_attribute("source", decision["source"] if decision else "fallback")
+
+        target = self.find_agent(self.routes[decision["route"]]) if decision else None
+        if target is not None:
+            async for event in target.run_async(ctx):
+                yield event
+            return
+
+        # Fall back to LLM routing and log which agent answered, for training.
+        # Agents without a route (e.g. "conversation") are logged under their
+        # name so the classifier learns them too and falls back for them.
+        fallback = self.sub_agents[0]
+        agent_routes = {name: route for route, name in self.routes.items()}
+        routed_to = None
+        async for event in fallback.run_async(ctx):
+            if event.author not in (fallback.name, "user") and event.content:
+                routed_to = agent_routes.get(event.author, event.author)
+            yield event
+        if text and routed_to:
+            registry.get("route_log").append(text, routed_to)
+
+
+# ---------------------------------------------------------------------------
+# Training and offline evaluation
+# ---------------------------------------------------------------------------
+
+def _llm_hop_ms(trace_file: Optional[str]) -> float:
+    """Median LLM routing-hop latency from a trace file, or 0 when unknown."""
+    if not trace_file or not os.path.exists(trace_file):
+        return 0.0
+    durations = sorted(
+        (int(item["endTimeUnixNano"]) - int(item["startTimeUnixNano"])) / 1e6
+        for item in tracing.load_spans(trace_file)
+        if item["name"] in ("llm:coordinator", "llm:conversation")
+    )
+    return durations[len(durations) // 2] if durations else 0.0
+
+
+def evaluate(router: PreRouter, examples: List[Tuple[str, str]], llm_hop_ms: float) -> Dict[str, Any]:
+    """Route labelled queries and report accuracy, coverage and estimated latency saved."""
+    dispatched = correct = 0
+    saved_ms = 0.0
+    router_ms = []
+    for query, expected in examples:
+        started = time.perf_counter()
+        decision = router.route(query)
+        router_ms.append((time.perf_counter() - started) * 1000)
+        if decision is None:
+            continue
+        dispatched += 1
+        if decision["route"] == expected:
+            correct += 1
+            saved_ms += HOPS_SAVED.get(expected, 0) * llm_hop_ms
+
+    router_ms.sort()
+    total_router_ms = sum(router_ms)
+    return {
+        "queries": len(examples),
+        "dispatched": dispatched,
+        "coverage": round(dispatched / len(examples), 3) if examples else 0.0,
+        "accuracy": round(correct / dispatched, 3) if dispatched else 0.0,
+        "misroutes": dispatched - correct,
+        "router_p50_ms": round(router_ms[len(router_ms) // 2], 2) if router_ms else 0.0,
+        "llm_hop_ms": round(llm_hop_ms, 1),
+        "saved_ms_per_query": round((saved_ms - total_router_ms) / len(examples), 1) if examples else 0.0,
+        **router.stats(),
+    }
+
+
+def main():
+    """Train the routing classifier or evaluate the router offline."""
+    parser = argparse.ArgumentParser(description="Train and evaluate the pre-router.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = commands.add_parser("train", help="Train the centroid classifier from logged routes")
+    train_parser.add_argument("--log", default=os.getenv("ROUTER_LOG_PATH", cache_path("routes.jsonl")))
+    train_parser.add_argument("--model", default=os.getenv("ROUTER_MODEL_PATH", cache_path("router_centroids.npz")))
+    train_parser.add_argument("--embedder", default=os.getenv("ROUTER_EMBEDDER", "gemini"), choices=["gemini", "hashing"])
+
+    eval_parser = commands.add_parser("evaluate", help="Report routing accuracy and latency saved")
+    eval_parser.add_argument("--dataset", required=True, help="JSON lines of {\"query\", \"route\"}")
+    eval_parser.add_argument("--holdout", type=float, default=0.3, help="Fraction held out for testing the classifier")
+    eval_parser.add_argument("--embedder", default=os.getenv("ROUTER_EMBEDDER", "gemini"), choices=["gemini", "hashing"])
+    eval_parser.add_argument("--rules-only", action="store_true")
+    eval_parser.add_argument("--min-similarity", type=float, default=float(os.getenv("ROUTER_MIN_SIMILARITY", "0.5")))
+    eval_parser.add_argument("--min-margin", type=float, default=float(os.getenv("ROUTER_MIN_MARGIN", "0.05")))
+    eval_parser.add_argument("--llm-hop-ms", type=float, help="LLM routing hop latency (default: median from traces)")
+    eval_parser.add_argument("--traces", default=os.getenv("ADK_TRACE_FILE", cache_path("traces.jsonl")))
+    args = parser.parse_args()
+
+    embed_fn = make_embed_fn(args.embedder)
+
+    if args.command == "train":
+        examples = load_log_examples(args.log)
+        classifier = CentroidClassifier.train(examples, embed_fn)
+        classifier.save(args.model)
+        counts = {label: sum(1 for _, route in examples if route == label) for label in classifier.labels}
+        print(f"Trained on {len(examples)} routes {counts}; saved to {args.model}")
+        return
+
+    examples = load_examples(args.dataset)
+    random.Random(0).shuffle(examples)
+    split = int(len(examples) * (1 - args.holdout))
+    train, test = (examples, examples) if args.rules_only else (examples[:split], examples[split:])
+
+    classifier = None if args.rules_only else CentroidClassifier.train(train, embed_fn)
+    router = PreRouter(
+        rules=DEFAULT_RULES,
+        classifier=classifier,
+        embed_fn=embed_fn,
+        min_similarity=args.min_similarity,
+        min_margin=args.min_margin,
+    )
+    hop_ms = args.llm_hop_ms if args.llm_hop_ms is not None else _llm_hop_ms(args.traces)
+    report = evaluate(router, test, hop_ms)
+
+    print(f"Routing evaluation ({len(train)} train / {len(test)} test, embedder: {args.embedder})")
+    for key, value in report.items():
+        print(f"  {key:<20} {value}")
+    if not hop_ms:
+        print("  (pass --llm-hop-ms or record traces with ADK_TRACING=1 to estimate latency saved)")
+
+
+if __name__ == "__main__":
+    main()
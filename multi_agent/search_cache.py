@@ -0,0 +1,155 @@
+"""
+Persistent cache and daily quota tracker for Google Custom Search.
+
+Normalized search results are kept in SQLite with a TTL. The quota tracker
+counts API requests per quota day; once the daily quota is used up, stale
+cached results are served instead of failing.
+"""
+
+import datetime
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+from zoneinfo import ZoneInfo
+
+from multi_agent.services import cache_path
+
+# Custom Search quotas reset at midnight Pacific time
+QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase and collapse whitespace so equivalent queries share an entry."""
+    return re.sub(r"\s+", " ", query.strip().lower())
+
+
+class SearchCache:
+    """SQLite-backed search result cache with a daily request quota."""
+
+    def __init__(self, path: str, ttl_seconds: float = 21600.0, daily_quota: int = 100):
+        """
+        Args:
+            path: SQLite database file
+            ttl_seconds: How long cached results are served as fresh
+            daily_quota: API requests allowed per quota day (0 means unlimited)
+        """
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.daily_quota = daily_quota
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results (query TEXT PRIMARY KEY, payload TEXT NOT NULL, stored_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS quota (day TEXT PRIMARY KEY, used INTEGER NOT NULL)")
+
+        self.fresh_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> "SearchCache":
+        """Build a cache from SEARCH_CACHE_* / GOOGLE_CSE_DAILY_QUOTA environment variables."""
+        return cls(
+            path=os.getenv("SEARCH_CACHE_PATH", cache_path("search_cache.sqlite")),
+            ttl_seconds=float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "21600")),
+            daily_quota=int(os.getenv("GOOGLE_CSE_DAILY_QUOTA", "100")),
+        )
+
+    def get(self, query: str, num_results: int, allow_stale: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Return cached results for a query, or None.
+
+        An entry stored for a larger `num_results` also serves smaller requests.
+        The returned dict has a "cache" key set to "fresh" or "stale".
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, stored_at FROM results WHERE query = ?", (normalize_query(query),)
+            ).fetchone()
+
+            if row is not None:
+                payload = json.loads(row[0])
+                fresh = time.time() - row[1] < self.ttl_seconds
+                covers = payload["requested"] >= num_results or payload.get("exhausted", False)
+                if covers and (fresh or allow_stale):
+                    if fresh:
+                        self.fresh_hits += 1
+                    else:
+                        self.stale_hits += 1
+                    payload["results"] = payload["results"][:num_results]
+                    payload["cache"] = "fresh" if fresh else "stale"
+                    return payload
+
+            if not allow_stale:
+                self.misses += 1
+            return None
+
+    def put(self, query: str, num_results: int, result: Dict[str, Any]) -> None:
+        """Store a successful search result."""
+        payload = {
+            key: value for key, value in result.items() if key not in ("cache", "status")
+        }
+        payload["status"] = "success"
+        payload["requested"] = num_results
+        # Fewer results than requested means there are no further pages
+        payload["exhausted"] = len(result.get("results", [])) < num_results
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (query, payload, stored_at) VALUES (?, ?, ?)",
+                (normalize_query(query), json.dumps(payload), time.time()),
+            )
+
+    @staticmethod
+    def _quota_day() -> str:
+        return datetime.datetime.now(QUOTA_TIMEZONE).date().isoformat()
+
+    def try_acquire(self, requests: int = 1) -> bool:
+        """Reserve `requests` API calls from today's quota; return False if exhausted."""
+        if self.daily_quota <= 0:
+            return True
+        day = self._quota_day()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT used FROM quota WHERE day = ?", (day,)).fetchone()
+                used = row[0] if row else 0
+                if used + requests > self.daily_quota:
+                    return False
+                self._conn.execute("INSERT OR REPLACE INTO quota (day, used) VALUES (?, ?)", (day, used + requests))
+                return True
+            finally:
+                self._conn.execute("COMMIT")
+
+    def mark_exhausted(self) -> None:
+        """Record that the API reported the quota as exceeded for today."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO quota (day, used) VALUES (?, ?)",
+                (self._quota_day(), max(self.daily_quota, 1)),
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        """Return cache counters and today's quota usage."""
+        with self._lock:
+            row = self._conn.execute("SELECT used FROM quota WHERE day = ?", (self._quota_day(),)).fetchone()
+            entries = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        return {
+            "entries": entries,
+            "fresh_hits": self.fresh_hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "quota_used_today": row[0] if row else 0,
+            "daily_quota": self.daily_quota,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,288 @@
+"""
+Lazy service registry for the backend services and clients used by the agents.
+
+Services are registered with a factory and only built the first time a tool
+asks for them, so importing an agent package never opens a network connection.
+
+There is one registry per process: it is anchored in `sys.modules`, so every
+agent package loaded into the same server (and this module imported twice
+under different names) shares the same HTTP pools, SDK clients and caches.
+The registry closes its services at interpreter exit and can report the
+memory and open sockets held by each agent package.
+
+Run `python benchmarks/resource_report.py` to load the agent packages and
+print the report.
+"""
+
+import asyncio
+import atexit
+import os
+import sys
+import threading
+import time
+import types
+from typing import Any, Callable, Dict, List, Optional
+
+
+def rss_bytes() -> int:
+    """Resident set size of this process (0 where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+
+def open_sockets() -> int:
+    """Number of open sockets in this process (0 where /proc is unavailable)."""
+    count = 0
+    try:
+        for fd in os.listdir("/proc/self/fd"):
+            try:
+                count += os.readlink(f"/proc/self/fd/{fd}").startswith("socket:")
+            except OSError:
+                continue
+    except OSError:
+        pass
+    return count
+
+
+def _caller_package(depth: int = 2) -> str:
+    """Top-level package of the module `depth` frames up, used as the owning agent."""
+    try:
+        return sys._getframe(depth).f_globals.get("__name__", "").split(".")[0] or "unknown"
+    except ValueError:
+        return "unknown"
+
+
+class ServiceRegistry:
+    """Thread-safe registry that builds each service once, on first use."""
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._owners: Dict[str, str] = {}
+        self._probes: Dict[str, Callable[[Any], int]] = {}
+        self._warm: Dict[str, Callable[[], bool]] = {}
+        self._built: Dict[str, Dict[str, Any]] = {}
+
+    def register(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        owner: Optional[str] = None,
+        probe: Optional[Callable[[Any], int]] = None,
+        warm: Optional[Callable[[], bool]] = None,
+    ) -> None:
+        """
+        Register a factory for a service.
+
+        Args:
+            name: Name the service is looked up by
+            factory: Zero-argument callable that builds the service
+            owner: Agent package the service is reported under (default: the caller's package)
+            probe: Returns the number of open connections held by the service
+                (default: the service's own `open_connections()` method, if any)
+            warm: Returns whether `warm_up()` should build the service, for services
+                that only some configurations use (default: always)
+        """
+        with self._lock:
+            self._factories[name] = factory
+            self._locks.setdefault(name, threading.Lock())
+            self._owners[name] = owner or _caller_package()
+            if probe is not None:
+                self._probes[name] = probe
+            if warm is not None:
+                self._warm[name] = warm
+
+    def get(self, name: str) -> Any:
+        """
+        Return the service instance, building it on first use.
+
+        If the factory raises, nothing is cached and the next call retries,
+        so a backend that is briefly down does not poison the registry.
+        """
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        if name not in self._factories:
+            raise KeyError(f"Unknown service: {name}")
+
+        with self._locks[name]:
+            instance = self._instances.get(name)
+            if instance is None:
+                rss_before, started = rss_bytes(), time.perf_counter()
+                instance = self._factories[name]()
+                self._instances[name] = instance
+                # Memory growth while building is attributed to the service
+                self._built[name] = {
+                    "build_ms": round((time.perf_counter() - started) * 1000, 1),
+                    "build_rss_bytes": max(0, rss_bytes() - rss_before),
+                }
+        return instance
+
+    def is_ready(self, name: str) -> bool:
+        """Return True if the service has already been built."""
+        return name in self._instances
+
+    def reset(self, name: Optional[str] = None) -> None:
+        """Drop built instances so they are rebuilt on next use."""
+        with self._lock:
+            if name is None:
+                self._instances.clear()
+                self._built.clear()
+            else:
+                self._instances.pop(name, None)
+                self._built.pop(name, None)
+
+    def close(self) -> None:
+        """Close every built service (newest first) and forget it; safe to call more than once."""
+        with self._lock:
+            instances = list(self._instances.items())
+            self._instances.clear()
+            self._built.clear()
+        for name, instance in reversed(instances):
+            close = getattr(instance, "close", None)
+            if not callable(close):
+                continue
+            try:
+                result = close()
+                if asyncio.iscoroutine(result):
+                    # e.g. an async client closed outside its event loop
+                    result.close()
+            except Exception as e:
+                print(f"Warning: closing service '{name}' failed: {e}")
+
+    def open_connections(self, name: str) -> Optional[int]:
+        """Open connections held by a built service, or None if it cannot tell."""
+        instance = self._instances.get(name)
+        if instance is None:
+            return None
+        probe = self._probes.get(name) or getattr(instance, "open_connections", None)
+        if probe is None:
+            return None
+        try:
+            return probe(instance) if name in self._probes else probe()
+        except Exception:
+            return None
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Memory and socket usage of the process, per agent package and per service.
+
+        Service memory is the RSS growth while the service was built.
+        """
+        with self._lock:
+            names = list(self._factories)
+            built = dict(self._built)
+        services: Dict[str, Any] = {}
+        owners: Dict[str, Dict[str, Any]] = {}
+        for name in names:
+            owner = self._owners.get(name, "unknown")
+            summary = owners.setdefault(owner, {"registered": 0, "built": 0, "build_rss_mb": 0.0, "open_connections": 0})
+            summary["registered"] += 1
+            if name not in built:
+                continue
+            connections = self.open_connections(name)
+            services[name] = {
+                "owner": owner,
+                "build_ms": built[name]["build_ms"],
+                "build_rss_mb": round(built[name]["build_rss_bytes"] / (1024 * 1024), 1),
+                "open_connections": connections,
+            }
+            summary["built"] += 1
+            summary["build_rss_mb"] = round(summary["build_rss_mb"] + services[name]["build_rss_mb"], 1)
+            summary["open_connections"] += connections or 0
+        return {
+            "process": {
+                "pid": os.getpid(),
+                "rss_mb": round(rss_bytes() / (1024 * 1024), 1),
+                "open_sockets": open_sockets(),
+                "registry_id": id(self),
+            },
+            "agents": owners,
+            "services": services,
+        }
+
+    def warm_up(self, names: Optional[List[str]] = None, background: bool = True) -> List[threading.Thread]:
+        """
+        Build services ahead of the first tool call.
+
+        Args:
+            names: Services to build (default: every registered service the configuration uses)
+            background: Build in daemon threads instead of blocking the caller
+
+        Returns:
+            The started threads (empty when background is False)
+        """
+        if names is None:
+            names = [name for name in list(self._factories) if self._warm.get(name, lambda: True)()]
+        threads = []
+
+        for name in names:
+            if background:
+                thread = threading.Thread(
+                    target=self._warm_one, args=(name,), name=f"warmup-{name}", daemon=True
+                )
+                thread.start()
+                threads.append(thread)
+            else:
+                self._warm_one(name)
+
+        return threads
+
+    def _warm_one(self, name: str) -> None:
+        try:
+            self.get(name)
+        except Exception as e:
+            print(f"Warning: warm-up of service '{name}' failed: {e}")
+
+
+# Name of the sys.modules entry holding the process-wide registry
+_PROCESS_KEY = "_google_adk_automation_services"
+
+
+def _process_registry() -> ServiceRegistry:
+    """Return the registry of this process, creating it on first import of any copy of this module."""
+    holder = sys.modules.get(_PROCESS_KEY)
+    if holder is None:
+        candidate = types.ModuleType(_PROCESS_KEY)
+        candidate.registry = ServiceRegistry()
+        # setdefault is atomic, so concurrent first imports still agree on one registry
+        holder = sys.modules.setdefault(_PROCESS_KEY, candidate)
+        if holder is candidate:
+            atexit.register(candidate.registry.close)
+    return holder.registry
+
+
+# Process-wide registry shared by all agent modules
+registry = _process_registry()
+
+
+def cache_path(filename: str) -> str:
+    """
+    Return the path of a local cache file.
+
+    Caches live in ADK_CACHE_DIR (default: ~/.cache/google-adk-automation).
+    """
+    directory = os.getenv("ADK_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "google-adk-automation"))
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, filename)
+
+
+def warm_up_from_env() -> List[threading.Thread]:
+    """
+    Start a background warm-up when ADK_SERVICE_WARMUP is enabled.
+
+    Set ADK_SERVICE_WARMUP to "1", "true" or "background" to build every
+    registered service the configuration uses (e.g. only the Chroma client of
+    RAG_BACKEND) in daemon threads right after the agents are imported.
+    """
+    mode = os.getenv("ADK_SERVICE_WARMUP", "").strip().lower()
+    if mode in ("1", "true", "yes", "background"):
+        return registry.warm_up(background=True)
+    return []
+
@@ -0,0 +1,580 @@
+"""
+Durable ADK session service on SQLite (WAL) with history compaction.
+
+`SQLiteSessionService` keeps sessions, events and app/user state in one
+local SQLite file, so sessions survive restarts and are shared by every
+worker process of `serve.py`. No session is held in memory between turns.
+
+- Batched writes: `append_event` only buffers the event; a background
+  thread writes buffered events and state changes in one transaction every
+  SESSION_FLUSH_MS, or sooner once SESSION_BATCH_EVENTS are waiting. Reads
+  flush first, and the buffer is flushed on close and at exit. A batch that
+  cannot be written stays buffered and is retried with backoff; it is only
+  dropped, with an error, after SESSION_FLUSH_RETRIES failed attempts.
+- Compaction: when a session's history is loaded and its estimated size
+  exceeds SESSION_COMPACT_TOKENS, the oldest tool results outside the last
+  SESSION_KEEP_RECENT_EVENTS events are replaced by a short summary (their
+  status, a truncated answer/content and any artifact handles) until the
+  history is back under 75% of the threshold. Compaction is written back,
+  so it also shrinks the database.
+- Metrics: `session_metrics()` reports events, history tokens, stored
+  bytes and compactions per session; `stats()` reports flushes and totals.
+
+Use it directly (`Runner(session_service=SQLiteSessionService.from_env())`)
+or as `--session-db sqlite+wal:///sessions.db` (relative to the working
+directory; `sqlite+wal:////abs/path/sessions.db` for an absolute path)
+with serve.py.
+"""
+
+import asyncio
+import atexit
+import contextlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from google.adk.errors.already_exists_error import AlreadyExistsError
+from google.adk.events import Event
+from google.adk.sessions import BaseSessionService, Session
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+from google.adk.sessions.state import State
+from google.genai import types
+
+from multi_agent.context_packing import count_tokens, truncate_to_tokens
+from multi_agent.services import cache_path
+
+# URI scheme for `--session-db` / session_service_uri
+URI_SCHEME = "sqlite+wal"
+
+# Compaction stops once the history is below this fraction of the threshold
+COMPACT_TARGET = 0.75
+
+# Tool result fields worth keeping in a summary, in order of preference
+SUMMARY_FIELDS = ("answer", "report", "formatted_results", "content", "result", "message", "error")
+
+
+def content_tokens(content: Optional[types.Content]) -> int:
+    """Estimate the tokens a message adds to the LLM prompt."""
+    if not content or not content.parts:
+        return 0
+    total = 0
+    for part in content.parts:
+        if part.text:
+            total += count_tokens(part.text)
+        if part.function_call:
+            total += count_tokens(json.dumps(part.function_call.args or {}, default=str))
+        if part.function_response:
+            total += count_tokens(json.dumps(part.function_response.response or {}, default=str))
+    return total
+
+
+def event_tokens(event: Event) -> int:
+    """Estimate the tokens an event adds to the LLM history."""
+    return content_tokens(event.content)
+
+
+def has_tool_payload(event: Event) -> bool:
+    return bool(event.content and event.content.parts and any(part.function_response for part in event.content.parts))
+
+
+def summarize_response(response: Dict[str, Any], summary_tokens: int) -> Dict[str, Any]:
+    """Short stand-in for an old tool result."""
+    text = next((response[field] for field in SUMMARY_FIELDS if isinstance(response.get(field), str)), None)
+    if text is None:
+        text = json.dumps(response, ensure_ascii=False, default=str)
+    summary = {
+        "status": response.get("status"),
+        "compacted": True,
+        "summary": truncate_to_tokens(text, summary_tokens),
+        "original_tokens": count_tokens(json.dumps(response, default=str)),
+    }
+    if response.get("artifacts"):
+        # Full content saved by result shaping stays reachable
+        summary["artifacts"] = response["artifacts"]
+    return summary
+
+
+class SQLiteSessionService(BaseSessionService):
+    """ADK session service backed by a SQLite/WAL file, with batched writes and compaction."""
+
+    def __init__(
+        self,
+        path: str,
+        flush_interval: float = 0.1,
+        batch_events: int = 64,
+        compact_tokens: int = 8000,
+        keep_recent_events: int = 6,
+        summary_tokens: int = 120,
+        max_flush_failures: int = 10,
+    ):
+        """
+        Args:
+            path: SQLite database file
+            flush_interval: Seconds between background flushes of buffered writes
+            batch_events: Buffered events that trigger an early flush
+            compact_tokens: History size (estimated tokens) that triggers compaction (0 disables it)
+            keep_recent_events: Most recent events that are never compacted
+            summary_tokens: Size of the summary that replaces a compacted tool result
+            max_flush_failures: Consecutive failed background writes after which buffered writes are dropped
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_events = batch_events
+        self.compact_tokens = compact_tokens
+        self.keep_recent_events = keep_recent_events
+        self.summary_tokens = summary_tokens
+        self.max_flush_failures = max(1, max_flush_failures)
+
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                app_name TEXT NOT NULL, user_id TEXT NOT NULL, id TEXT NOT NULL,
+                state TEXT NOT NULL, create_time REAL NOT NULL, update_time REAL NOT NULL,
+                compactions INTEGER NOT NULL DEFAULT 0, tokens_saved INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (app_name, user_id, id)
+            );
+            CREATE TABLE IF NOT EXISTS events (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                app_name TEXT NOT NULL, user_id TEXT NOT NULL, session_id TEXT NOT NULL,
+                id TEXT NOT NULL, timestamp REAL NOT NULL, data TEXT NOT NULL,
+                tokens INTEGER NOT NULL, tool_payload INTEGER NOT NULL, compacted INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS events_by_session ON events (app_name, user_id, session_id, seq);
+            CREATE TABLE IF NOT EXISTS app_states (app_name TEXT PRIMARY KEY, state TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS user_states (
+                app_name TEXT NOT NULL, user_id TEXT NOT NULL, state TEXT NOT NULL, PRIMARY KEY (app_name, user_id)
+            );
+        """)
+
+        # Writes waiting for the next flush
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending_events: List[Tuple] = []
+        self._pending_sessions: Dict[Tuple[str, str, str], Tuple[str, float]] = {}
+        self._pending_app: Dict[str, Dict[str, Any]] = {}
+        self._pending_user: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+        self.flushes = 0
+        self.flushed_events = 0
+        self.flush_failures = 0
+        self.dropped_events = 0
+        self.compactions = 0
+
+        self._closed = False
+        self._wake = threading.Event()
+        self._writer = threading.Thread(target=self._write_loop, name="session-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    @classmethod
+    def from_env(cls, path: Optional[str] = None) -> "SQLiteSessionService":
+        """Build a service from SESSION_* environment variables."""
+        return cls(
+            path=path or os.getenv("SESSION_DB_PATH", cache_path("sessions.sqlite")),
+            flush_interval=float(os.getenv("SESSION_FLUSH_MS", "100")) / 1000,
+            batch_events=int(os.getenv("SESSION_BATCH_EVENTS", "64")),
+            compact_tokens=int(os.getenv("SESSION_COMPACT_TOKENS", "8000")),
+            keep_recent_events=int(os.getenv("SESSION_KEEP_RECENT_EVENTS", "6")),
+            summary_tokens=int(os.getenv("SESSION_SUMMARY_TOKENS", "120")),
+            max_flush_failures=int(os.getenv("SESSION_FLUSH_RETRIES", "10")),
+        )
+
+    @classmethod
+    def from_uri(cls, uri: str, **kwargs: Any) -> "SQLiteSessionService":
+        """
+        Build a service from a `sqlite+wal://` URI.
+
+        As with SQLAlchemy's sqlite URIs, three slashes give a path relative to the
+        working directory (`sqlite+wal:///sessions.db`) and four an absolute one
+        (`sqlite+wal:////var/lib/adk/sessions.db`). Without a path, SESSION_DB_PATH is used.
+        """
+        parsed = urlparse(uri)
+        if parsed.netloc:
+            raise ValueError(f"Session URI must not have a host, use {URI_SCHEME}:///relative or {URI_SCHEME}:////absolute: {uri}")
+        path = parsed.path[1:] if parsed.path.startswith("/") else parsed.path
+        return cls.from_env(path=path or None)
+
+    # -- BaseSessionService ------------------------------------------------
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Session:
+        return await asyncio.to_thread(self._create_session, app_name, user_id, state, session_id)
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        return await asyncio.to_thread(self._get_session, app_name, user_id, session_id, config)
+
+    async def list_sessions(self, *, app_name: str, user_id: Optional[str] = None) -> ListSessionsResponse:
+        return await asyncio.to_thread(self._list_sessions, app_name, user_id)
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        await asyncio.to_thread(self._delete_session, app_name, user_id, session_id)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+        event = await super().append_event(session=session, event=event)
+        session.last_update_time = event.timestamp
+
+        key = (session.app_name, session.user_id, session.id)
+        row = (*key, event.id, event.timestamp, event.model_dump_json(exclude_none=True),
+               event_tokens(event), int(has_tool_payload(event)))
+        session_state = {name: value for name, value in session.state.items()
+                         if not name.startswith((State.APP_PREFIX, State.USER_PREFIX, State.TEMP_PREFIX))}
+        delta = event.actions.state_delta if event.actions else None
+
+        with self._pending_lock:
+            self._pending_events.append(row)
+            self._pending_sessions[key] = (json.dumps(session_state, default=str), event.timestamp)
+            for name, value in (delta or {}).items():
+                if name.startswith(State.APP_PREFIX):
+                    self._pending_app.setdefault(session.app_name, {})[name[len(State.APP_PREFIX):]] = value
+                elif name.startswith(State.USER_PREFIX):
+                    self._pending_user.setdefault(key[:2], {})[name[len(State.USER_PREFIX):]] = value
+            if len(self._pending_events) >= self.batch_events:
+                self._wake.set()
+        return event
+
+    # -- Metrics -------------------------------------------------------------
+
+    def session_metrics(self, app_name: str, user_id: str, session_id: str) -> Optional[Dict[str, Any]]:
+        """Size of one session: events, estimated history tokens, stored bytes and compactions."""
+        self.flush()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT LENGTH(state), compactions, tokens_saved FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?",
+                (app_name, user_id, session_id),
+            ).fetchone()
+            if row is None:
+                return None
+            events, tokens, stored_bytes, tool_results, compacted = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(tokens), 0), COALESCE(SUM(LENGTH(data)), 0), "
+                "COALESCE(SUM(tool_payload), 0), COALESCE(SUM(compacted), 0) "
+                "FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                (app_name, user_id, session_id),
+            ).fetchone()
+        return {
+            "events": events,
+            "history_tokens": tokens,
+            "stored_bytes": stored_bytes + row[0],
+            "tool_results": tool_results,
+            "compacted_tool_results": compacted,
+            "compactions": row[1],
+            "tokens_saved": row[2],
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Totals for the whole store."""
+        self.flush()
+        with self._lock:
+            sessions = self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+            events, tokens = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(tokens), 0) FROM events").fetchone()
+        return {
+            "sessions": sessions,
+            "events": events,
+            "history_tokens": tokens,
+            "db_bytes": self.db_bytes(),
+            "flushes": self.flushes,
+            "flushed_events": self.flushed_events,
+            "flush_failures": self.flush_failures,
+            "dropped_events": self.dropped_events,
+            "compactions": self.compactions,
+        }
+
+    def db_bytes(self) -> int:
+        """Size of the database file and its write-ahead log."""
+        return sum(os.path.getsize(path) for path in (self.path, self.path + "-wal") if os.path.exists(path))
+
+    # -- Writes --------------------------------------------------------------
+
+    def flush(self) -> None:
+        """
+        Write every buffered event and state change in one transaction.
+
+        If the write fails, the batch goes back into the buffer (ahead of anything
+        buffered since) and the error is raised; nothing is lost.
+        """
+        with self._flush_lock:
+            with self._pending_lock:
+                events, self._pending_events = self._pending_events, []
+                sessions, self._pending_sessions = self._pending_sessions, {}
+                app_states, self._pending_app = self._pending_app, {}
+                user_states, self._pending_user = self._pending_user, {}
+            if not (events or sessions or app_states or user_states):
+                return
+
+            try:
+                with self._lock, self._transaction():
+                    self._conn.executemany(
+                        "INSERT INTO events (app_name, user_id, session_id, id, timestamp, data, tokens, tool_payload) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        events,
+                    )
+                    self._conn.executemany(
+                        "UPDATE sessions SET state = ?, update_time = ? WHERE app_name = ? AND user_id = ? AND id = ?",
+                        [(state, update_time, *key) for key, (state, update_time) in sessions.items()],
+                    )
+                    for app_name, delta in app_states.items():
+                        self._merge_state("app_states", {"app_name": app_name}, delta)
+                    for (app_name, user_id), delta in user_states.items():
+                        self._merge_state("user_states", {"app_name": app_name, "user_id": user_id}, delta)
+            except BaseException:
+                self._requeue(events, sessions, app_states, user_states)
+                self.flush_failures += 1
+                raise
+            self.flushes += 1
+            self.flushed_events += len(events)
+
+    def close(self) -> None:
+        """Flush buffered writes and close the database."""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._writer.join(timeout=5)
+        try:
+            self.flush()
+        except sqlite3.Error as e:
+            with self._pending_lock:
+                pending = len(self._pending_events)
+            print(f"ERROR: could not write {pending} buffered session events on close: {e}")
+        with self._lock:
+            self._conn.close()
+
+    def _write_loop(self) -> None:
+        failures = 0
+        while not self._closed:
+            # Back off while writes fail (e.g. "database is locked" under heavy multi-worker load)
+            self._wake.wait(min(self.flush_interval * 2 ** failures, 5.0))
+            self._wake.clear()
+            try:
+                self.flush()
+                failures = 0
+            except sqlite3.Error as e:
+                failures += 1
+                if failures < self.max_flush_failures:
+                    print(f"Warning: could not write session events (attempt {failures}), retrying: {e}")
+                    continue
+                dropped = self._drop_pending()
+                print(f"ERROR: dropped {dropped} buffered session events after {failures} failed writes: {e}")
+                failures = 0
+
+    def _requeue(self, events: List[Tuple], sessions: Dict, app_states: Dict, user_states: Dict) -> None:
+        """Put a batch that could not be written back into the buffer, under anything buffered since."""
+        with self._pending_lock:
+            self._pending_events = events + self._pending_events
+            self._pending_sessions = {**sessions, **self._pending_sessions}
+            for app_name, delta in app_states.items():
+                self._pending_app[app_name] = {**delta, **self._pending_app.get(app_name, {})}
+            for user_key, delta in user_states.items():
+                self._pending_user[user_key] = {**delta, **self._pending_user.get(user_key, {})}
+
+    def _drop_pending(self) -> int:
+        with self._pending_lock:
+            dropped = len(self._pending_events)
+            self._pending_events, self._pending_sessions = [], {}
+            self._pending_app, self._pending_user = {}, {}
+        self.dropped_events += dropped
+        return dropped
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        """Run the block in one write transaction, rolled back if it fails. Called with the lock held."""
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+            self._conn.execute("COMMIT")
+        except BaseException:
+            # The connection is shared: never leave it inside a failed transaction
+            if self._conn.in_transaction:
+                self._conn.execute("ROLLBACK")
+            raise
+
+    def _merge_state(self, table: str, key: Dict[str, str], delta: Dict[str, Any]) -> None:
+        where = " AND ".join(f"{column} = ?" for column in key)
+        row = self._conn.execute(f"SELECT state FROM {table} WHERE {where}", tuple(key.values())).fetchone()
+        state = json.loads(row[0]) if row else {}
+        state.update(delta)
+        columns = ", ".join([*key, "state"])
+        self._conn.execute(
+            f"INSERT OR REPLACE INTO {table} ({columns}) VALUES ({', '.join('?' * (len(key) + 1))})",
+            (*key.values(), json.dumps(state, default=str)),
+        )
+
+    # -- Reads ---------------------------------------------------------------
+
+    def _create_session(self, app_name: str, user_id: str, state: Optional[Dict[str, Any]],
+                        session_id: Optional[str]) -> Session:
+        session_id = session_id.strip() if session_id and session_id.strip() else str(uuid.uuid4())
+        app_delta, user_delta, session_state = {}, {}, {}
+        for name, value in (state or {}).items():
+            if name.startswith(State.APP_PREFIX):
+                app_delta[name[len(State.APP_PREFIX):]] = value
+            elif name.startswith(State.USER_PREFIX):
+                user_delta[name[len(State.USER_PREFIX):]] = value
+            elif not name.startswith(State.TEMP_PREFIX):
+                session_state[name] = value
+
+        self.flush()
+        now = time.time()
+        with self._lock:
+            with self._transaction():
+                try:
+                    self._conn.execute(
+                        "INSERT INTO sessions (app_name, user_id, id, state, create_time, update_time) VALUES (?, ?, ?, ?, ?, ?)",
+                        (app_name, user_id, session_id, json.dumps(session_state, default=str), now, now),
+                    )
+                except sqlite3.IntegrityError:
+                    raise AlreadyExistsError(f"Session with id {session_id} already exists.")
+                if app_delta:
+                    self._merge_state("app_states", {"app_name": app_name}, app_delta)
+                if user_delta:
+                    self._merge_state("user_states", {"app_name": app_name, "user_id": user_id}, user_delta)
+            merged = self._with_shared_state(app_name, user_id, session_state)
+        return Session(app_name=app_name, user_id=user_id, id=session_id, state=merged, last_update_time=now)
+
+    def _get_session(self, app_name: str, user_id: str, session_id: str,
+                     config: Optional[GetSessionConfig]) -> Optional[Session]:
+        self.flush()
+        key = (app_name, user_id, session_id)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state, update_time FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?", key
+            ).fetchone()
+            if row is None:
+                return None
+
+            if self.compact_tokens > 0:
+                total = self._conn.execute(
+                    "SELECT COALESCE(SUM(tokens), 0) FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?", key
+                ).fetchone()[0]
+                if total > self.compact_tokens:
+                    self._compact(key, total)
+
+            query = "SELECT seq, data FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?"
+            params: List[Any] = list(key)
+            if config and config.after_timestamp:
+                query += " AND timestamp >= ?"
+                params.append(config.after_timestamp)
+            if config and config.num_recent_events:
+                query = f"SELECT seq, data FROM ({query} ORDER BY seq DESC LIMIT ?) ORDER BY seq"
+                params.append(config.num_recent_events)
+            else:
+                query += " ORDER BY seq"
+            events = [Event.model_validate_json(data) for _, data in self._conn.execute(query, params)]
+            state = self._with_shared_state(app_name, user_id, json.loads(row[0]))
+
+        return Session(app_name=app_name, user_id=user_id, id=session_id, state=state, events=events,
+                       last_update_time=row[1])
+
+    def _list_sessions(self, app_name: str, user_id: Optional[str]) -> ListSessionsResponse:
+        self.flush()
+        with self._lock:
+            if user_id is None:
+                rows = self._conn.execute(
+                    "SELECT user_id, id, state, update_time FROM sessions WHERE app_name = ?", (app_name,)
+                ).fetchall()
+            else:
+                rows = self._conn.execute(
+                    "SELECT user_id, id, state, update_time FROM sessions WHERE app_name = ? AND user_id = ?",
+                    (app_name, user_id),
+                ).fetchall()
+            sessions = [
+                Session(app_name=app_name, user_id=row_user, id=row_id, last_update_time=update_time,
+                        state=self._with_shared_state(app_name, row_user, json.loads(state)))
+                for row_user, row_id, state, update_time in rows
+            ]
+        return ListSessionsResponse(sessions=sessions)
+
+    def _delete_session(self, app_name: str, user_id: str, session_id: str) -> None:
+        self.flush()
+        key = (app_name, user_id, session_id)
+        with self._lock, self._transaction():
+            self._conn.execute("DELETE FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?", key)
+            self._conn.execute("DELETE FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?", key)
+
+    def _with_shared_state(self, app_name: str, user_id: str, state: Dict[str, Any]) -> Dict[str, Any]:
+        # Called with the lock held
+        merged = dict(state)
+        row = self._conn.execute("SELECT state FROM app_states WHERE app_name = ?", (app_name,)).fetchone()
+        for name, value in (json.loads(row[0]) if row else {}).items():
+            merged[State.APP_PREFIX + name] = value
+        row = self._conn.execute(
+            "SELECT state FROM user_states WHERE app_name = ? AND user_id = ?", (app_name, user_id)
+        ).fetchone()
+        for name, value in (json.loads(row[0]) if row else {}).items():
+            merged[State.USER_PREFIX + name] = value
+        return merged
+
+    # -- Compaction ----------------------------------------------------------
+
+    def _compact(self, key: Tuple[str, str, str], total: int) -> None:
+        """Summarize the oldest tool results until the history is under the target size."""
+        # Called with the lock held
+        protected = {seq for (seq,) in self._conn.execute(
+            "SELECT seq FROM events WHERE app_name = ? AND user_id = ? AND session_id = ? ORDER BY seq DESC LIMIT ?",
+            (*key, self.keep_recent_events),
+        )}
+        candidates = self._conn.execute(
+            "SELECT seq, data, tokens FROM events WHERE app_name = ? AND user_id = ? AND session_id = ? "
+            "AND tool_payload = 1 AND compacted = 0 ORDER BY seq",
+            key,
+        ).fetchall()
+
+        target = self.compact_tokens * COMPACT_TARGET
+        saved = 0
+        updates = []
+        for seq, data, tokens in candidates:
+            if total - saved <= target or seq in protected:
+                break
+            event = Event.model_validate_json(data)
+            for part in event.content.parts:
+                if part.function_response and part.function_response.response is not None:
+                    part.function_response.response = summarize_response(
+                        part.function_response.response, self.summary_tokens
+                    )
+            new_tokens = event_tokens(event)
+            saved += max(0, tokens - new_tokens)
+            updates.append((event.model_dump_json(exclude_none=True), new_tokens, seq))
+        if not updates:
+            return
+
+        with self._transaction():
+            self._conn.executemany("UPDATE events SET data = ?, tokens = ?, compacted = 1 WHERE seq = ?", updates)
+            self._conn.execute(
+                "UPDATE sessions SET compactions = compactions + 1, tokens_saved = tokens_saved + ? "
+                "WHERE app_name = ? AND user_id = ? AND id = ?",
+                (saved, *key),
+            )
+        self.compactions += 1
+
+
+def _register_uri_scheme() -> None:
+    # Lets `get_fast_api_app(session_service_uri="sqlite+wal:///...")` build this service
+    from google.adk.cli.service_registry import get_service_registry
+
+    get_service_registry().register_session_service(URI_SCHEME, SQLiteSessionService.from_uri)
+
+
+_register_uri_scheme()
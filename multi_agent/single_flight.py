@@ -0,0 +1,196 @@
+"""
+Request coalescing (single-flight) for concurrent identical tool calls.
+
+When several sessions call a tool with the same normalized arguments at the
+same moment, only the first call (the leader) runs; the others wait for it
+and receive a copy of its result, so a traffic spike on a popular question
+costs one Chroma query, Gemini generation, Custom Search request or page
+fetch instead of one per caller. Nothing is cached: a call that starts after
+the leader finished runs again.
+
+Threaded and asyncio callers share flights. An async caller can join a
+flight led by a thread or by a task on any event loop; a threaded caller
+only joins flights led by another thread, because blocking on a flight led
+by a task could deadlock that task's event loop. An async leader runs its
+call in a separate task, so a cancelled leader does not cancel the call the
+other callers are waiting for.
+
+Set SINGLE_FLIGHT=0 to disable coalescing.
+"""
+
+import asyncio
+import concurrent.futures
+import copy
+import functools
+import inspect
+import os
+import threading
+from typing import Any, Callable, Dict, Hashable, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+from multi_agent.services import registry
+
+
+def normalize_url(url: str) -> str:
+    """URL with a lower-case scheme and host and without its fragment."""
+    parts = urlsplit(str(url).strip())
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or "/", parts.query, ""))
+
+
+class SingleFlight:
+    """One in-flight call per key, shared by every concurrent caller."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        # key -> (future of the leader's result, whether the leader is an asyncio task)
+        self._flights: Dict[Hashable, Tuple[concurrent.futures.Future, bool]] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    def _join(self, key: Hashable, leader_is_async: bool, joinable: Callable[[bool], bool]):
+        """Return (future, is_leader), registering a new flight if none can be joined."""
+        with self._lock:
+            self.calls += 1
+            flight = self._flights.get(key)
+            if flight is not None and joinable(flight[1]):
+                self.coalesced += 1
+                return flight[0], False
+            future: concurrent.futures.Future = concurrent.futures.Future()
+            if flight is None:
+                self._flights[key] = (future, leader_is_async)
+            self.executions += 1
+            return future, True
+
+    def _finish(self, key: Hashable, future: concurrent.futures.Future) -> None:
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None and flight[0] is future:
+                del self._flights[key]
+            if future.exception() is not None:
+                self.errors += 1
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        """Run `func` unless another thread is already running it for `key`; return its result."""
+        future, leader = self._join(key, False, lambda leader_is_async: not leader_is_async)
+        if not leader:
+            return future.result()
+        try:
+            future.set_result(func())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            self._finish(key, future)
+        return future.result()
+
+    async def do_async(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        """Await `func()` unless a call for `key` is already in flight; return its result."""
+        future, leader = self._join(key, True, lambda leader_is_async: True)
+        if leader:
+            task = asyncio.ensure_future(func())
+
+            def settle(task: asyncio.Task) -> None:
+                if task.cancelled():
+                    future.set_exception(asyncio.CancelledError())
+                elif task.exception() is not None:
+                    future.set_exception(task.exception())
+                else:
+                    future.set_result(task.result())
+                self._finish(key, future)
+
+            task.add_done_callback(settle)
+        return await asyncio.shield(asyncio.wrap_future(future))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "errors": self.errors,
+                "in_flight": len(self._flights),
+            }
+
+
+# Flights by name; kept in the registry so that every agent package shares them
+registry.register("single_flights", dict)
+_flights_lock = threading.Lock()
+
+
+def get_flight(name: str) -> SingleFlight:
+    """Return the shared single-flight group for a tool."""
+    flights = registry.get("single_flights")
+    flight = flights.get(name)
+    if flight is None:
+        with _flights_lock:
+            flight = flights.setdefault(name, SingleFlight(name))
+    return flight
+
+
+def enabled() -> bool:
+    return os.getenv("SINGLE_FLIGHT", "1").strip().lower() not in ("0", "false", "no")
+
+
+def coalesce(name: str, **normalizers: Callable[[Any], Hashable]) -> Callable:
+    """
+    Decorator coalescing concurrent calls of a sync or async tool with equal arguments.
+
+    Sync and async versions of a tool that return the same result can share a
+    flight by using the same `name`. Arguments listed in `normalizers` are
+    normalized before they are compared. Every caller gets its own shallow copy
+    of the result, with the arguments it echoes back set to the caller's own.
+
+    Args:
+        name: Flight group name
+        normalizers: Argument name -> function returning its normalized form
+    """
+
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+
+        def key_and_arguments(args, kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = tuple(
+                (argument, normalizers[argument](value) if argument in normalizers else repr(value))
+                for argument, value in bound.arguments.items()
+            )
+            return key, bound.arguments
+
+        def own_copy(result: Any, arguments: Dict[str, Any]) -> Any:
+            if not isinstance(result, dict):
+                return result
+            result = copy.copy(result)
+            for argument, value in arguments.items():
+                if argument in result:
+                    result[argument] = value
+            return result
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not enabled():
+                    return await func(*args, **kwargs)
+                key, arguments = key_and_arguments(args, kwargs)
+                result = await get_flight(name).do_async(key, lambda: func(*args, **kwargs))
+                return own_copy(result, arguments)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled():
+                return func(*args, **kwargs)
+            key, arguments = key_and_arguments(args, kwargs)
+            return own_copy(get_flight(name).do(key, lambda: func(*args, **kwargs)), arguments)
+        return wrapper
+
+    return decorator
+
+
+def single_flight_stats() -> Dict[str, Any]:
+    """Return call, execution and coalescing counters for every tool used so far."""
+    if not registry.is_ready("single_flights"):
+        return {}
+    return {name: flight.stats() for name, flight in list(registry.get("single_flights").items())}
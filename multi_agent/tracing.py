@@ -0,0 +1,492 @@
+"""
+Request-scoped tracing for the agent tree.
+
+Spans cover agent runs, LLM calls (routing hops), tool functions and the
+backend calls they make (retrieval, Gemini, Custom Search, page fetches).
+Agent and LLM spans come from ADK callbacks and are grouped per invocation,
+so all spans of one user request share a trace ID and carry its session ID.
+Spans opened inside a tool become children of that tool's span through a
+context variable.
+
+Finished spans are appended to a JSON-lines file in the OTLP/JSON export
+format (one ExportTraceServiceRequest per line), which OpenTelemetry
+collectors can read with the otlpjsonfile receiver. Tracing is enabled with
+ADK_TRACING=1; the file is ADK_TRACE_FILE.
+
+Summarize a trace file with:
+
+    python -m multi_agent.tracing [--file PATH]
+"""
+
+import argparse
+import contextlib
+import contextvars
+import functools
+import inspect
+import json
+import math
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from multi_agent.services import cache_path, registry
+
+_KIND_INTERNAL = 1
+_KIND_CLIENT = 3
+_STATUS_OK = 1
+_STATUS_ERROR = 2
+
+# Agent and LLM spans still open after this long are closed as abandoned
+# (e.g. the client disconnected before the root agent finished)
+_MAX_OPEN_SPAN_NS = 15 * 60 * 10**9
+
+
+class Span:
+    """A timed operation within a trace."""
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], kind: int, attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = dict(attributes)
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_error(self, error: BaseException) -> None:
+        self.error = f"{type(error).__name__}: {error}"
+
+    def end(self) -> None:
+        """Finish the span and export it (only the first call has an effect)."""
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            _export(self)
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(key, value) for key, value in self.attributes.items()],
+            "status": {"code": _STATUS_ERROR, "message": self.error} if self.error else {"code": _STATUS_OK},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class _NoopSpan:
+    """Returned when tracing is disabled."""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def record_error(self, error: BaseException) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class TraceExporter:
+    """Appends finished spans to a file in OTLP/JSON format."""
+
+    def __init__(self, path: str, service_name: str = "google-adk-automation", flush_every: int = 32):
+        self.path = path
+        self.service_name = service_name
+        self.flush_every = flush_every
+        self._pending: List[Span] = []
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            self._pending.append(span)
+            # Flush whole requests promptly: a root span ends its trace
+            if span.parent_id is None or len(self._pending) >= self.flush_every:
+                self._flush_locked()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if not self._pending:
+            return
+        request = {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", self.service_name)]},
+                "scopeSpans": [{
+                    "scope": {"name": "multi_agent.tracing"},
+                    "spans": [span.to_otlp() for span in self._pending],
+                }],
+            }]
+        }
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(request) + "\n")
+        except OSError as e:
+            # Tracing must never break a request
+            print(f"Warning: failed to write trace file: {e}")
+        self._pending = []
+
+
+def _build_exporter() -> Any:
+    """Build the process-wide exporter, or False when tracing is disabled."""
+    if os.getenv("ADK_TRACING", "").strip().lower() not in ("1", "true", "yes"):
+        return False
+    exporter = TraceExporter(os.getenv("ADK_TRACE_FILE", cache_path("traces.jsonl")))
+    import atexit
+    atexit.register(exporter.flush)
+    return exporter
+
+
+registry.register("trace_exporter", _build_exporter)
+
+
+def _get_exporter() -> Optional[TraceExporter]:
+    """Return the exporter, or None when tracing is disabled (read once, on first use)."""
+    return registry.get("trace_exporter") or None
+
+
+def enabled() -> bool:
+    return _get_exporter() is not None
+
+
+def _export(span: Span) -> None:
+    exporter = _get_exporter()
+    if exporter is not None:
+        exporter.export(span)
+
+
+# The span that new spans in this context are children of
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+def start_span(name: str, parent: Optional[Span] = None, client: bool = False, **attributes: Any) -> Any:
+    """
+    Start a span without making it current; call `end()` when done.
+
+    Without `parent`, the current span (if any) is the parent, otherwise a
+    new trace starts.
+    """
+    if not enabled():
+        return _NOOP_SPAN
+    parent = parent or _current_span.get()
+    return Span(
+        name,
+        trace_id=parent.trace_id if parent else os.urandom(16).hex(),
+        parent_id=parent.span_id if parent else None,
+        kind=_KIND_CLIENT if client else _KIND_INTERNAL,
+        attributes=attributes,
+    )
+
+
+@contextlib.contextmanager
+def span(name: str, parent: Optional[Span] = None, client: bool = False, **attributes: Any) -> Iterator[Any]:
+    """Trace the enclosed block as a child of `parent` (default: the current span)."""
+    if not enabled():
+        yield _NOOP_SPAN
+        return
+    current = start_span(name, parent=parent, client=client, **attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.record_error(e)
+        raise
+    finally:
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            # Reset from a different context (e.g. a generator resumed elsewhere)
+            pass
+        current.end()
+
+
+def traced(name: str, client: bool = False) -> Callable:
+    """Decorator tracing every call of a sync or async function."""
+
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name, client=client):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, client=client):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def bind(func: Callable) -> Callable:
+    """Run `func` in a copy of the current context, so spans in worker threads keep their parent."""
+    context = contextvars.copy_context()
+    # A context can only be entered by one thread at a time, so run each call in its own copy
+    return lambda *args, **kwargs: context.copy().run(func, *args, **kwargs)
+
+
+# ---------------------------------------------------------------------------
+# ADK callbacks: agent and LLM spans, grouped per invocation
+# ---------------------------------------------------------------------------
+
+# (invocation ID, key) -> open span; keys are ("agent", name) or ("llm", name)
+_open_spans: Dict[Tuple[str, Tuple[str, str]], Span] = {}
+# (invocation ID, function call ID) -> token restoring the current span after the tool
+_tool_tokens: Dict[Tuple[str, str], Tuple[contextvars.Token, int]] = {}
+_open_lock = threading.Lock()
+
+
+def invocation_span(invocation_id: str, agent_name: str) -> Optional[Span]:
+    """Return the open span of an agent run within an invocation, if tracing is on."""
+    with _open_lock:
+        agent_span = _open_spans.get((invocation_id, ("agent", agent_name)))
+        if agent_span is not None:
+            return agent_span
+        # Fall back to the most recently opened agent span of the invocation
+        # (e.g. the coordinator that transferred to this agent)
+        parent = None
+        for (invocation, (kind, _)), open_span in _open_spans.items():
+            if invocation == invocation_id and kind == "agent":
+                parent = open_span
+    return parent
+
+
+def _open(invocation_id: str, key: Tuple[str, str], name: str, parent: Optional[Span], **attributes: Any) -> None:
+    opened = start_span(name, parent=parent, **attributes)
+    if isinstance(opened, Span):
+        with _open_lock:
+            _open_spans[(invocation_id, key)] = opened
+        _close_abandoned(opened.start_ns - _MAX_OPEN_SPAN_NS)
+
+
+def _close_abandoned(started_before_ns: int) -> None:
+    """Close spans and drop tool tokens of invocations whose root agent never finished."""
+    with _open_lock:
+        stale = [key for key, open_span in _open_spans.items() if open_span.start_ns < started_before_ns]
+        for key in [key for key, (_, started_ns) in _tool_tokens.items() if started_ns < started_before_ns]:
+            del _tool_tokens[key]
+    for invocation_id, key in stale:
+        _close(invocation_id, key, error="abandoned")
+
+
+def _close(invocation_id: str, key: Tuple[str, str], error: Optional[str] = None) -> Optional[Span]:
+    with _open_lock:
+        closed = _open_spans.pop((invocation_id, key), None)
+    if closed is not None:
+        if error:
+            closed.error = error
+        closed.end()
+    return closed
+
+
+def _before_agent(callback_context) -> None:
+    if not enabled():
+        return None
+    invocation_id = callback_context.invocation_id
+    session = callback_context.session
+    _open(
+        invocation_id,
+        ("agent", callback_context.agent_name),
+        f"agent:{callback_context.agent_name}",
+        invocation_span(invocation_id, callback_context.agent_name),
+        **{"adk.invocation_id": invocation_id, "adk.session_id": session.id, "adk.user_id": session.user_id},
+    )
+    return None
+
+
+def _after_agent(callback_context) -> None:
+    if not enabled():
+        return None
+    invocation_id = callback_context.invocation_id
+    closed = _close(invocation_id, ("agent", callback_context.agent_name))
+    if closed is not None and closed.parent_id is None:
+        # The request is over: close anything left open (e.g. a failed LLM call)
+        with _open_lock:
+            leftovers = [key for key in _open_spans if key[0] == invocation_id]
+            for key in [key for key in _tool_tokens if key[0] == invocation_id]:
+                del _tool_tokens[key]
+        for _, key in leftovers:
+            _close(invocation_id, key, error="not finished")
+    return None
+
+
+def _before_model(callback_context, llm_request) -> None:
+    if not enabled():
+        return None
+    invocation_id = callback_context.invocation_id
+    _open(
+        invocation_id,
+        ("llm", callback_context.agent_name),
+        f"llm:{callback_context.agent_name}",
+        invocation_span(invocation_id, callback_context.agent_name),
+        **{"llm.model": getattr(llm_request, "model", None) or ""},
+    )
+    return None
+
+
+def _after_model(callback_context, llm_response) -> None:
+    if not enabled():
+        return None
+    key = (callback_context.invocation_id, ("llm", callback_context.agent_name))
+    if getattr(llm_response, "partial", False):
+        # Streaming: note time to first chunk, close on the final response
+        with _open_lock:
+            open_span = _open_spans.get(key)
+        if open_span is not None and "llm.time_to_first_chunk_ms" not in open_span.attributes:
+            open_span.set_attribute("llm.time_to_first_chunk_ms", round((time.time_ns() - open_span.start_ns) / 1e6, 1))
+        return None
+    usage = getattr(llm_response, "usage_metadata", None)
+    with _open_lock:
+        open_span = _open_spans.get(key)
+    if open_span is not None and usage is not None:
+        open_span.set_attribute("llm.prompt_tokens", usage.prompt_token_count or 0)
+        open_span.set_attribute("llm.output_tokens", usage.candidates_token_count or 0)
+    _close(*key, error=getattr(llm_response, "error_message", None))
+    return None
+
+
+def _before_tool(tool, args, tool_context) -> None:
+    if not enabled():
+        return None
+    # Each function call runs in its own task; spans opened by the tool
+    # (see `traced`) become children of the calling agent's span
+    parent = invocation_span(tool_context.invocation_id, tool_context.agent_name)
+    if parent is not None:
+        token = _current_span.set(parent)
+        with _open_lock:
+            _tool_tokens[(tool_context.invocation_id, tool_context.function_call_id)] = (token, time.time_ns())
+    return None
+
+
+def _after_tool(tool, args, tool_context, tool_response) -> None:
+    with _open_lock:
+        entry = _tool_tokens.pop((tool_context.invocation_id, tool_context.function_call_id), None)
+    if entry is not None:
+        try:
+            _current_span.reset(entry[0])
+        except ValueError:
+            # Reset from a different context than the one that set it
+            pass
+    return None
+
+
+def agent_callbacks(llm: bool = True, after_tool: Optional[Callable] = None) -> Dict[str, Any]:
+    """
+    Keyword arguments that add tracing callbacks to an agent.
+
+    Args:
+        llm: Include the LLM and tool callbacks (False for agents that are not LlmAgents)
+        after_tool: The agent's own after_tool_callback, run after the tracing one
+    """
+    callbacks = {
+        "before_agent_callback": _before_agent,
+        "after_agent_callback": _after_agent,
+    }
+    if not llm:
+        return callbacks
+    return {
+        **callbacks,
+        "before_model_callback": _before_model,
+        "after_model_callback": _after_model,
+        "before_tool_callback": _before_tool,
+        "after_tool_callback": [_after_tool, after_tool] if after_tool else _after_tool,
+    }
+
+
+# ---------------------------------------------------------------------------
+# CLI summary
+# ---------------------------------------------------------------------------
+
+def _percentile(values: List[float], percent: float) -> float:
+    """Nearest-rank percentile of sorted values."""
+    if not values:
+        return 0.0
+    return values[max(0, math.ceil(percent / 100 * len(values)) - 1)]
+
+
+def load_spans(path: str) -> List[Dict[str, Any]]:
+    """Read every span from an OTLP/JSON-lines trace file."""
+    spans = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            for resource_spans in json.loads(line).get("resourceSpans", []):
+                for scope_spans in resource_spans.get("scopeSpans", []):
+                    spans.extend(scope_spans.get("spans", []))
+    return spans
+
+
+def summarize(spans: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Latency percentiles per stage (span name), slowest total first."""
+    durations: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    for item in spans:
+        name = item["name"]
+        durations.setdefault(name, []).append((int(item["endTimeUnixNano"]) - int(item["startTimeUnixNano"])) / 1e6)
+        if item.get("status", {}).get("code") == _STATUS_ERROR:
+            errors[name] = errors.get(name, 0) + 1
+
+    rows = []
+    for name, values in durations.items():
+        values.sort()
+        rows.append({
+            "stage": name,
+            "count": len(values),
+            "errors": errors.get(name, 0),
+            "p50_ms": _percentile(values, 50),
+            "p95_ms": _percentile(values, 95),
+            "p99_ms": _percentile(values, 99),
+            "total_ms": sum(values),
+        })
+    rows.sort(key=lambda row: row["total_ms"], reverse=True)
+    return rows
+
+
+def main():
+    """Print per-stage latency percentiles for a trace file."""
+    parser = argparse.ArgumentParser(description="Summarize agent traces by stage.")
+    parser.add_argument("--file", default=os.getenv("ADK_TRACE_FILE", cache_path("traces.jsonl")))
+    args = parser.parse_args()
+
+    spans = load_spans(args.file)
+    traces = {item["traceId"] for item in spans}
+    print(f"{len(spans)} spans in {len(traces)} traces ({args.file})")
+    print(f"{'stage':<36} {'count':>6} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'total ms':>10}")
+    for row in summarize(spans):
+        print(
+            f"{row['stage']:<36} {row['count']:>6} {row['errors']:>6} {row['p50_ms']:>9.1f} "
+            f"{row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f} {row['total_ms']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+"""
+Multi-process serving for the agent packages.
+
+Runs N worker processes of the ADK API server (the app `adk api_server`
+serves) behind one front door, so that CPU-bound tool work (page cleanup,
+result formatting, JSON serialization) runs on every core instead of
+competing for one GIL.
+
+- Session affinity: every request that names a session is sent to the worker
+  chosen by rendezvous hashing of the session id over the worker slots, so a
+  session's state lives in one process. New sessions get their id from the
+  front door so that they land on the right worker from the start.
+- Shared caches: workers share ADK_CACHE_DIR, where the embedding, HTTP,
+  search, quota and BM25 caches are SQLite files, and run with
+  RAG_CACHE_SHARED=1 so RAG answers are shared too.
+- Graceful reloads: SIGHUP or `POST /_serving/reload` replaces the workers
+  one slot at a time. A new worker takes traffic only once it answers, and
+  the old one finishes its in-flight requests before it is stopped. Crashed
+  workers are restarted the same way. The reload endpoint is disabled unless
+  SERVE_ADMIN_TOKEN is set, and then requires `Authorization: Bearer <token>`.
+
+With the default in-memory session service, sessions are lost when their
+worker is replaced; pass `--session-db` to keep them across reloads.
+`sqlite+wal:///sessions.db` (relative to the working directory; four
+slashes for an absolute path) selects the batched, compacting store in
+multi_agent/session_store.py (any other ADK session URI works too). `/run_live` (websocket) is not proxied.
+
+Usage:
+    python serve.py --agents-dir . --workers 4 --port 8000 [--session-db sqlite+wal:///sessions.db]
+    kill -HUP <front door pid>   # rolling reload
+"""
+
+import argparse
+import asyncio
+import hmac
+import json
+import logging
+import os
+import re
+import signal
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import zlib
+from typing import Dict, List, Optional, Set
+
+import httpx
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+from starlette.types import Receive, Scope, Send
+
+logger = logging.getLogger("serve")
+
+# Matches /apps/{app}/users/{user}/sessions/{id}... and /debug/trace/session/{id}
+SESSION_PATH = re.compile(r"/sessions?/([^/]+)")
+SESSION_COLLECTION = re.compile(r"/apps/[^/]+/users/[^/]+/sessions/?")
+HOP_BY_HOP = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization", "te", "trailers",
+    "transfer-encoding", "upgrade", "host", "content-length",
+}
+
+
+def session_of(path: str, body: bytes) -> Optional[str]:
+    """Return the session a request belongs to, from its path or its JSON body."""
+    match = SESSION_PATH.search(path)
+    if match:
+        return match.group(1)
+    if body[:1] == b"{":
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return None
+        return payload.get("sessionId") or payload.get("session_id")
+    return None
+
+
+def rendezvous_slot(key: str, slots: int) -> int:
+    """Pick a slot for `key`; keys stay on their slot when workers restart."""
+    return max(range(slots), key=lambda slot: zlib.crc32(f"{slot}:{key}".encode()))
+
+
+class Worker:
+    """One API server process listening on a Unix socket."""
+
+    def __init__(self, slot: int, generation: int, socket_path: str, process: asyncio.subprocess.Process):
+        self.slot = slot
+        self.generation = generation
+        self.socket_path = socket_path
+        self.process = process
+        self.state = "starting"
+        self.inflight = 0
+        self.requests = 0
+        self.started_at = time.time()
+        self.client = httpx.AsyncClient(
+            transport=httpx.AsyncHTTPTransport(uds=socket_path),
+            base_url="http://worker",
+            timeout=None,
+        )
+
+    def status(self) -> Dict:
+        return {
+            "slot": self.slot,
+            "generation": self.generation,
+            "pid": self.process.pid,
+            "state": self.state,
+            "inflight": self.inflight,
+            "requests": self.requests,
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+        }
+
+
+class WorkerPool:
+    """A fixed number of worker slots, each holding one ready worker."""
+
+    def __init__(self, size: int, worker_args: List[str], start_timeout: float = 120.0, drain_timeout: float = 30.0):
+        """
+        Args:
+            size: Number of worker processes
+            worker_args: Extra command-line arguments for each worker
+            start_timeout: Seconds a new worker has to start answering
+            drain_timeout: Seconds a replaced worker has to finish its requests
+        """
+        self.size = size
+        self.worker_args = worker_args
+        self.start_timeout = start_timeout
+        self.drain_timeout = drain_timeout
+        self.socket_dir = tempfile.mkdtemp(prefix="adk-serve-")
+        self.slots: List[Optional[Worker]] = [None] * size
+        self._starting: List[Worker] = []
+        self.reloads = 0
+        self.restarts = 0
+        self._ready = [asyncio.Event() for _ in range(size)]
+        self._generation = 0
+        self._reload_lock = asyncio.Lock()
+        self._reload_tasks: Set[asyncio.Task] = set()
+        self._closing = False
+
+    async def start(self) -> None:
+        await asyncio.gather(*(self._replace(slot) for slot in range(self.size)))
+
+    async def pick(self, session_id: Optional[str]) -> Worker:
+        """Return the session's worker, or the least busy worker for session-less requests."""
+        if session_id is None:
+            ready = [worker for worker in self.slots if worker is not None and worker.state == "ready"]
+            if ready:
+                return min(ready, key=lambda worker: worker.inflight)
+            slot = 0
+        else:
+            slot = rendezvous_slot(session_id, self.size)
+        # Wait while a crashed worker in this slot is being replaced
+        await asyncio.wait_for(self._ready[slot].wait(), self.start_timeout)
+        return self.slots[slot]
+
+    def ready_workers(self) -> List[Worker]:
+        return [worker for worker in self.slots if worker is not None and worker.state == "ready"]
+
+    async def reload(self) -> None:
+        """Replace every worker, one slot at a time."""
+        async with self._reload_lock:
+            for slot in range(self.size):
+                await self._replace(slot)
+            self.reloads += 1
+            logger.info("reload %d complete", self.reloads)
+
+    def request_reload(self) -> asyncio.Task:
+        """Start a reload in the background; failures are logged."""
+        task = asyncio.get_running_loop().create_task(self.reload())
+        # Keep a reference so the task is not garbage collected while it runs
+        self._reload_tasks.add(task)
+        task.add_done_callback(self._reload_done)
+        return task
+
+    def _reload_done(self, task: asyncio.Task) -> None:
+        self._reload_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("reload failed: %s", task.exception(), exc_info=task.exception())
+
+    async def supervise(self, interval: float = 1.0) -> None:
+        """Restart workers that exited on their own."""
+        while not self._closing:
+            await asyncio.sleep(interval)
+            for slot, worker in enumerate(self.slots):
+                if worker is None or worker.state != "ready" or worker.process.returncode is None:
+                    continue
+                logger.warning("worker %d (pid %d) exited with %s, restarting",
+                               slot, worker.process.pid, worker.process.returncode)
+                worker.state = "exited"
+                self._ready[slot].clear()
+                self.restarts += 1
+                try:
+                    async with self._reload_lock:
+                        await self._replace(slot)
+                except Exception as e:
+                    logger.error("could not restart worker %d: %s", slot, e)
+
+    async def close(self) -> None:
+        self._closing = True
+        for task in list(self._reload_tasks):
+            task.cancel()
+        workers = [worker for worker in self.slots if worker is not None] + self._starting
+        await asyncio.gather(*(self._retire(worker) for worker in workers))
+
+    async def _replace(self, slot: int) -> None:
+        new = await self._spawn(slot)
+        old, self.slots[slot] = self.slots[slot], new
+        new.state = "ready"
+        self._ready[slot].set()
+        if old is not None:
+            await self._retire(old)
+
+    async def _spawn(self, slot: int) -> Worker:
+        self._generation += 1
+        socket_path = os.path.join(self.socket_dir, f"worker-{slot}-{self._generation}.sock")
+        env = dict(os.environ, ADK_WORKER_ID=str(slot), ADK_SERVE_PARENT_PID=str(os.getpid()))
+        env.setdefault("RAG_CACHE_SHARED", "1")
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, os.path.abspath(__file__), "--worker", socket_path, *self.worker_args, env=env
+        )
+        worker = Worker(slot, self._generation, socket_path, process)
+        # Tracked until it is ready so that close() also stops workers that are still starting
+        self._starting.append(worker)
+        try:
+            deadline = time.monotonic() + self.start_timeout
+            while time.monotonic() < deadline and not self._closing:
+                if process.returncode is not None:
+                    break
+                try:
+                    if (await worker.client.get("/list-apps")).status_code == 200:
+                        logger.info("worker %d ready (pid %d)", slot, process.pid)
+                        return worker
+                except httpx.TransportError:
+                    pass
+                await asyncio.sleep(0.1)
+        finally:
+            self._starting.remove(worker)
+
+        await self._retire(worker)
+        raise RuntimeError(f"worker {slot} did not start within {self.start_timeout:.0f} seconds")
+
+    async def _retire(self, worker: Worker) -> None:
+        worker.state = "draining"
+        deadline = time.monotonic() + self.drain_timeout
+        while worker.inflight and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if worker.process.returncode is None:
+            worker.process.terminate()
+            try:
+                await asyncio.wait_for(worker.process.wait(), self.drain_timeout)
+            except asyncio.TimeoutError:
+                worker.process.kill()
+                await worker.process.wait()
+        worker.state = "stopped"
+        await worker.client.aclose()
+        if os.path.exists(worker.socket_path):
+            os.unlink(worker.socket_path)
+
+
+class UpstreamResponse(StreamingResponse):
+    """A worker's response streamed to the client; the worker is released however the stream ends."""
+
+    def __init__(self, worker: Worker, upstream: httpx.Response):
+        # Streamed so that /run_sse events reach the client as they are produced
+        super().__init__(
+            upstream.aiter_raw(),
+            status_code=upstream.status_code,
+            headers={name: value for name, value in upstream.headers.items() if name.lower() not in HOP_BY_HOP},
+        )
+        self.worker = worker
+        self.upstream = upstream
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # Also covers client disconnects, after which Starlette neither
+        # finishes the body iterator nor runs background tasks
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.worker.inflight -= 1
+            await self.upstream.aclose()
+
+
+def create_app(pool: WorkerPool, admin_token: Optional[str] = None) -> Starlette:
+    """
+    Build the front door that proxies to the worker pool.
+
+    Args:
+        pool: Worker pool requests are sent to
+        admin_token: Bearer token required by POST /_serving/reload (None disables the endpoint)
+    """
+
+    async def status(request: Request) -> Response:
+        return JSONResponse({
+            "workers": [worker.status() for worker in pool.slots if worker is not None],
+            "reloads": pool.reloads,
+            "restarts": pool.restarts,
+        })
+
+    async def reload(request: Request) -> Response:
+        if not admin_token:
+            return JSONResponse({"error": "reload endpoint disabled; set SERVE_ADMIN_TOKEN"}, status_code=403)
+        supplied = request.headers.get("authorization", "")
+        if not hmac.compare_digest(supplied.encode(), f"Bearer {admin_token}".encode()):
+            return JSONResponse({"error": "unauthorized"}, status_code=401)
+        pool.request_reload()
+        return JSONResponse({"status": "reloading"}, status_code=202)
+
+    async def list_sessions(request: Request) -> Response:
+        # Sessions are spread over the workers, so ask all of them
+        responses = await asyncio.gather(
+            *(worker.client.get(request.url.path, params=request.query_params) for worker in pool.ready_workers()),
+            return_exceptions=True,
+        )
+        sessions = {}
+        for response in responses:
+            if isinstance(response, httpx.Response) and response.status_code == 200:
+                for session in response.json():
+                    sessions[session["id"]] = session
+        return JSONResponse(list(sessions.values()))
+
+    async def proxy(request: Request) -> Response:
+        path = request.url.path
+        if request.method == "GET" and SESSION_COLLECTION.fullmatch(path):
+            return await list_sessions(request)
+
+        body = await request.body()
+        headers = {name: value for name, value in request.headers.items() if name.lower() not in HOP_BY_HOP}
+        session_id = session_of(path, body)
+        if session_id is None and request.method == "POST" and SESSION_COLLECTION.fullmatch(path):
+            # Choose the id here so the session is created on the worker that will serve it
+            try:
+                payload = json.loads(body) if body.strip() else {}
+            except ValueError:
+                payload = None
+            # Malformed bodies go through unchanged so the worker reports the error
+            if isinstance(payload, dict):
+                session_id = payload["sessionId"] = str(uuid.uuid4())
+                body = json.dumps(payload).encode()
+                headers["content-type"] = "application/json"
+
+        try:
+            worker = await pool.pick(session_id)
+        except asyncio.TimeoutError:
+            return JSONResponse({"error": "no worker available"}, status_code=503)
+
+        worker.inflight += 1
+        worker.requests += 1
+        try:
+            upstream = await worker.client.send(
+                worker.client.build_request(
+                    request.method, path, params=request.query_params, headers=headers, content=body
+                ),
+                stream=True,
+            )
+        except httpx.TransportError as e:
+            worker.inflight -= 1
+            return JSONResponse({"error": f"worker {worker.slot} unavailable: {e}"}, status_code=502)
+
+        return UpstreamResponse(worker, upstream)
+
+    async def lifespan(app: Starlette):
+        await pool.start()
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(signal.SIGHUP, pool.request_reload)
+        supervisor = asyncio.ensure_future(pool.supervise())
+        try:
+            yield
+        finally:
+            supervisor.cancel()
+            await pool.close()
+
+    methods = ["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "HEAD"]
+    return Starlette(
+        routes=[
+            Route("/_serving/status", status, methods=["GET"]),
+            Route("/_serving/reload", reload, methods=["POST"]),
+            Route("/{path:path}", proxy, methods=methods),
+        ],
+        lifespan=lifespan,
+    )
+
+
+def run_worker(args: argparse.Namespace) -> None:
+    """Serve the ADK API server for the agents directory on a Unix socket."""
+    from google.adk.cli.fast_api import get_fast_api_app
+
+    parent = int(os.environ.get("ADK_SERVE_PARENT_PID", os.getppid()))
+
+    def watch_parent():
+        # Stop with the front door even if it was killed without cleaning up
+        while os.getppid() == parent:
+            time.sleep(1)
+        os.kill(os.getpid(), signal.SIGTERM)
+
+    threading.Thread(target=watch_parent, daemon=True).start()
+    if args.session_db and args.session_db.startswith("sqlite+wal:"):
+        # Registers the sqlite+wal session URI scheme
+        import multi_agent.session_store  # noqa: F401
+    app = get_fast_api_app(
+        agents_dir=os.path.abspath(args.agents_dir),
+        session_service_uri=args.session_db,
+        web=False,
+    )
+    uvicorn.run(app, uds=args.worker, log_level=args.log_level, timeout_graceful_shutdown=args.drain_timeout)
+
+
+def main():
+    """Run the front door and its workers (or one worker, with --worker)."""
+    parser = argparse.ArgumentParser(description="Serve the agents from several worker processes behind one port.")
+    parser.add_argument("--agents-dir", default=os.path.dirname(os.path.abspath(__file__)),
+                        help="Directory containing the agent packages")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--session-db", default=None,
+                        help="Session service URI shared by the workers (default: in-memory per worker)")
+    parser.add_argument("--start-timeout", type=float, default=120.0, help="Seconds a worker has to start")
+    parser.add_argument("--drain-timeout", type=float, default=30.0,
+                        help="Seconds a replaced worker has to finish its requests")
+    parser.add_argument("--log-level", default="warning")
+    parser.add_argument("--worker", metavar="SOCKET", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    worker_args = ["--agents-dir", args.agents_dir, "--log-level", args.log_level,
+                   "--drain-timeout", str(args.drain_timeout)]
+    if args.session_db:
+        worker_args += ["--session-db", args.session_db]
+    pool = WorkerPool(max(1, args.workers), worker_args, args.start_timeout, args.drain_timeout)
+    uvicorn.run(create_app(pool, admin_token=os.getenv("SERVE_ADMIN_TOKEN")), host=args.host, port=args.port, log_level=args.log_level)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+import tempfile
+
+# Keep the SQLite caches opened by the modules under test out of the user's cache directory
+os.environ.setdefault("ADK_CACHE_DIR", tempfile.mkdtemp(prefix="adk-tests-"))
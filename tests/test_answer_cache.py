@@ -0,0 +1,97 @@
+from multi_agent.answer_cache import AnswerCache, SharedAnswerStore
+
+K = 3
+MODEL = "gemini-test"
+
+
+def answer(text):
+    return {"model_response": text, "retrieved_docs": []}
+
+
+def test_exact_hit_ignores_case_and_spacing():
+    cache = AnswerCache()
+    _, tier, generation = cache.get("What is RAG?", K, MODEL)
+    assert tier is None
+    cache.put("What is RAG?", K, MODEL, answer("retrieval"), generation)
+
+    value, tier, _ = cache.get("  what is   rag? ", K, MODEL)
+    assert tier == "exact"
+    assert value["model_response"] == "retrieval"
+
+
+def test_invalidate_drops_answers():
+    cache = AnswerCache()
+    cache.put("q", K, MODEL, answer("old"))
+    cache.invalidate()
+
+    value, tier, _ = cache.get("q", K, MODEL)
+    assert value is None and tier is None
+
+
+def test_answer_generated_before_an_invalidation_is_not_stored():
+    cache = AnswerCache()
+    _, _, generation = cache.get("q", K, MODEL)
+    # A document is ingested while the answer is being generated
+    cache.invalidate()
+    cache.put("q", K, MODEL, answer("stale"), generation)
+
+    assert cache.get("q", K, MODEL)[0] is None
+    assert cache.stats()["stale_puts"] == 1
+
+
+def test_answer_from_the_current_generation_is_stored():
+    cache = AnswerCache()
+    cache.invalidate()
+    _, _, generation = cache.get("q", K, MODEL)
+    cache.put("q", K, MODEL, answer("fresh"), generation)
+
+    assert cache.get("q", K, MODEL)[1] == "exact"
+
+
+def test_invalidation_in_another_process_reaches_this_one(tmp_path):
+    path = str(tmp_path / "answers.sqlite")
+    local = AnswerCache(shared=SharedAnswerStore(path))
+    other = AnswerCache(shared=SharedAnswerStore(path))
+    _, _, generation = local.get("q", K, MODEL)
+    local.put("q", K, MODEL, answer("cached"), generation)
+    assert other.get("q", K, MODEL)[1] == "shared"
+
+    other.invalidate()
+
+    assert local.get("q", K, MODEL)[0] is None
+
+
+def test_stale_answer_is_not_written_to_the_shared_store(tmp_path):
+    path = str(tmp_path / "answers.sqlite")
+    local = AnswerCache(shared=SharedAnswerStore(path))
+    other = AnswerCache(shared=SharedAnswerStore(path))
+    _, _, generation = local.get("q", K, MODEL)
+    other.invalidate()
+
+    local.put("q", K, MODEL, answer("stale"), generation)
+
+    assert other.get("q", K, MODEL)[0] is None
+    assert local.get("q", K, MODEL)[0] is None
+
+
+def test_semantic_hit_is_scoped_to_k_and_model():
+    embeddings = {"how do i reset my password": [1.0, 0.0], "password reset steps": [0.99, 0.05]}
+    cache = AnswerCache(semantic_distance=0.05, embed_fn=lambda question: embeddings[question])
+    _, _, generation = cache.get("how do i reset my password", K, MODEL)
+    cache.put("how do i reset my password", K, MODEL, answer("use the portal"), generation)
+
+    value, tier, _ = cache.get("password reset steps", K, MODEL)
+    assert tier == "semantic"
+    assert value["model_response"] == "use the portal"
+    assert cache.get("password reset steps", K + 1, MODEL)[1] is None
+
+
+def test_semantic_index_follows_invalidation():
+    cache = AnswerCache(semantic_distance=0.05, embed_fn=lambda question: [1.0, 0.0])
+    _, _, generation = cache.get("first", K, MODEL)
+    cache.put("first", K, MODEL, answer("cached"), generation)
+    assert cache.get("second", K, MODEL)[1] == "semantic"
+
+    cache.invalidate()
+
+    assert cache.get("second", K, MODEL)[1] is None
@@ -0,0 +1,31 @@
+from multi_agent.http_cache import HTTPCache
+
+URL = "https://example.com/page"
+FRESH = {"cache-control": "max-age=60"}
+
+
+def test_public_response_is_stored(tmp_path):
+    cache = HTTPCache(str(tmp_path / "http.sqlite"))
+    assert cache.store(URL, 200, dict(FRESH), b"body")
+    assert cache.lookup(URL).body == b"body"
+
+
+def test_private_and_no_store_responses_are_skipped(tmp_path):
+    cache = HTTPCache(str(tmp_path / "http.sqlite"))
+    assert not cache.store(URL, 200, {"cache-control": "private, max-age=60"}, b"body")
+    assert not cache.store(URL, 200, {"cache-control": "no-store"}, b"body")
+    assert cache.lookup(URL) is None
+
+
+def test_vary_skips_storage_except_accept_encoding(tmp_path):
+    cache = HTTPCache(str(tmp_path / "http.sqlite"))
+    assert not cache.store(URL, 200, {**FRESH, "vary": "Accept-Language"}, b"body")
+    assert not cache.store(URL, 200, {**FRESH, "vary": "*"}, b"body")
+    assert cache.store(URL, 200, {**FRESH, "vary": "Accept-Encoding"}, b"body")
+
+
+def test_revalidation_that_turns_private_drops_the_entry(tmp_path):
+    cache = HTTPCache(str(tmp_path / "http.sqlite"))
+    cache.store(URL, 200, {"cache-control": "no-cache", "etag": '"v1"'}, b"body")
+    cache.refresh(cache.lookup(URL), {"Cache-Control": "private, max-age=60"})
+    assert cache.lookup(URL) is None
@@ -0,0 +1,75 @@
+import threading
+
+from multi_agent.hybrid_retrieval import BM25Index, HybridRetriever
+from multi_agent.retrieval import RetrievalBackend
+
+
+class StubBackend(RetrievalBackend):
+    """Vector backend holding an existing corpus; listing it waits for `release`."""
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.release = threading.Event()
+
+    def count(self):
+        return len(self.documents)
+
+    def iter_documents(self, batch_size=500):
+        self.release.wait(5)
+        ids = list(self.documents)
+        yield ids, [self.documents[doc_id] for doc_id in ids], [{} for _ in ids]
+
+    def query(self, query_texts, n_results=1, include=None):
+        return {"ids": [["d1"]], "documents": [[self.documents["d1"]]], "distances": [[0.4]], "metadatas": [[{}]]}
+
+
+CORPUS = {"d1": "quarterly revenue report", "d2": "zebra migration patterns"}
+
+
+def test_queries_do_not_wait_for_the_backfill(tmp_path):
+    backend = StubBackend(CORPUS)
+    retriever = HybridRetriever(backend, BM25Index(str(tmp_path / "bm25.sqlite")))
+
+    # Vector-only while the existing corpus is being indexed
+    assert retriever.query(["zebra"], n_results=2)["ids"] == [["d1"]]
+
+    backend.release.set()
+    retriever._backfill_thread.join(5)
+
+    assert retriever.query(["zebra"], n_results=2)["ids"] == [["d1", "d2"]]
+    assert retriever.start_backfill() is None
+
+
+def test_backend_that_cannot_list_documents_turns_the_keyword_side_off(tmp_path):
+    class Unlistable(StubBackend):
+        def iter_documents(self, batch_size=500):
+            raise NotImplementedError
+
+    retriever = HybridRetriever(Unlistable(CORPUS), BM25Index(str(tmp_path / "bm25.sqlite")))
+
+    assert retriever.backfill() == 0
+    assert retriever.keyword_index is None
+    assert retriever.query(["zebra"], n_results=2)["ids"] == [["d1"]]
+
+
+def test_each_vector_store_gets_its_own_keyword_index(tmp_path, monkeypatch):
+    monkeypatch.setenv("ADK_CACHE_DIR", str(tmp_path))
+    monkeypatch.delenv("RAG_BM25_PATH", raising=False)
+
+    class Cloud(StubBackend):
+        namespace = "chroma:cloud:docs"
+
+    class Local(StubBackend):
+        namespace = "local:/srv/index"
+
+    cloud = HybridRetriever.from_env(Cloud(CORPUS))
+    local = HybridRetriever.from_env(Local({"d1": "other corpus"}))
+    try:
+        assert cloud.keyword_index.path != local.keyword_index.path
+        assert cloud.keyword_index.path.startswith(str(tmp_path))
+        assert local.namespace == "local:/srv/index"
+    finally:
+        for retriever in (cloud, local):
+            retriever.vector_backend.release.set()
+            retriever._backfill_thread.join(5)
+            retriever.close()
@@ -0,0 +1,222 @@
+import asyncio
+import itertools
+import threading
+import time
+
+import pytest
+
+from multi_agent.resilience import Backend, CircuitBreaker, CircuitOpenError, Policy, deadline
+
+
+class HTTPError(Exception):
+    def __init__(self, status):
+        super().__init__(f"HTTP {status}")
+        self.code = status
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+
+    breaker.record_failure()
+
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.opens == 1
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_half_open_allows_one_probe_and_closes_on_success():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_failed_probe_reopens_the_circuit():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    assert breaker.allow()
+
+    breaker.record_failure()
+
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.opens == 2
+
+
+def test_released_probe_lets_the_next_call_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    assert breaker.allow()
+
+    breaker.release()
+
+    assert breaker.state == "half_open" and breaker.allow()
+
+
+def test_breaker_disabled_with_zero_threshold():
+    breaker = CircuitBreaker(failure_threshold=0, reset_timeout=60)
+    for _ in range(10):
+        breaker.record_failure()
+    assert breaker.allow()
+
+
+def test_transient_errors_are_retried():
+    backend = Backend("test", Policy(attempts=3, base_delay=0))
+    attempts = itertools.count(1)
+
+    def flaky():
+        if next(attempts) < 3:
+            raise HTTPError(503)
+        return "ok"
+
+    assert backend.call(flaky) == "ok"
+    assert backend.stats()["retries"] == 2
+
+
+def test_permanent_errors_are_not_retried_and_do_not_open_the_circuit():
+    backend = Backend("test", Policy(attempts=3, base_delay=0, failure_threshold=1))
+    calls = []
+
+    def not_found():
+        calls.append(1)
+        raise HTTPError(404)
+
+    for _ in range(2):
+        with pytest.raises(HTTPError):
+            backend.call(not_found)
+    assert len(calls) == 2
+    assert backend.breaker().state == "closed"
+
+
+def test_open_circuit_short_circuits_calls():
+    backend = Backend("test", Policy(attempts=1, failure_threshold=2, reset_timeout=60))
+    calls = []
+
+    def down():
+        calls.append(1)
+        raise ConnectionError("refused")
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            backend.call(down)
+    with pytest.raises(CircuitOpenError):
+        backend.call(down)
+
+    assert len(calls) == 2
+    assert backend.stats()["short_circuits"] == 1
+    assert backend.stats()["breakers"]["default"]["state"] == "open"
+
+
+def test_breakers_are_kept_per_key():
+    backend = Backend("web", Policy(attempts=1, failure_threshold=1))
+
+    def down():
+        raise ConnectionError("refused")
+
+    with pytest.raises(ConnectionError):
+        backend.call(down, key="slow.example")
+
+    assert backend.call(lambda: "ok", key="fast.example") == "ok"
+    with pytest.raises(CircuitOpenError):
+        backend.call(lambda: "ok", key="slow.example")
+
+
+def test_slow_idempotent_call_is_hedged():
+    backend = Backend("test", Policy(attempts=1, hedge_after=0.02))
+    attempts = itertools.count()
+    release = threading.Event()
+
+    def read():
+        if next(attempts) == 0:
+            release.wait(1)
+            return "slow"
+        return "fast"
+
+    try:
+        assert backend.call(read, idempotent=True) == "fast"
+    finally:
+        release.set()
+    # Which attempt's thread starts first is up to the scheduler, so hedge_wins is not checked
+    assert backend.stats()["hedges"] == 1
+
+
+def test_non_idempotent_call_is_not_hedged():
+    backend = Backend("test", Policy(attempts=1, hedge_after=0.01))
+
+    def write():
+        time.sleep(0.03)
+        return "written"
+
+    assert backend.call(write) == "written"
+    assert backend.stats()["hedges"] == 0
+
+
+def test_async_hedge_wins_and_cancels_the_slow_attempt():
+    backend = Backend("test", Policy(attempts=1, hedge_after=0.02))
+    attempts = itertools.count()
+    cancelled = []
+
+    async def read():
+        if next(attempts) == 0:
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append(1)
+                raise
+            return "slow"
+        return "fast"
+
+    async def main():
+        result = await backend.call_async(read, idempotent=True)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(main()) == "fast"
+    assert cancelled == [1]
+    assert backend.stats()["hedge_wins"] == 1
+
+
+def test_async_attempt_timeout():
+    backend = Backend("test", Policy(attempts=1, timeout=0.01))
+
+    async def hang():
+        await asyncio.sleep(1)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(backend.call_async(hang))
+    assert backend.stats()["timeouts"] == 1
+
+
+def test_request_deadline_stops_retries():
+    backend = Backend("test", Policy(attempts=10, base_delay=0.05, max_delay=0.05))
+    calls = []
+
+    def down():
+        calls.append(1)
+        raise ConnectionError("refused")
+
+    started = time.monotonic()
+    with deadline(0.1), pytest.raises(ConnectionError):
+        backend.call(down)
+
+    assert time.monotonic() - started < 0.5
+    assert len(calls) < 10
@@ -0,0 +1,122 @@
+import threading
+
+import pytest
+
+from multi_agent.services import ServiceRegistry
+
+
+class Service:
+    def __init__(self, name, closed):
+        self.name = name
+        self.closed = closed
+
+    def close(self):
+        self.closed.append(self.name)
+
+
+def test_service_is_built_lazily_and_once():
+    registry = ServiceRegistry()
+    builds = []
+    registry.register("db", lambda: builds.append(1) or object())
+
+    assert builds == []
+    assert not registry.is_ready("db")
+    first = registry.get("db")
+    assert registry.get("db") is first
+    assert builds == [1]
+    assert registry.is_ready("db")
+
+
+def test_concurrent_first_use_builds_once():
+    registry = ServiceRegistry()
+    builds = []
+    started = threading.Event()
+
+    def factory():
+        builds.append(1)
+        started.wait(0.1)
+        return object()
+
+    registry.register("db", factory)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get("db"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    started.set()
+    for thread in threads:
+        thread.join()
+
+    assert builds == [1]
+    assert len({id(result) for result in results}) == 1
+
+
+def test_failed_build_is_retried():
+    registry = ServiceRegistry()
+    attempts = []
+
+    def factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("backend down")
+        return "client"
+
+    registry.register("db", factory)
+    with pytest.raises(ConnectionError):
+        registry.get("db")
+    assert not registry.is_ready("db")
+    assert registry.get("db") == "client"
+
+
+def test_unknown_service():
+    with pytest.raises(KeyError):
+        ServiceRegistry().get("missing")
+
+
+def test_close_closes_built_services_newest_first():
+    registry = ServiceRegistry()
+    closed = []
+    registry.register("first", lambda: Service("first", closed))
+    registry.register("second", lambda: Service("second", closed))
+    registry.register("unused", lambda: Service("unused", closed))
+    registry.get("first")
+    registry.get("second")
+
+    registry.close()
+    registry.close()
+
+    assert closed == ["second", "first"]
+    assert not registry.is_ready("first")
+    # Closed services are rebuilt on next use
+    assert registry.get("first").name == "first"
+
+
+def test_close_continues_after_a_failing_service(capsys):
+    registry = ServiceRegistry()
+    closed = []
+
+    class Broken:
+        def close(self):
+            raise RuntimeError("boom")
+
+    registry.register("ok", lambda: Service("ok", closed))
+    registry.register("broken", Broken)
+    registry.get("ok")
+    registry.get("broken")
+
+    registry.close()
+
+    assert closed == ["ok"]
+    assert "closing service 'broken' failed" in capsys.readouterr().out
+
+
+def test_warm_up_skips_services_the_configuration_does_not_use():
+    registry = ServiceRegistry()
+    registry.register("cloud", object, warm=lambda: True)
+    registry.register("local", object, warm=lambda: False)
+    registry.register("always", object)
+
+    registry.warm_up(background=False)
+
+    assert registry.is_ready("cloud")
+    assert registry.is_ready("always")
+    assert not registry.is_ready("local")
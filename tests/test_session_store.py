@@ -0,0 +1,201 @@
+import asyncio
+import contextlib
+import os
+import sqlite3
+import time
+
+import pytest
+from google.adk.events import Event, EventActions
+from google.adk.sessions.base_session_service import GetSessionConfig
+from google.genai import types
+
+from multi_agent.session_store import SQLiteSessionService
+
+APP = "app"
+USER = "user"
+
+
+@pytest.fixture
+def make_service(tmp_path):
+    services = []
+
+    def make(**kwargs):
+        # No background flush unless a test asks for one: writes stay buffered until a read or flush()
+        kwargs.setdefault("flush_interval", 60)
+        kwargs.setdefault("batch_events", 1000)
+        service = SQLiteSessionService(str(tmp_path / "sessions.sqlite"), **kwargs)
+        services.append(service)
+        return service
+
+    yield make
+    for service in services:
+        service.close()
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def user_event(text, **state_delta):
+    return Event(
+        author="user",
+        invocation_id="invocation",
+        content=types.Content(role="user", parts=[types.Part(text=text)]),
+        actions=EventActions(state_delta=state_delta),
+    )
+
+
+def tool_event(content):
+    response = types.FunctionResponse(name="fetch_report", response={"status": "success", "content": content})
+    return Event(
+        author="agent",
+        invocation_id="invocation",
+        content=types.Content(role="user", parts=[types.Part(function_response=response)]),
+    )
+
+
+def stored_events(service):
+    with service._lock:
+        return service._conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+
+def failing_transaction():
+    @contextlib.contextmanager
+    def transaction():
+        raise sqlite3.OperationalError("database is locked")
+        yield
+
+    return transaction
+
+
+def test_events_are_buffered_and_flushed_by_reads(make_service):
+    service = make_service()
+    session = run(service.create_session(app_name=APP, user_id=USER, session_id="s1"))
+    for turn in range(3):
+        run(service.append_event(session, user_event(f"turn {turn}")))
+    assert stored_events(service) == 0
+
+    loaded = run(service.get_session(app_name=APP, user_id=USER, session_id="s1"))
+
+    assert [event.content.parts[0].text for event in loaded.events] == ["turn 0", "turn 1", "turn 2"]
+    assert service.stats()["flushes"] == 1
+
+
+def test_sessions_survive_a_restart(make_service):
+    service = make_service()
+    session = run(service.create_session(app_name=APP, user_id=USER, session_id="s1"))
+    run(service.append_event(session, user_event("hello", topic="billing")))
+    service.close()
+
+    reopened = make_service()
+    loaded = run(reopened.get_session(app_name=APP, user_id=USER, session_id="s1"))
+
+    assert len(loaded.events) == 1
+    assert loaded.state["topic"] == "billing"
+
+
+def test_state_prefixes_are_merged_by_scope(make_service):
+    service = make_service()
+    first = run(service.create_session(
+        app_name=APP, user_id=USER, session_id="s1",
+        state={"topic": "billing", "app:model": "flash", "user:language": "en", "temp:scratch": 1},
+    ))
+    assert first.state == {"topic": "billing", "app:model": "flash", "user:language": "en"}
+    run(service.append_event(first, user_event("hi", **{"user:language": "fr", "app:model": "pro", "temp:x": 2})))
+
+    same_user = run(service.create_session(app_name=APP, user_id=USER, session_id="s2"))
+    other_user = run(service.create_session(app_name=APP, user_id="other", session_id="s3"))
+
+    assert same_user.state == {"app:model": "pro", "user:language": "fr"}
+    assert other_user.state == {"app:model": "pro"}
+    reloaded = run(service.get_session(app_name=APP, user_id=USER, session_id="s1"))
+    assert "temp:x" not in reloaded.state
+    assert reloaded.state["topic"] == "billing"
+
+
+def test_failed_flush_keeps_the_batch_in_order(make_service, monkeypatch):
+    service = make_service()
+    session = run(service.create_session(app_name=APP, user_id=USER, session_id="s1"))
+    run(service.append_event(session, user_event("first")))
+
+    monkeypatch.setattr(service, "_transaction", failing_transaction())
+    with pytest.raises(sqlite3.OperationalError):
+        service.flush()
+    monkeypatch.undo()
+    run(service.append_event(session, user_event("second")))
+
+    loaded = run(service.get_session(app_name=APP, user_id=USER, session_id="s1"))
+    assert [event.content.parts[0].text for event in loaded.events] == ["first", "second"]
+    assert service.stats()["flush_failures"] == 1
+
+
+def test_background_writer_drops_the_batch_only_after_repeated_failures(make_service, monkeypatch, capsys):
+    service = make_service(flush_interval=0.001, max_flush_failures=3)
+    session = run(service.create_session(app_name=APP, user_id=USER, session_id="s1"))
+    monkeypatch.setattr(service, "_transaction", failing_transaction())
+    run(service.append_event(session, user_event("lost")))
+
+    deadline = time.monotonic() + 5
+    while service.dropped_events == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert service.dropped_events == 1
+    assert service.flush_failures >= 3
+    output = capsys.readouterr().out
+    assert "retrying" in output
+    assert "ERROR: dropped 1 buffered session events" in output
+
+
+def test_compaction_summarizes_old_tool_results(make_service):
+    service = make_service(compact_tokens=2000, keep_recent_events=2, summary_tokens=20)
+    session = run(service.create_session(app_name=APP, user_id=USER, session_id="s1"))
+    report = "Quarterly figures were reviewed line by line. " * 100
+    for turn in range(4):
+        run(service.append_event(session, user_event(f"question {turn}")))
+        run(service.append_event(session, tool_event(report)))
+
+    loaded = run(service.get_session(app_name=APP, user_id=USER, session_id="s1"))
+
+    metrics = service.session_metrics(APP, USER, "s1")
+    assert metrics["compactions"] == 1
+    assert metrics["compacted_tool_results"] > 0
+    assert metrics["history_tokens"] <= 2000
+    assert len(loaded.events) == 8
+    # The most recent tool result is kept whole
+    assert loaded.events[-1].content.parts[0].function_response.response["content"] == report
+    oldest = loaded.events[1].content.parts[0].function_response.response
+    assert oldest["compacted"] is True
+    assert oldest["status"] == "success"
+    assert oldest["summary"].startswith("Quarterly figures")
+
+
+def test_recent_events_and_delete(make_service):
+    service = make_service()
+    session = run(service.create_session(app_name=APP, user_id=USER, session_id="s1"))
+    for turn in range(5):
+        run(service.append_event(session, user_event(f"turn {turn}")))
+
+    recent = run(service.get_session(
+        app_name=APP, user_id=USER, session_id="s1", config=GetSessionConfig(num_recent_events=2)
+    ))
+    assert [event.content.parts[0].text for event in recent.events] == ["turn 3", "turn 4"]
+
+    run(service.delete_session(app_name=APP, user_id=USER, session_id="s1"))
+    assert run(service.get_session(app_name=APP, user_id=USER, session_id="s1")) is None
+    assert stored_events(service) == 0
+
+
+def test_uri_paths_follow_sqlalchemy(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    relative = SQLiteSessionService.from_uri("sqlite+wal:///sessions.db")
+    absolute = SQLiteSessionService.from_uri(f"sqlite+wal:///{tmp_path}/absolute.db")
+    try:
+        assert relative.path == "sessions.db"
+        assert absolute.path == f"{tmp_path}/absolute.db"
+        assert os.path.exists(tmp_path / "absolute.db")
+    finally:
+        relative.close()
+        absolute.close()
+
+    with pytest.raises(ValueError):
+        SQLiteSessionService.from_uri("sqlite+wal://host/sessions.db")
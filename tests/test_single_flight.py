@@ -0,0 +1,158 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from multi_agent.single_flight import SingleFlight, coalesce, normalize_url
+
+
+def test_concurrent_async_calls_share_one_execution():
+    flight = SingleFlight("test")
+    executions = []
+
+    async def fetch():
+        executions.append(1)
+        await asyncio.sleep(0.01)
+        return "page"
+
+    async def main():
+        return await asyncio.gather(*(flight.do_async("key", fetch) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["page"] * 5
+    assert executions == [1]
+    stats = flight.stats()
+    assert (stats["calls"], stats["executions"], stats["coalesced"], stats["in_flight"]) == (5, 1, 4, 0)
+
+
+def test_error_reaches_every_caller_and_is_not_kept():
+    flight = SingleFlight("test")
+    executions = []
+
+    async def fail():
+        executions.append(1)
+        await asyncio.sleep(0.01)
+        raise ConnectionError("backend down")
+
+    async def main():
+        return await asyncio.gather(*(flight.do_async("key", fail) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, ConnectionError) for result in results)
+    assert executions == [1]
+    assert flight.stats()["errors"] == 1
+
+    # Nothing is cached: the next call runs again
+    async def succeed():
+        return "ok"
+
+    assert asyncio.run(flight.do_async("key", succeed)) == "ok"
+
+
+def test_cancelled_leader_does_not_cancel_the_shared_call():
+    flight = SingleFlight("test")
+
+    async def fetch():
+        await asyncio.sleep(0.05)
+        return "page"
+
+    async def main():
+        leader = asyncio.ensure_future(flight.do_async("key", fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do_async("key", fetch))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(main()) == "page"
+    assert flight.stats()["executions"] == 1
+
+
+def test_cancelled_call_cancels_its_waiters():
+    flight = SingleFlight("test")
+
+    async def main():
+        call = None
+
+        async def fetch():
+            nonlocal call
+            call = asyncio.current_task()
+            await asyncio.sleep(1)
+
+        waiters = [asyncio.ensure_future(flight.do_async("key", fetch)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        call.cancel()
+        return await asyncio.gather(*waiters, return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, asyncio.CancelledError) for result in results)
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_threads_share_one_execution_and_its_error():
+    flight = SingleFlight("test")
+    release = threading.Event()
+    executions = []
+
+    def fail():
+        executions.append(1)
+        release.wait(1)
+        raise TimeoutError("slow backend")
+
+    errors = []
+
+    def call():
+        try:
+            flight.do("key", fail)
+        except TimeoutError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    while flight.stats()["calls"] < 4:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert executions == [1]
+    assert len(errors) == 4
+
+
+def test_coalesce_gives_each_caller_its_own_arguments():
+    executions = []
+
+    @coalesce("test_scrape", url=normalize_url)
+    async def scrape(url: str) -> dict:
+        executions.append(url)
+        await asyncio.sleep(0.01)
+        return {"url": url, "content": "text"}
+
+    async def main():
+        return await asyncio.gather(scrape("https://Example.com/a#top"), scrape("https://example.com/a"))
+
+    first, second = asyncio.run(main())
+    assert len(executions) == 1
+    assert first["url"] == "https://Example.com/a#top"
+    assert second["url"] == "https://example.com/a"
+    assert first is not second
+
+
+def test_coalescing_can_be_disabled(monkeypatch):
+    monkeypatch.setenv("SINGLE_FLIGHT", "0")
+    executions = []
+
+    @coalesce("test_disabled")
+    async def lookup(query: str) -> str:
+        executions.append(query)
+        await asyncio.sleep(0.01)
+        return query
+
+    async def main():
+        return await asyncio.gather(lookup("q"), lookup("q"))
+
+    assert asyncio.run(main()) == ["q", "q"]
+    assert len(executions) == 2
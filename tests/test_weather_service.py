@@ -0,0 +1,40 @@
+import asyncio
+
+from weather_agent.providers import FakeWeatherProvider
+from weather_agent.service import WeatherService
+
+
+def test_concurrent_lookups_share_one_provider_call():
+    provider = FakeWeatherProvider(latency_seconds=0.05)
+    service = WeatherService(provider)
+
+    async def main():
+        return await asyncio.gather(service.get("Paris"), service.get(" paris "))
+
+    results = asyncio.run(main())
+    assert [result["status"] for result in results] == ["success", "success"]
+    assert provider.calls == {"locate": 1, "current": 1}
+
+
+def test_cancelled_caller_does_not_fail_the_others():
+    service = WeatherService(FakeWeatherProvider(latency_seconds=0.2))
+
+    async def main():
+        first = asyncio.ensure_future(service.get("Paris"))
+        second = asyncio.ensure_future(service.get("Paris"))
+        await asyncio.sleep(0.05)
+        first.cancel()
+        return await asyncio.gather(first, second, return_exceptions=True)
+
+    cancelled, result = asyncio.run(main())
+    assert isinstance(cancelled, asyncio.CancelledError)
+    assert result["status"] == "success"
+
+
+def test_unknown_city_is_remembered():
+    provider = FakeWeatherProvider()
+    service = WeatherService(provider)
+
+    for _ in range(2):
+        assert asyncio.run(service.get("Atlantis"))["status"] == "error"
+    assert provider.calls["locate"] == 1
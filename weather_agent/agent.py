@@ -1,21 +1,67 @@
 # weather_agent/agent.py
+import asyncio
+import time
+from typing import List
+
 from google.adk.agents import Agent
-import datetime
-from zoneinfo import ZoneInfo
+
+from multi_agent.http_clients import close_async_client
+from weather_agent.service import get_weather_service
+
+
+async def get_weather_async(city: str) -> dict:
+    """
+    Current weather for a city.
+
+    Args:
+        city: The city name
+
+    Returns:
+        Dictionary with the weather report, temperature, conditions and local time
+    """
+    return await get_weather_service().get(city)
+
+
+async def get_weather_many(cities: List[str]) -> dict:
+    """
+    Current weather for several cities at once.
+
+    Args:
+        cities: The city names
+
+    Returns:
+        Dictionary with one result per distinct city, in input order
+    """
+    started = time.perf_counter()
+    results = await get_weather_service().get_many(cities)
+    failed = sum(1 for result in results if result["status"] == "error")
+    return {
+        "status": "success" if not failed else ("error" if failed == len(results) else "partial"),
+        "results": results,
+        "num_cities": len(results),
+        "failed": failed,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
 
 def get_weather(city: str) -> dict:
-    """Mock weather tool for a city."""
-    if city.lower() == "lusaka":
-        tz = ZoneInfo("Africa/Lusaka")
-        now = datetime.datetime.now(tz)
-        report = f"Sunny, 20°C in {city} at {now.strftime('%Y-%m-%d %H:%M:%S %Z')}"
-        return {"status": "success", "report": report}
-    return {"status": "error", "error_message": f"No weather data for {city}."}
+    """Current weather for a city (blocking; for scripts outside an event loop)."""
+    async def lookup() -> dict:
+        try:
+            return await get_weather_async(city)
+        finally:
+            # The loop ends with this call, so its pooled HTTP client must not outlive it
+            await close_async_client()
+
+    return asyncio.run(lookup())
+
 
 root_agent = Agent(
     name="weather_agent",
     model="gemini-2.5-flash",
     description="Answers weather queries for cities.",
-    instruction="Use get_weather to provide accurate weather info.",
-    tools=[get_weather],
-)
\ No newline at end of file
+    instruction="""Use get_weather_async to provide accurate weather info for one city.
+    When the question involves several cities, call get_weather_many once with all of them
+    instead of calling get_weather_async for each city.""",
+    tools=[get_weather_async, get_weather_many],
+)
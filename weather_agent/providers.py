@@ -0,0 +1,187 @@
+# weather_agent/providers.py
+"""
+Weather providers for the weather agent.
+
+A provider resolves a city name to a `Location` (coordinates and IANA time
+zone) and reports the current weather at a location. Two are included:
+
+- `FakeWeatherProvider`: deterministic local data for a fixed set of
+  cities, with an optional artificial latency, for tests and offline use;
+- `OpenMeteoProvider`: the Open-Meteo geocoding and forecast APIs over
+  HTTP (no API key needed).
+
+WEATHER_PROVIDER selects one ("fake" by default, or "open-meteo").
+"""
+
+import asyncio
+import os
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+from multi_agent.http_clients import get_async_client
+
+
+class UnknownCityError(LookupError):
+    """Raised when a provider cannot find a city."""
+
+
+class Location:
+    """A resolved city."""
+
+    def __init__(self, name: str, latitude: float, longitude: float, timezone: str, country: str = ""):
+        self.name = name
+        self.latitude = latitude
+        self.longitude = longitude
+        self.timezone = timezone
+        self.country = country
+
+
+class WeatherProvider:
+    """Interface of a weather backend."""
+
+    name = "base"
+
+    async def locate(self, city: str) -> Location:
+        """Resolve a city name, raising UnknownCityError if there is no such city."""
+        raise NotImplementedError
+
+    async def current(self, location: Location) -> Dict[str, Any]:
+        """Return {"temperature_c", "conditions", "wind_kmh"} for a location."""
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        """Release connections held by the provider."""
+
+
+# name -> (latitude, longitude, time zone, country)
+FAKE_CITIES: Dict[str, Tuple[float, float, str, str]] = {
+    "Lusaka": (-15.39, 28.32, "Africa/Lusaka", "Zambia"),
+    "Nairobi": (-1.29, 36.82, "Africa/Nairobi", "Kenya"),
+    "Johannesburg": (-26.20, 28.05, "Africa/Johannesburg", "South Africa"),
+    "Cairo": (30.04, 31.24, "Africa/Cairo", "Egypt"),
+    "London": (51.51, -0.13, "Europe/London", "United Kingdom"),
+    "Paris": (48.86, 2.35, "Europe/Paris", "France"),
+    "Berlin": (52.52, 13.40, "Europe/Berlin", "Germany"),
+    "New York": (40.71, -74.01, "America/New_York", "United States"),
+    "San Francisco": (37.77, -122.42, "America/Los_Angeles", "United States"),
+    "Sao Paulo": (-23.55, -46.63, "America/Sao_Paulo", "Brazil"),
+    "Tokyo": (35.68, 139.69, "Asia/Tokyo", "Japan"),
+    "Mumbai": (19.08, 72.88, "Asia/Kolkata", "India"),
+    "Sydney": (-33.87, 151.21, "Australia/Sydney", "Australia"),
+}
+
+FAKE_CONDITIONS = ("Sunny", "Partly cloudy", "Cloudy", "Light rain", "Thunderstorms", "Windy")
+
+
+class FakeWeatherProvider(WeatherProvider):
+    """Deterministic weather for the cities in FAKE_CITIES."""
+
+    name = "fake"
+
+    def __init__(self, latency_seconds: float = 0.0):
+        """
+        Args:
+            latency_seconds: Artificial delay of every provider call
+        """
+        self.latency_seconds = latency_seconds
+        self.calls = {"locate": 0, "current": 0}
+        self._cities = {name.lower(): name for name in FAKE_CITIES}
+
+    async def locate(self, city: str) -> Location:
+        self.calls["locate"] += 1
+        await asyncio.sleep(self.latency_seconds)
+        name = self._cities.get(city.strip().lower())
+        if name is None:
+            raise UnknownCityError(f"No weather data for {city}.")
+        latitude, longitude, timezone, country = FAKE_CITIES[name]
+        return Location(name, latitude, longitude, timezone, country)
+
+    async def current(self, location: Location) -> Dict[str, Any]:
+        self.calls["current"] += 1
+        await asyncio.sleep(self.latency_seconds)
+        if location.name == "Lusaka":
+            # The original mock's answer
+            return {"temperature_c": 20.0, "conditions": "Sunny", "wind_kmh": 8.0}
+        seed = zlib.crc32(location.name.encode())
+        return {
+            "temperature_c": float(seed % 35),
+            "conditions": FAKE_CONDITIONS[seed % len(FAKE_CONDITIONS)],
+            "wind_kmh": float(seed % 40),
+        }
+
+
+# WMO weather interpretation codes used by Open-Meteo
+WEATHER_CODES = {
+    0: "Clear sky", 1: "Mainly clear", 2: "Partly cloudy", 3: "Overcast",
+    45: "Fog", 48: "Freezing fog",
+    51: "Light drizzle", 53: "Drizzle", 55: "Heavy drizzle", 56: "Freezing drizzle", 57: "Freezing drizzle",
+    61: "Light rain", 63: "Rain", 65: "Heavy rain", 66: "Freezing rain", 67: "Freezing rain",
+    71: "Light snow", 73: "Snow", 75: "Heavy snow", 77: "Snow grains",
+    80: "Light showers", 81: "Showers", 82: "Violent showers", 85: "Snow showers", 86: "Heavy snow showers",
+    95: "Thunderstorms", 96: "Thunderstorms with hail", 99: "Thunderstorms with heavy hail",
+}
+
+
+class OpenMeteoProvider(WeatherProvider):
+    """Open-Meteo geocoding and current-weather APIs, over the process-wide async HTTP pool."""
+
+    name = "open-meteo"
+
+    def __init__(
+        self,
+        forecast_url: str = "https://api.open-meteo.com/v1/forecast",
+        geocoding_url: str = "https://geocoding-api.open-meteo.com/v1/search",
+        timeout_seconds: float = 5.0,
+    ):
+        """
+        Args:
+            forecast_url: Forecast API endpoint
+            geocoding_url: Geocoding API endpoint
+            timeout_seconds: Timeout of every HTTP request
+        """
+        self.forecast_url = forecast_url
+        self.geocoding_url = geocoding_url
+        self.timeout_seconds = timeout_seconds
+
+    async def locate(self, city: str) -> Location:
+        response = await get_async_client().get(
+            self.geocoding_url,
+            params={"name": city.strip(), "count": 1, "language": "en", "format": "json"},
+            timeout=self.timeout_seconds,
+        )
+        response.raise_for_status()
+        results = response.json().get("results") or []
+        if not results:
+            raise UnknownCityError(f"No weather data for {city}.")
+        match = results[0]
+        return Location(match["name"], match["latitude"], match["longitude"], match.get("timezone") or "UTC",
+                        match.get("country", ""))
+
+    async def current(self, location: Location) -> Dict[str, Any]:
+        response = await get_async_client().get(self.forecast_url, params={
+            "latitude": location.latitude,
+            "longitude": location.longitude,
+            "current": "temperature_2m,weather_code,wind_speed_10m",
+            "timezone": location.timezone,
+        }, timeout=self.timeout_seconds)
+        response.raise_for_status()
+        current = response.json()["current"]
+        return {
+            "temperature_c": current["temperature_2m"],
+            "conditions": WEATHER_CODES.get(current.get("weather_code"), "Unknown conditions"),
+            "wind_kmh": current.get("wind_speed_10m"),
+        }
+
+
+def create_provider(name: Optional[str] = None) -> WeatherProvider:
+    """Build the provider named by `name` or WEATHER_PROVIDER."""
+    name = (name or os.getenv("WEATHER_PROVIDER", "fake")).strip().lower()
+    if name == "fake":
+        return FakeWeatherProvider(latency_seconds=float(os.getenv("WEATHER_FAKE_LATENCY_MS", "0")) / 1000)
+    if name in ("open-meteo", "openmeteo"):
+        return OpenMeteoProvider(
+            forecast_url=os.getenv("WEATHER_FORECAST_URL", "https://api.open-meteo.com/v1/forecast"),
+            geocoding_url=os.getenv("WEATHER_GEOCODING_URL", "https://geocoding-api.open-meteo.com/v1/search"),
+            timeout_seconds=float(os.getenv("WEATHER_TIMEOUT_SECONDS", "5")),
+        )
+    raise ValueError(f"Unknown WEATHER_PROVIDER: {name}")
@@ -0,0 +1,236 @@
+# weather_agent/service.py
+"""
+Cached weather lookups on top of a provider.
+
+- City names are resolved to a location (coordinates and time zone) once
+  and kept in an LRU cache; unknown cities are remembered too.
+- Current weather is cached per city for WEATHER_CACHE_TTL_SECONDS. For
+  WEATHER_STALE_SECONDS after that, the stale observation is returned at
+  once and refreshed in the background (stale-while-revalidate).
+- Concurrent lookups of the same city share one provider call (through
+  `multi_agent.single_flight`, so a cancelled caller does not cancel the
+  call the others wait for), and `get_many` resolves all cities of a
+  question in one concurrent sweep.
+"""
+
+import asyncio
+import datetime
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+from zoneinfo import ZoneInfo
+
+from multi_agent.services import registry
+from multi_agent.single_flight import SingleFlight
+from weather_agent.providers import Location, UnknownCityError, WeatherProvider, create_provider
+
+
+def normalize_city(city: str) -> str:
+    """Case- and whitespace-insensitive form of a city name."""
+    return re.sub(r"\s+", " ", city.strip().casefold())
+
+
+class WeatherService:
+    """Per-city weather and location caches in front of a provider."""
+
+    def __init__(
+        self,
+        provider: WeatherProvider,
+        ttl_seconds: float = 600.0,
+        stale_seconds: float = 1800.0,
+        max_cities: int = 1024,
+        max_concurrency: int = 8,
+    ):
+        """
+        Args:
+            provider: Weather backend
+            ttl_seconds: How long an observation is served without a refresh
+            stale_seconds: How long after that it is still served while being refreshed
+            max_cities: Cities kept in each cache before LRU eviction
+            max_concurrency: Provider calls in flight at once during `get_many`
+        """
+        self.provider = provider
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self.max_cities = max_cities
+        self.max_concurrency = max_concurrency
+
+        self._lock = threading.Lock()
+        # city key -> (monotonic fetch time, wall-clock fetch time, location, observation)
+        self._weather: "OrderedDict[str, Tuple[float, float, Location, Dict[str, Any]]]" = OrderedDict()
+        # city key -> location, or None for a city the provider does not know
+        self._locations: "OrderedDict[str, Optional[Location]]" = OrderedDict()
+        # Provider calls in flight, keyed by (kind, city key)
+        self._flights = SingleFlight("weather")
+        self._refreshing: Set[str] = set()
+        self._refresh_tasks: Set[asyncio.Task] = set()
+
+        self.fresh_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.location_hits = 0
+        self.location_misses = 0
+        self.errors = 0
+
+    @classmethod
+    def from_env(cls) -> "WeatherService":
+        """Build a service for the WEATHER_PROVIDER from WEATHER_* environment variables."""
+        return cls(
+            provider=create_provider(),
+            ttl_seconds=float(os.getenv("WEATHER_CACHE_TTL_SECONDS", "600")),
+            stale_seconds=float(os.getenv("WEATHER_STALE_SECONDS", "1800")),
+            max_cities=int(os.getenv("WEATHER_CACHE_MAX_CITIES", "1024")),
+            max_concurrency=int(os.getenv("WEATHER_MAX_CONCURRENCY", "8")),
+        )
+
+    async def locate(self, city: str) -> Location:
+        """Resolve a city to its location and time zone, from the cache when possible."""
+        key = normalize_city(city)
+        with self._lock:
+            if key in self._locations:
+                self._locations.move_to_end(key)
+                self.location_hits += 1
+                location = self._locations[key]
+                if location is None:
+                    raise UnknownCityError(f"No weather data for {city}.")
+                return location
+            self.location_misses += 1
+
+        try:
+            location = await self._flights.do_async(("locate", key), lambda: self.provider.locate(city))
+        except UnknownCityError:
+            self._remember(self._locations, key, None)
+            raise
+        self._remember(self._locations, key, location)
+        return location
+
+    async def get(self, city: str) -> Dict[str, Any]:
+        """Return the current weather for a city as a tool result."""
+        key = normalize_city(city)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._weather.get(key)
+            if entry is not None:
+                age = now - entry[0]
+                if age < self.ttl_seconds:
+                    self._weather.move_to_end(key)
+                    self.fresh_hits += 1
+                    return self._result(entry, "fresh")
+                if age < self.ttl_seconds + self.stale_seconds:
+                    self._weather.move_to_end(key)
+                    self.stale_hits += 1
+                    self._schedule_refresh(key, city)
+                    return self._result(entry, "stale")
+            self.misses += 1
+
+        try:
+            entry = await self._flights.do_async(("current", key), lambda: self._fetch(key, city))
+        except UnknownCityError as e:
+            return {"status": "error", "city": city, "error_message": str(e)}
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+            return {"status": "error", "city": city, "error_message": f"Weather lookup failed for {city}: {e}"}
+        return self._result(entry, None)
+
+    async def get_many(self, cities: List[str]) -> List[Dict[str, Any]]:
+        """Look up several cities concurrently; one result per distinct city, in input order."""
+        unique: Dict[str, str] = {}
+        for city in cities:
+            if city.strip():
+                unique.setdefault(normalize_city(city), city)
+        limit = asyncio.Semaphore(max(1, self.max_concurrency))
+
+        async def one(city: str) -> Dict[str, Any]:
+            async with limit:
+                return await self.get(city)
+
+        return list(await asyncio.gather(*(one(city) for city in unique.values())))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.fresh_hits + self.stale_hits + self.misses
+            return {
+                "provider": self.provider.name,
+                "cities": len(self._weather),
+                "fresh_hits": self.fresh_hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "hit_rate": (self.fresh_hits + self.stale_hits) / lookups if lookups else 0.0,
+                "refreshes": self.refreshes,
+                "locations": len(self._locations),
+                "location_hits": self.location_hits,
+                "location_misses": self.location_misses,
+                "errors": self.errors,
+            }
+
+    async def _fetch(self, key: str, city: str) -> Tuple[float, float, Location, Dict[str, Any]]:
+        location = await self.locate(city)
+        observation = await self.provider.current(location)
+        entry = (time.monotonic(), time.time(), location, observation)
+        self._remember(self._weather, key, entry)
+        return entry
+
+    def _schedule_refresh(self, key: str, city: str) -> None:
+        # Called with the lock held
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+        task = asyncio.get_running_loop().create_task(self._refresh(key, city))
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
+    async def _refresh(self, key: str, city: str) -> None:
+        try:
+            await self._flights.do_async(("current", key), lambda: self._fetch(key, city))
+            with self._lock:
+                self.refreshes += 1
+        except (Exception, asyncio.CancelledError):
+            # Keep serving the stale observation; the next lookup after it expires retries
+            with self._lock:
+                self.errors += 1
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _remember(self, cache: "OrderedDict[str, Any]", key: str, value: Any) -> None:
+        with self._lock:
+            cache[key] = value
+            cache.move_to_end(key)
+            while len(cache) > self.max_cities:
+                cache.popitem(last=False)
+
+    @staticmethod
+    def _result(entry: Tuple[float, float, Location, Dict[str, Any]], cache: Optional[str]) -> Dict[str, Any]:
+        _, fetched_at, location, observation = entry
+        now = datetime.datetime.now(ZoneInfo(location.timezone))
+        report = (
+            f"{observation['conditions']}, {observation['temperature_c']:g}°C in {location.name} "
+            f"at {now.strftime('%Y-%m-%d %H:%M:%S %Z')}"
+        )
+        return {
+            "status": "success",
+            "city": location.name,
+            "country": location.country,
+            "report": report,
+            "temperature_c": observation["temperature_c"],
+            "conditions": observation["conditions"],
+            "wind_kmh": observation.get("wind_kmh"),
+            "timezone": location.timezone,
+            "local_time": now.isoformat(timespec="seconds"),
+            "observed_at": datetime.datetime.fromtimestamp(fetched_at, datetime.timezone.utc).isoformat(timespec="seconds"),
+            "cache": cache,
+        }
+
+
+# Built on first use and shared by every agent loaded into the process
+registry.register("weather", WeatherService.from_env)
+
+
+def get_weather_service() -> WeatherService:
+    """Return the shared weather service, creating it on first use."""
+    return registry.get("weather")